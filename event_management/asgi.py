@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'event_management.settings')
+# Serve the hot read views as native coroutines (EVENTS_ASYNC_VIEWS=0 to disable)
+os.environ.setdefault('EVENTS_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
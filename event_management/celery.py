@@ -1,6 +1,8 @@
 import os
 from celery import Celery
 
+from events import metrics
+
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'event_management.settings')
 
@@ -13,6 +15,9 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
 
+# Time every events task and count its outcome, see events/metrics.py
+metrics.connect_signals()
+
 
 @app.task(bind=True)
 def debug_task(self):
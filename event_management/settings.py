@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from celery.schedules import crontab
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -84,6 +87,64 @@ DATABASES = {
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Rendered event pages; LocMemCache evicts least recently used entries
+    # once MAX_ENTRIES is reached. Point this at Redis/Memcached to share it
+    # between processes.
+    'events': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'events-responses',
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+    # Task metrics counters (events/metrics.py). With LocMemCache each
+    # process only sees its own tasks; point this at Redis/Memcached so
+    # the workers and /metrics share one set of counters.
+    'metrics': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'events-metrics',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
+EVENTS_RESPONSE_CACHE = {
+    'ALIAS': 'events',
+    'TIMEOUT': 300,
+    'ENABLED': True,
+}
+
+# Messages per second each queue may send, across all workers (queues not
+# listed are unlimited). Limits are opt-in: set EVENTS_BULK_RATE_LIMIT or
+# EVENTS_REMINDER_RATE_LIMIT, and point ALIAS at a cache shared by the
+# workers. With LocMemCache each worker process gets the full rate to
+# itself, and `manage.py check --deploy` fails.
+EVENTS_QUEUE_RATE_LIMITS = {
+    'ALIAS': os.environ.get('EVENTS_RATE_LIMIT_CACHE', 'default'),
+    'RATES': {
+        queue: int(rate) for queue, rate in (
+            ('bulk', os.environ.get('EVENTS_BULK_RATE_LIMIT')),
+            ('reminders', os.environ.get('EVENTS_REMINDER_RATE_LIMIT')),
+        ) if rate
+    },
+}
+
+# Cache alias holding the task metrics, and the bearer token a Prometheus
+# scraper sends to GET /metrics (staff users can always read it)
+EVENTS_METRICS = {
+    'ALIAS': 'metrics',
+    'TOKEN': os.environ.get('EVENTS_METRICS_TOKEN', ''),
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -128,19 +189,68 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'events.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'events.pagination.KeysetPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
-        'rest_framework.filters.SearchFilter',
+        'events.search.FullTextSearchFilter',
     ],
 }
 
+# Route the event list/detail pages and the /api/events/ reads to the async
+# views in events/async_views.py; asgi.py turns this on
+EVENTS_ASYNC_VIEWS = os.environ.get('EVENTS_ASYNC_VIEWS', '').lower() in ('1', 'true', 'yes')
+
+# Totals are only computed when a client asks for them (?count=true) and are
+# cached for this many seconds
+EVENTS_COUNT_CACHE_TIMEOUT = 60
+
+# Organizer, location and date filters of the event list, with counts;
+# cached per viewer in the EVENTS_RESPONSE_CACHE alias
+EVENTS_FACETS = {
+    'TIMEOUT': 300,
+    'LOCATION_LIMIT': 20,
+}
+
+# Attendees and reviews shown on the event page at first and per "load more"
+EVENTS_DETAIL_PAGE_SIZE = 20
+
+# Largest batch accepted by POST /api/rsvps/bulk/
+EVENTS_BULK_RSVP_MAX_ITEMS = 1000
+
+# Budgets of the benchmark_endpoints command: largest p50/p99/peak memory
+# ratio to the baseline report (below MIN_MS/MIN_KIB differences are noise),
+# extra queries allowed over it, and how often one query may run in a
+# request before it is reported as an N+1. With REPEAT samples p99 is
+# close to the slowest one, hence its looser ratio
+EVENTS_ENDPOINT_BENCHMARK = {
+    'REPEAT': 20,
+    'THRESHOLDS': {
+        'P50': 1.5,
+        'P99': 3.0,
+        'PEAK_MEMORY': 1.5,
+        'QUERIES': 0,
+        'REPEATED_QUERIES': 3,
+        'MIN_MS': 5.0,
+        'MIN_KIB': 64,
+    },
+}
+
+# API requests resolve the token's user, and its profile, from this cache
+# for TIMEOUT seconds; saving a User or UserProfile evicts the entry. Use
+# a cache shared by every web process (Redis/Memcached) in production, or
+# evictions only reach the process that made the change
+EVENTS_AUTH_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': 60,
+    'PROFILE': True,
+}
+
 # JWT Configuration
 from datetime import timedelta
 SIMPLE_JWT = {
@@ -153,13 +263,71 @@ SIMPLE_JWT = {
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Square WebP variants of uploaded profile pictures, built by a worker.
+# Their names are content hashes, so serve MEDIA_ROOT/profiles/variants/
+# with a long Cache-Control max-age
+EVENTS_PROFILE_IMAGES = {
+    'ENABLED': True,
+    'SIZES': {'sm': 64, 'md': 150, 'lg': 400},
+    'FORMAT': 'WEBP',
+    'QUALITY': 80,
+}
+
 # Celery Configuration
-CELERY_BROKER_URL = 'redis://localhost:6379/0'
-CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
+if not CELERY_BROKER_URL:
+    # No broker: tasks, and the outbox relay, run in-process
+    CELERY_TASK_ALWAYS_EAGER = True
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# Confirmations, bulk notifications and reminders each get their own
+# queue (see events/routing.py); a worker prefetching one task at a time
+# cannot sit on a backlog that another worker could be draining
+CELERY_TASK_ROUTES = ('events.routing.route_task',)
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_BEAT_SCHEDULE = {
+    'schedule-event-reminders': {
+        'task': 'events.tasks.schedule_event_reminders',
+        'schedule': 15 * 60,
+    },
+    'relay-outbox': {
+        'task': 'events.tasks.relay_outbox_task',
+        'schedule': 10,
+    },
+    'flush-event-updates': {
+        'task': 'events.tasks.flush_event_updates',
+        'schedule': 30,
+    },
+    'send-daily-digests': {
+        'task': 'events.tasks.send_daily_digests',
+        'schedule': crontab(hour=7, minute=0),
+    },
+}
+
+# Outbox rows handed off per relay batch, and how long a claim by a relay
+# that died is honoured before another relay takes the rows over
+EVENTS_OUTBOX_BATCH_SIZE = 100
+EVENTS_OUTBOX_CLAIM_TIMEOUT = 300
+# Failed attempts after which a row is parked instead of retried, and how
+# many seconds dispatched rows are kept before they are purged
+EVENTS_OUTBOX_MAX_ATTEMPTS = 10
+EVENTS_OUTBOX_RETENTION = 7 * 24 * 60 * 60
+
+# Edits to an event within this many seconds of each other produce one
+# event_updated email, sent at most this long after the first edit
+EVENTS_UPDATE_COALESCE_WINDOW = 300
+EVENTS_UPDATE_COALESCE_MAX_DELAY = 1800
+
+# Users whose daily digests are built and handed off together
+EVENTS_DIGEST_BATCH_SIZE = 100
+
+# Events claimed per batch by the reminder sweep, and how long a claimed
+# reminder may go unsent before a later sweep takes it over
+EVENTS_REMINDER_BATCH_SIZE = 500
+EVENTS_REMINDER_CLAIM_TIMEOUT = 1800
 
 # Email Configuration
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'  # For development
@@ -169,3 +337,6 @@ EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 EMAIL_HOST_USER = ''
 EMAIL_HOST_PASSWORD = ''
+
+# Notification emails are sent one per recipient, this many per SMTP connection
+EVENTS_EMAIL_CHUNK_SIZE = 100
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import UserProfile, Event, RSVP, Review
+from .models import UserProfile, Event, RSVP, Review, EventReminder, OutboxMessage, OrganizerFollower
 
 
 @admin.register(UserProfile)
@@ -13,7 +13,13 @@ class EventAdmin(admin.ModelAdmin):
     list_display = ['title', 'organizer', 'location', 'start_time', 'is_public']
     list_filter = ['is_public', 'start_time', 'location']
     search_fields = ['title', 'description', 'organizer__username']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = [
+        'created_at', 'updated_at',
+        'going_count', 'maybe_count', 'not_going_count',
+        'review_count', 'rating_sum',
+        'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count',
+        'child_version', 'child_updated_at',
+    ]
 
 
 @admin.register(RSVP)
@@ -28,3 +34,25 @@ class ReviewAdmin(admin.ModelAdmin):
     list_display = ['event', 'user', 'rating', 'created_at']
     list_filter = ['rating', 'created_at']
     search_fields = ['event__title', 'user__username']
+
+
+@admin.register(EventReminder)
+class EventReminderAdmin(admin.ModelAdmin):
+    list_display = ['event', 'kind', 'claimed_at', 'sent_at']
+    list_filter = ['kind', 'sent_at']
+    search_fields = ['event__title']
+    readonly_fields = ['claim_token', 'claimed_at', 'sent_at']
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ['task', 'created_at', 'dispatched_at', 'attempts']
+    list_filter = ['task', 'dispatched_at']
+    readonly_fields = ['claim_token', 'claimed_at', 'dispatched_at', 'attempts', 'last_error', 'created_at']
+
+
+@admin.register(OrganizerFollower)
+class OrganizerFollowerAdmin(admin.ModelAdmin):
+    list_display = ['organizer', 'follower', 'going_count']
+    search_fields = ['organizer__username', 'follower__username']
+    raw_id_fields = ['organizer', 'follower']
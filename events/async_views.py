@@ -0,0 +1,135 @@
+"""
+Native async versions of the hot read views.
+
+When ``EVENTS_ASYNC_VIEWS`` is on (the default under ASGI, see asgi.py),
+the event list and detail pages and the reads of ``/api/events/`` are
+served by these coroutines, so a slow client or query holds an event-loop
+task instead of a worker thread. They share query building, templates,
+serializers and caching with the sync views. Everything a response needs
+is loaded up front with the async ORM, because lazy relations cannot be
+fetched from the event loop. Writes fall through to the sync DRF viewset.
+"""
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.shortcuts import render
+from rest_framework.response import Response
+
+from .cache import LIST_VERSION_KEY, cached_response, event_version_key
+from .conditional import arespond_conditionally, event_conditional, validator_values
+from .detail import aload_event_detail
+from .facets import aevent_facets
+from .pagination import InvalidCursor
+from .views import EventViewSet, event_list_context, event_list_query
+
+
+async def request_user(request):
+    """Resolve the lazy request.user in a thread; using it afterwards never queries"""
+    await sync_to_async(lambda: request.user.is_authenticated)()
+    return request.user
+
+
+@cached_response('event_list', lambda request: [LIST_VERSION_KEY])
+async def event_list(request):
+    """Display list of events with filtering and pagination"""
+    user = await request_user(request)
+    events, paginator, with_count = event_list_query(request.GET, user)
+    try:
+        page_obj = await paginator.apaginate(events, request.GET.get('cursor'), with_count=with_count)
+    except InvalidCursor:
+        page_obj = await paginator.apaginate(events, with_count=with_count)
+
+    facets = await aevent_facets(user)
+    return render(request, 'events/event_list.html', event_list_context(request, page_obj, facets))
+
+
+@event_conditional
+@cached_response('event_detail', lambda request, event_id: [event_version_key(event_id)])
+async def event_detail(request, event_id):
+    """Display event details"""
+    user = await request_user(request)
+    context = await aload_event_detail(user, event_id)
+    return render(request, 'events/event_detail.html', context)
+
+
+class AsyncEventViewSet(EventViewSet):
+    """
+    EventViewSet with native async ``list`` and ``retrieve``.
+
+    Views are built by DRF's ``as_view`` as usual. Only ``dispatch`` differs:
+    ``initial`` (authentication, permissions, throttling and content
+    negotiation) runs in a thread and the handler is awaited. Exceptions and
+    rendering go through the viewset's own handle_exception and
+    finalize_response.
+    """
+
+    # Mirrors APIView.dispatch from DRF 3.14 (pinned in requirements.txt);
+    # compare with it when upgrading DRF
+    async def dispatch(self, request, *args, **kwargs):
+        self.args, self.kwargs = args, kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        # Django renders the response off the event loop
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def list(self, request, *args, **kwargs):
+        queryset = await sync_to_async(self.filter_queryset)(self.get_queryset())
+        page = await self.paginator.apaginate_queryset(queryset, request, self)
+        keyset_page = self.paginator.page
+
+        async def build_response():
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+        return await arespond_conditionally(
+            request,
+            [validator_values(event) for event in page],
+            build_response,
+            request.get_full_path(), keyset_page.next_cursor, keyset_page.previous_cursor, keyset_page.count,
+        )
+
+    async def retrieve(self, request, *args, **kwargs):
+        # get_queryset() only returns events the user may see
+        queryset = await sync_to_async(self.filter_queryset)(self.get_queryset())
+        instance = await queryset.filter(pk=self.kwargs['pk']).afirst()
+        if instance is None:
+            raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+        self.check_object_permissions(request, instance)
+
+        async def build_response():
+            return Response(self.get_serializer(instance).data)
+
+        return await arespond_conditionally(request, [validator_values(instance)], build_response)
+
+
+COLLECTION_ACTIONS = {'get': 'list', 'post': 'create'}
+RESOURCE_ACTIONS = {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}
+
+event_collection = EventViewSet.as_view(dict(COLLECTION_ACTIONS))
+event_resource = EventViewSet.as_view(dict(RESOURCE_ACTIONS))
+# These return the coroutine of AsyncEventViewSet.dispatch
+async_event_collection = AsyncEventViewSet.as_view(dict(COLLECTION_ACTIONS))
+async_event_resource = AsyncEventViewSet.as_view(dict(RESOURCE_ACTIONS))
+
+
+async def api_event_list(request):
+    if request.method not in ('GET', 'HEAD'):
+        return await sync_to_async(event_collection)(request)
+    return await async_event_collection(request)
+
+
+async def api_event_detail(request, pk):
+    if request.method not in ('GET', 'HEAD'):
+        return await sync_to_async(event_resource)(request, pk=pk)
+    return await async_event_resource(request, pk=pk)
+
+
+# Like every DRF view, these rely on token authentication rather than CSRF
+api_event_list.csrf_exempt = True
+api_event_detail.csrf_exempt = True
@@ -0,0 +1,134 @@
+"""
+JWT authentication that resolves users from a cache.
+
+``JWTAuthentication`` loads the user row on every API request. The class
+here keeps the user's field values, with its profile joined in, in the
+``EVENTS_AUTH_CACHE`` alias for a short TTL, so a request with a warm
+entry authenticates without a query. Token validation is unchanged, and
+the "user inactive" and revoked-token (``CHECK_REVOKE_TOKEN``) checks run
+against the cached values on every request.
+
+The password hash never goes into the cache, only the md5 of it that the
+revoked-token check compares. Users rebuilt from the cache have
+``password`` deferred: reading it queries the row, and ``save()`` leaves
+the stored hash alone.
+
+Saving or deleting a User or UserProfile evicts the entry once the
+transaction commits (see signals.py). Queryset ``update()`` calls bypass
+the signals, so the TTL bounds how long such changes can go unnoticed.
+
+Evictions only reach the processes that share the cache. With a
+per-process backend such as LocMemCache, another web process keeps
+serving a deactivated user or a changed password for up to TIMEOUT
+seconds, so point ``ALIAS`` at Redis or Memcached when running more
+than one process; ``manage.py check --deploy`` warns otherwise.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.fields.files import FieldFile
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    'TIMEOUT': 60,
+    # Also cache request.user.userprofile
+    'PROFILE': True,
+}
+
+
+def auth_cache_settings():
+    return {**DEFAULTS, **getattr(settings, 'EVENTS_AUTH_CACHE', {})}
+
+
+def get_cache():
+    return caches[auth_cache_settings()['ALIAS']]
+
+
+def _user_key(user_id):
+    # v2: field values instead of a pickled User
+    return f'events:auth:user:v2:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    """
+    Evict a user once the current transaction commits; evicting earlier
+    would let a concurrent request cache the old row again
+    """
+    transaction.on_commit(lambda: get_cache().delete(_user_key(user_id)))
+
+
+def _field_values(instance, exclude=()):
+    values = {}
+    for field in instance._meta.concrete_fields:
+        if field.attname not in exclude:
+            value = getattr(instance, field.attname)
+            values[field.attname] = value.name if isinstance(value, FieldFile) else value
+    return values
+
+
+def _from_values(model, db, values):
+    # Fields missing from values come back deferred
+    return model.from_db(db, list(values), list(values.values()))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """Drop-in replacement for JWTAuthentication in DEFAULT_AUTHENTICATION_CLASSES"""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        config = auth_cache_settings()
+        cache = get_cache()
+        key = _user_key(user_id)
+        entry = cache.get(key)
+        if entry is None:
+            queryset = self.user_model.objects.all()
+            if config['PROFILE']:
+                queryset = queryset.select_related('userprofile')
+            try:
+                user = queryset.get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            entry = self._cache_entry(user, config['PROFILE'])
+            cache.set(key, entry, config['TIMEOUT'])
+        else:
+            user = self._user_from_entry(entry)
+
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != entry['password_md5']:
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        return user
+
+    def _cache_entry(self, user, with_profile):
+        entry = {
+            'user': _field_values(user, exclude={'password'}),
+            'password_md5': get_md5_hash_password(user.password),
+        }
+        if with_profile:
+            profile = getattr(user, 'userprofile', None)
+            entry['profile'] = profile and _field_values(profile)
+        return entry
+
+    def _user_from_entry(self, entry):
+        db = self.user_model.objects.db
+        user = _from_values(self.user_model, db, entry['user'])
+        if 'profile' in entry:
+            # Cache None too, as select_related does for a missing profile
+            relation = self.user_model._meta.get_field('userprofile')
+            profile = entry['profile'] and _from_values(relation.related_model, db, entry['profile'])
+            relation.set_cached_value(user, profile)
+            if profile is not None:
+                relation.field.set_cached_value(profile, user)
+        return user
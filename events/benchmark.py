@@ -0,0 +1,275 @@
+"""
+Small helpers shared by the benchmark management commands.
+
+Benchmarks seed their own data inside a transaction that is rolled back at
+the end, so they can be pointed at a development database without leaving
+anything behind.
+"""
+import asyncio
+import http
+import math
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from django.db import transaction
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back(using=None):
+    """Run the block in a transaction that is always rolled back"""
+    try:
+        with transaction.atomic(using=using):
+            yield
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+def time_call(func, repeat=5):
+    """Call func repeat times and return the wall-clock samples in seconds"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def format_ms(seconds):
+    return f'{seconds * 1000:.2f} ms'
+
+
+class _SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP to accept and discard messages"""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        sink = self.server.sink
+        with sink.lock:
+            sink.connections += 1
+        self.reply('220 sink ready')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command == b'EHLO':
+                self.reply('250-sink')
+                self.reply('250 8BITMIME')
+            elif command == b'DATA':
+                self.reply('354 end data with <CR><LF>.<CR><LF>')
+                for data_line in self.rfile:
+                    if data_line in (b'.\r\n', b'.\n'):
+                        break
+                if sink.delay:
+                    time.sleep(sink.delay)
+                with sink.lock:
+                    sink.messages += 1
+                self.reply('250 queued')
+            elif command == b'RCPT':
+                with sink.lock:
+                    sink.recipients += 1
+                self.reply('250 ok')
+            elif command == b'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                # HELO, MAIL, RSET and NOOP
+                self.reply('250 ok')
+
+
+class SMTPSink:
+    """
+    Local SMTP stand-in that counts connections, recipients and messages.
+
+    Use as a context manager; ``host`` and ``port`` are set once it is
+    listening. ``delay`` seconds are spent on every message, like a
+    provider that takes a while to accept mail.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, delay=0):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.connections = self.recipients = self.messages = 0
+        self._server = socketserver.ThreadingTCPServer((host, port), _SMTPSinkHandler)
+        self._server.daemon_threads = True
+        self._server.sink = self
+        self.host, self.port = self._server.server_address
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset(self):
+        with self.lock:
+            self.connections = self.recipients = self.messages = 0
+
+
+class _QuietWSGIRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class PooledWSGIServer(WSGIServer):
+    """
+    WSGI server that handles connections on a fixed pool of threads, like a
+    deployment with that many sync workers: once every thread is busy, new
+    connections wait in the listen backlog.
+    """
+
+    request_queue_size = 4096
+
+    def __init__(self, address, application, threads):
+        super().__init__(address, _QuietWSGIRequestHandler)
+        self.set_app(application)
+        self._pool = ThreadPoolExecutor(max_workers=threads)
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+async def _handle_asgi_connection(application, reader, writer):
+    """One HTTP/1.1 request per connection, enough for the benchmark client"""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        writer.close()
+        return
+    request_line, *header_lines = head[:-4].decode('latin-1').split('\r\n')
+    method, target, _ = request_line.split(' ', 2)
+    headers = []
+    for line in header_lines:
+        name, _, value = line.partition(':')
+        headers.append((name.strip().lower().encode('latin-1'), value.strip().encode('latin-1')))
+    length = int(dict(headers).get(b'content-length', 0))
+    body = await reader.readexactly(length) if length else b''
+    path, _, query = target.partition('?')
+    client = writer.get_extra_info('peername')
+    server = writer.get_extra_info('sockname')
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0', 'spec_version': '2.3'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode('latin-1'),
+        'query_string': query.encode('latin-1'),
+        'root_path': '',
+        'headers': headers,
+        'client': client[:2],
+        'server': server[:2],
+    }
+    finished = asyncio.Event()
+    received = False
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        await finished.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status = message['status']
+            lines = [f'HTTP/1.1 {status} {http.HTTPStatus(status).phrase}'.encode('latin-1')]
+            lines += [name + b': ' + value for name, value in message.get('headers', [])]
+            lines.append(b'connection: close')
+            writer.write(b'\r\n'.join(lines) + b'\r\n\r\n')
+        elif message['type'] == 'http.response.body':
+            writer.write(message.get('body', b''))
+            if not message.get('more_body'):
+                await writer.drain()
+                finished.set()
+
+    try:
+        await application(scope, receive, send)
+    finally:
+        finished.set()
+        writer.close()
+
+
+async def serve_asgi(application, host='127.0.0.1', port=0, ready=None):
+    """
+    Minimal asyncio HTTP server for an ASGI application. Calls
+    ``ready(port)`` once it is listening, then serves until cancelled.
+    """
+    server = await asyncio.start_server(
+        lambda reader, writer: _handle_asgi_connection(application, reader, writer), host, port, backlog=4096,
+    )
+    if ready:
+        ready(server.sockets[0].getsockname()[1])
+    async with server:
+        await server.serve_forever()
+
+
+async def http_load(host, port, paths, connections, requests, slow=0):
+    """
+    Run ``connections`` concurrent clients that each make ``requests`` GETs,
+    one connection per request. With ``slow`` the client pauses that many
+    seconds halfway through its headers, like a mobile client on a poor
+    link. Returns (latencies in seconds, failed requests, elapsed seconds).
+    """
+    latencies = []
+    failures = 0
+
+    async def client(index):
+        nonlocal failures
+        for number in range(requests):
+            path = paths[(index + number) % len(paths)]
+            started = time.perf_counter()
+            try:
+                reader, writer = await asyncio.open_connection(host, port)
+                writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\n'.encode('latin-1'))
+                if slow:
+                    await writer.drain()
+                    await asyncio.sleep(slow)
+                writer.write(b'Connection: close\r\n\r\n')
+                await writer.drain()
+                status_line = await reader.readline()
+                await reader.read()
+                writer.close()
+            except OSError:
+                failures += 1
+                continue
+            if status_line.split(b' ')[1:2] == [b'200']:
+                latencies.append(time.perf_counter() - started)
+            else:
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(index) for index in range(connections)))
+    return latencies, failures, time.perf_counter() - started
@@ -0,0 +1,229 @@
+import csv
+import json
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .cache import invalidate_event, invalidate_events
+from .followers import apply_follower_deltas
+from .forms import EventForm
+from .models import Event, RSVP
+from .outbox import enqueue_many
+from .stats import apply_grouped_counter_deltas
+from .tasks import send_event_notification
+from .visibility import visible_events
+
+
+def bulk_rsvp_max_items():
+    return getattr(settings, 'EVENTS_BULK_RSVP_MAX_ITEMS', 1000)
+
+
+def bulk_upsert_rsvps(actor, items):
+    """
+    Create or update many RSVPs in one statement.
+
+    ``items`` is a list of dicts with ``event``, ``status`` and an optional
+    ``user`` (defaults to the actor; only the event organizer may RSVP on
+    behalf of someone else). All items are validated together with a fixed
+    number of queries, then applied with a single
+    ``bulk_create(update_conflicts=True)`` against the (event, user) unique
+    constraint. Created and changed RSVPs get the same confirmation email as
+    a single RSVP, queued in the same transaction. Returns one result dict
+    per item, in input order.
+    """
+    results = []
+    for index, item in enumerate(items):
+        results.append({
+            'index': index,
+            'event': item['event'],
+            'user': item.get('user') or actor.id,
+            'status': item['status'],
+        })
+
+    event_ids = {result['event'] for result in results}
+    events = dict(
+        visible_events(actor).filter(id__in=event_ids).values_list('id', 'organizer_id')
+    )
+    other_user_ids = {result['user'] for result in results} - {actor.id}
+    known_users = set(User.objects.filter(id__in=other_user_ids).values_list('id', flat=True))
+    known_users.add(actor.id)
+
+    seen = set()
+    valid = []
+    for result in results:
+        key = (result['event'], result['user'])
+        if result['event'] not in events:
+            result['errors'] = {'event': ['Event not found.']}
+        elif result['user'] != actor.id and events[result['event']] != actor.id:
+            result['errors'] = {'user': ['Only the organizer can RSVP on behalf of other users.']}
+        elif result['user'] not in known_users:
+            result['errors'] = {'user': ['User not found.']}
+        elif key in seen:
+            result['errors'] = {'non_field_errors': ['Duplicate event and user in this request.']}
+        else:
+            seen.add(key)
+            valid.append(result)
+            continue
+        result['result'] = 'error'
+
+    if not valid:
+        return results
+
+    with transaction.atomic():
+        existing = {
+            (event_id, user_id): status
+            for event_id, user_id, status in RSVP.objects.filter(
+                event_id__in={result['event'] for result in valid},
+                user_id__in={result['user'] for result in valid},
+            ).values_list('event_id', 'user_id', 'status')
+        }
+
+        RSVP.objects.bulk_create(
+            [RSVP(event_id=result['event'], user_id=result['user'], status=result['status']) for result in valid],
+            update_conflicts=True,
+            unique_fields=['event', 'user'],
+            update_fields=['status'],
+        )
+
+        # bulk_create skips the counter signals, so apply the deltas here
+        changes = []
+        follower_changes = []
+        for result in valid:
+            previous = existing.get((result['event'], result['user']))
+            if previous is None:
+                result['result'] = 'created'
+            elif previous == result['status']:
+                result['result'] = 'unchanged'
+                continue
+            else:
+                result['result'] = 'updated'
+                changes.append((result['event'], RSVP.STATUS_COUNT_FIELDS[previous], -1))
+            changes.append((result['event'], RSVP.STATUS_COUNT_FIELDS[result['status']], 1))
+            going_delta = (result['status'] == 'Going') - (previous == 'Going')
+            if going_delta:
+                follower_changes.append((events[result['event']], result['user'], going_delta))
+        apply_grouped_counter_deltas(changes)
+        apply_follower_deltas(follower_changes)
+
+        confirmed = [result for result in valid if result['result'] != 'unchanged']
+        emails = dict(
+            User.objects.filter(id__in={result['user'] for result in confirmed}).exclude(email='')
+            .values_list('id', 'email')
+        )
+        enqueue_many(send_event_notification, [
+            (result['event'], 'rsvp_confirmation', emails[result['user']])
+            for result in confirmed if result['user'] in emails
+        ])
+    invalidate_events(result['event'] for result in valid)
+
+    return results
+
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+_TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+
+class ImportReport:
+    """Outcome of an event import: how many rows were created and why others failed"""
+
+    def __init__(self, max_errors=1000):
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+        self.max_errors = max_errors
+
+    def add_error(self, row, errors):
+        self.failed += 1
+        # Keep memory bounded even when every row of a huge file is bad
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': row, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+def detect_import_format(filename, default='csv'):
+    if filename and filename.lower().endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    if filename and filename.lower().endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def iter_import_rows(stream, fmt):
+    """
+    Lazily yield (row_number, data) pairs from a text stream.
+
+    ``data`` is a dict of raw field values, or a ValueError for lines that
+    could not be parsed. Only one line is held in memory at a time.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'ndjson':
+        for row_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError as exc:
+                yield row_number, ValueError(f'Invalid JSON: {exc}')
+                continue
+            if not isinstance(data, dict):
+                data = ValueError('Each line must be a JSON object.')
+            yield row_number, data
+    else:
+        raise ValueError(f'Unsupported import format: {fmt}')
+
+
+def _form_data(raw):
+    data = {field: raw.get(field) for field in EventForm.Meta.fields}
+    is_public = raw.get('is_public')
+    if is_public is None or is_public == '':
+        # Missing checkbox values would otherwise mean False
+        data['is_public'] = True
+    elif not isinstance(is_public, bool):
+        data['is_public'] = str(is_public).strip().lower() in _TRUE_VALUES
+    return data
+
+
+def import_events(organizer, rows, batch_size=500, report=None):
+    """
+    Validate and insert events from an iterable of (row_number, data) pairs.
+
+    Rows are checked with EventForm, so imports follow exactly the same
+    rules as the create page, and valid rows are inserted with
+    ``bulk_create`` in batches of ``batch_size``.
+
+    Unlike the create page, imports do not send event_created: one file
+    can hold thousands of events by the same organizer, and each of their
+    followers would get an email per event.
+    """
+    report = report or ImportReport()
+    batch = []
+    for row_number, raw in rows:
+        if isinstance(raw, Exception):
+            report.add_error(row_number, {'__all__': [str(raw)]})
+            continue
+        form = EventForm(data=_form_data(raw))
+        if not form.is_valid():
+            report.add_error(row_number, {field: list(messages) for field, messages in form.errors.items()})
+            continue
+        event = form.save(commit=False)
+        event.organizer = organizer
+        batch.append(event)
+        if len(batch) >= batch_size:
+            report.created += len(Event.objects.bulk_create(batch))
+            batch = []
+    if batch:
+        report.created += len(Event.objects.bulk_create(batch))
+    if report.created:
+        invalidate_event()
+    return report
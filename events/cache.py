@@ -0,0 +1,178 @@
+"""
+Versioned response cache for the event list and detail pages.
+
+Cached pages are keyed by a version number that the Event, RSVP and Review
+signal handlers bump once each change commits, so stale entries are never
+served and never need to be deleted; the LRU eviction of the configured
+cache backend reclaims them. Each entry is also keyed by the viewer's visibility
+class: anonymous viewers share one copy, authenticated viewers get their
+own since private events, their RSVP and CSRF token appear on the page.
+"""
+import functools
+import hashlib
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+
+LIST_VERSION_KEY = 'events:version:list'
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    'TIMEOUT': 300,
+    'ENABLED': True,
+}
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def cache_settings():
+    return {**DEFAULTS, **getattr(settings, 'EVENTS_RESPONSE_CACHE', {})}
+
+
+def get_cache():
+    return caches[cache_settings()['ALIAS']]
+
+
+def event_version_key(event_id):
+    return f'events:version:event:{event_id}'
+
+
+def get_version(key):
+    cache = get_cache()
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so an evicted version can never come back with
+        # a value that matches entries cached before the eviction
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key, time.time_ns())
+    return version
+
+
+def bump_version(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def invalidate_event(event_id=None):
+    """Invalidate the event list and, when given, one event's detail page"""
+    invalidate_events([] if event_id is None else [event_id])
+
+
+def invalidate_events(event_ids):
+    """
+    Invalidate the event list and the given events' detail pages once the
+    current transaction commits. Bumping earlier would let a request that
+    still reads the old rows cache them under the new version.
+    """
+    keys = [LIST_VERSION_KEY] + [event_version_key(event_id) for event_id in set(event_ids)]
+
+    def bump():
+        for key in keys:
+            bump_version(key)
+    transaction.on_commit(bump)
+
+
+def cache_stats():
+    """Hit and miss counters for this process"""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats['hits'] = _stats['misses'] = 0
+
+
+def _record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def viewer_class(request):
+    """Anonymous viewers share entries; each authenticated user has their own"""
+    if not request.user.is_authenticated:
+        return 'anon'
+    # Forms on the page embed a token derived from the CSRF cookie
+    csrf = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    return f'user:{request.user.pk}:{hashlib.sha1(csrf.encode()).hexdigest()[:12]}'
+
+
+def _cache_key(namespace, request, versions):
+    query = request.GET.urlencode()
+    raw = '|'.join([namespace, request.path, query, viewer_class(request)] + [str(version) for version in versions])
+    return f'events:response:v2:{namespace}:' + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _cacheable(request):
+    if request.method != 'GET' or not cache_settings()['ENABLED']:
+        return False
+    # Flash messages are rendered once and must not be cached or skipped
+    return not len(get_messages(request))
+
+
+def cached_response(namespace, version_keys):
+    """
+    Cache a view's 200 responses under the versions returned by
+    ``version_keys(request, *args, **kwargs)``. Works on sync and async views.
+    """
+    def decorator(view_func):
+        def lookup(request, *args, **kwargs):
+            """(cache key, cached response); the key is None when the request is not cacheable"""
+            if not _cacheable(request):
+                return None, None
+
+            versions = [get_version(key) for key in version_keys(request, *args, **kwargs)]
+            key = _cache_key(namespace, request, versions)
+            cached = get_cache().get(key)
+            if cached is None:
+                _record('misses')
+                return key, None
+
+            _record('hits')
+            content, headers = cached
+            response = HttpResponse(content)
+            # Replay Content-Type, Vary, ETag and whatever else the view set
+            for header, value in headers:
+                response[header] = value
+            response['X-Events-Cache'] = 'hit'
+            return key, response
+
+        def store(key, response):
+            if key is not None and response.status_code == 200 and not response.streaming:
+                # Cookies are per response and live apart from the headers, so none are stored
+                get_cache().set(key, (response.content, list(response.items())), cache_settings()['TIMEOUT'])
+                response['X-Events-Cache'] = 'miss'
+            return response
+
+        if iscoroutinefunction(view_func):
+            @functools.wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                # The session, user and cache lookups may block, so keep them off the event loop
+                key, cached = await sync_to_async(lookup)(request, *args, **kwargs)
+                if cached is not None:
+                    return cached
+                response = await view_func(request, *args, **kwargs)
+                return await sync_to_async(store)(key, response)
+            return async_wrapper
+
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            key, cached = lookup(request, *args, **kwargs)
+            if cached is not None:
+                return cached
+            return store(key, view_func(request, *args, **kwargs))
+        return wrapper
+    return decorator
@@ -0,0 +1,36 @@
+"""
+Deployment checks for settings that only work with a cache shared by every
+process. Run with ``python manage.py check --deploy``.
+"""
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, Tags, Warning, register
+
+from .authentication import auth_cache_settings
+from .routing import rate_limit_settings
+
+
+def _per_process(alias):
+    return isinstance(caches[alias], LocMemCache)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_caches(app_configs, **kwargs):
+    messages = []
+    alias = auth_cache_settings()['ALIAS']
+    if _per_process(alias):
+        messages.append(Warning(
+            f"EVENTS_AUTH_CACHE uses the per-process cache '{alias}'.",
+            hint='User evictions do not reach the other processes, which keep a deactivated user or old '
+                 'password for up to TIMEOUT seconds. Point ALIAS at Redis or Memcached.',
+            id='events.W001',
+        ))
+    config = rate_limit_settings()
+    if any(config['RATES'].values()) and _per_process(config['ALIAS']):
+        # Unlike a stale user, this is wrong by a factor of the worker count
+        messages.append(Error(
+            f"EVENTS_QUEUE_RATE_LIMITS uses the per-process cache '{config['ALIAS']}'.",
+            hint='Every worker process would get the full rate to itself. Point ALIAS at Redis or Memcached.',
+            id='events.E002',
+        ))
+    return messages
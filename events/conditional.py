@@ -0,0 +1,116 @@
+"""
+Conditional GET support for event resources.
+
+Validators are built from ``Event.updated_at`` and the child version that
+the RSVP/Review counter updates bump, so RSVP and review changes also
+change the ETag. Checking them costs at most one small query, and a
+matching request is answered with 304 before anything is serialized or
+rendered.
+"""
+import functools
+import hashlib
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.messages import get_messages
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from .cache import viewer_class
+from .visibility import visible_events
+
+VALIDATOR_FIELDS = ('id', 'updated_at', 'child_version', 'child_updated_at')
+
+
+def validator_values(event):
+    return tuple(getattr(event, field) for field in VALIDATOR_FIELDS)
+
+
+def make_etag(rows, *extra):
+    """Strong ETag over validator rows plus anything else the response depends on"""
+    digest = hashlib.sha1()
+    for row in rows:
+        digest.update(repr(tuple(row)).encode())
+    for value in extra:
+        digest.update(b'|' + repr(value).encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def last_modified_timestamp(rows):
+    timestamps = []
+    for _, updated_at, _, child_updated_at in rows:
+        timestamps.append(max(updated_at, child_updated_at or updated_at).timestamp())
+    return int(max(timestamps)) if timestamps else None
+
+
+def _not_modified(request, etag, last_modified):
+    if request.method in ('GET', 'HEAD'):
+        return get_conditional_response(request, etag=etag, last_modified=last_modified)
+    return None
+
+
+def _add_validators(response, etag, last_modified):
+    if response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        if last_modified is not None:
+            response.headers.setdefault('Last-Modified', http_date(last_modified))
+        patch_vary_headers(response, ('Authorization', 'Cookie'))
+    return response
+
+
+def respond_conditionally(request, rows, build_response, *extra):
+    """
+    Return 304 when the client's validators match ``rows``; otherwise call
+    ``build_response()`` and attach ETag and Last-Modified headers to it.
+    """
+    etag = make_etag(rows, *extra)
+    last_modified = last_modified_timestamp(rows)
+    response = _not_modified(request, etag, last_modified) or build_response()
+    return _add_validators(response, etag, last_modified)
+
+
+async def arespond_conditionally(request, rows, build_response, *extra):
+    """respond_conditionally() for async views; ``build_response()`` returns an awaitable"""
+    etag = make_etag(rows, *extra)
+    last_modified = last_modified_timestamp(rows)
+    response = _not_modified(request, etag, last_modified) or await build_response()
+    return _add_validators(response, etag, last_modified)
+
+
+def _event_validators(request, event_id):
+    """(validator row, viewer class) for the event, or None when the page must be built"""
+    # Flash messages must be rendered, never answered with a 304
+    if request.method not in ('GET', 'HEAD') or len(get_messages(request)):
+        return None
+    row = visible_events(request.user).filter(pk=event_id).values_list(*VALIDATOR_FIELDS).first()
+    if row is None:
+        return None
+    # The page embeds the viewer's own RSVP, review and CSRF token
+    return row, viewer_class(request)
+
+
+def event_conditional(view_func):
+    """Conditional GET for template views that render a single event, sync or async"""
+    if iscoroutinefunction(view_func):
+        @functools.wraps(view_func)
+        async def async_wrapper(request, event_id, *args, **kwargs):
+            async def build_response():
+                return await view_func(request, event_id, *args, **kwargs)
+
+            validators = await sync_to_async(_event_validators)(request, event_id)
+            if validators is None:
+                return await build_response()
+            row, viewer = validators
+            return await arespond_conditionally(request, [row], build_response, viewer)
+        return async_wrapper
+
+    @functools.wraps(view_func)
+    def wrapper(request, event_id, *args, **kwargs):
+        def build_response():
+            return view_func(request, event_id, *args, **kwargs)
+
+        validators = _event_validators(request, event_id)
+        if validators is None:
+            return build_response()
+        row, viewer = validators
+        return respond_conditionally(request, [row], build_response, viewer)
+    return wrapper
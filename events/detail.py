@@ -0,0 +1,90 @@
+"""
+Data loading for the event detail page.
+
+Everything the page shows comes from a fixed number of queries, however
+many RSVPs and reviews the event has: the event and its organizer in one
+query, the viewer's own RSVP and review as prefetches, then the first
+page of attendees and of other reviews. Later pages are fetched by the
+page's "load more" buttons (``event_attendees``/``event_reviews``) or
+through ``/api/events/<id>/attendees/`` and ``/api/events/<id>/reviews/``.
+Counts and the average rating come from the event's denormalized counters.
+"""
+from django.conf import settings
+from django.db.models import Prefetch
+
+from .models import Event, RSVP, Review
+from .pagination import KeysetPaginator
+from .visibility import aget_visible_event_or_404, get_visible_event_or_404
+
+ATTENDEE_ORDERING = ('created_at', 'id')
+REVIEW_ORDERING = ('-created_at', '-id')
+
+
+def detail_page_size():
+    return getattr(settings, 'EVENTS_DETAIL_PAGE_SIZE', 20)
+
+
+def attendee_paginator():
+    return KeysetPaginator(ATTENDEE_ORDERING, detail_page_size())
+
+
+def review_paginator():
+    return KeysetPaginator(REVIEW_ORDERING, detail_page_size())
+
+
+def event_attendees(event, status=None):
+    """An event's RSVPs with their users, optionally only those with ``status``"""
+    queryset = RSVP.objects.filter(event=event).select_related('user')
+    if status:
+        queryset = queryset.filter(status=status)
+    return queryset
+
+
+def event_reviews(event, exclude_user=None):
+    """An event's reviews with their users; the page shows the viewer's own review separately"""
+    queryset = Review.objects.filter(event=event).select_related('user')
+    if exclude_user is not None and exclude_user.is_authenticated:
+        queryset = queryset.exclude(user=exclude_user)
+    return queryset
+
+
+def event_detail_queryset(user):
+    queryset = Event.objects.select_related('organizer')
+    if user.is_authenticated:
+        queryset = queryset.prefetch_related(
+            Prefetch('rsvps', RSVP.objects.filter(user=user), to_attr='viewer_rsvps'),
+            Prefetch('reviews', Review.objects.filter(user=user), to_attr='viewer_reviews'),
+        )
+    return queryset
+
+
+def event_detail_context(event, rsvps, reviews):
+    """Template context for an event loaded with event_detail_queryset() and its first pages"""
+    viewer_rsvps = getattr(event, 'viewer_rsvps', [])
+    viewer_reviews = getattr(event, 'viewer_reviews', [])
+    return {
+        'event': event,
+        'rsvps': rsvps,
+        'rsvp_count': event.rsvp_count,
+        'user_rsvp': viewer_rsvps[0] if viewer_rsvps else None,
+        'user_review': viewer_reviews[0] if viewer_reviews else None,
+        'reviews': reviews,
+        'review_count': event.review_count,
+        'average_rating': event.average_rating,
+    }
+
+
+def load_event_detail(user, event_id):
+    """Context for the detail page of an event the user may see, raising Http404 otherwise"""
+    event = get_visible_event_or_404(user, event_id, event_detail_queryset(user))
+    rsvps = attendee_paginator().paginate(event_attendees(event))
+    reviews = review_paginator().paginate(event_reviews(event, user))
+    return event_detail_context(event, rsvps, reviews)
+
+
+async def aload_event_detail(user, event_id):
+    """load_event_detail() for async views"""
+    event = await aget_visible_event_or_404(user, event_id, event_detail_queryset(user))
+    rsvps = await attendee_paginator().apaginate(event_attendees(event))
+    reviews = await review_paginator().apaginate(event_reviews(event, user))
+    return event_detail_context(event, rsvps, reviews)
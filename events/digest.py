@@ -0,0 +1,100 @@
+"""
+Daily notification digests.
+
+Users who opt in (``UserProfile.notification_digest``) get event_created
+and event_updated notifications as compact DigestItem rows instead of one
+email each. ``send_digests`` drains the queue once a day, a batch of
+users at a time: one grouped query picks the users, one query loads all
+of their items, and one outbox message hands their digests to
+``send_digest_batch``. Items are deleted in that same transaction, so
+each one appears in exactly one digest.
+"""
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+
+from .models import DigestItem
+from .outbox import enqueue
+
+DIGEST_SUBJECT = 'Your daily event digest'
+
+DIGEST_SECTIONS = [
+    ('event_created', 'New events'),
+    ('event_updated', 'Updated events'),
+]
+
+
+def digest_batch_size():
+    return getattr(settings, 'EVENTS_DIGEST_BATCH_SIZE', 100)
+
+
+def queue_digest_items(user_ids, event_id, kind, batch_size=1000):
+    """Stream user ids from a queryset into DigestItem rows; returns how many were queued"""
+    queued = 0
+    batch = []
+    for user_id in user_ids.iterator(chunk_size=2000):
+        batch.append(DigestItem(user_id=user_id, event_id=event_id, kind=kind))
+        if len(batch) >= batch_size:
+            DigestItem.objects.bulk_create(batch)
+            queued += len(batch)
+            batch = []
+    if batch:
+        DigestItem.objects.bulk_create(batch)
+        queued += len(batch)
+    return queued
+
+
+def render_digest(items):
+    """
+    Plain-text digest body for one user's (kind, event_id, title, start_time,
+    location) items. An event is listed once per section.
+    """
+    lines = ['Here is what happened with your events since your last digest.']
+    for kind, heading in DIGEST_SECTIONS:
+        seen = set()
+        entries = []
+        for item_kind, event_id, title, start_time, location in items:
+            if item_kind == kind and event_id not in seen:
+                seen.add(event_id)
+                entries.append(f'- {title}: {start_time} at {location}')
+        if entries:
+            lines += ['', f'{heading}:'] + entries
+    return '\n'.join(lines) + '\n'
+
+
+def send_digests(batch_size=None):
+    """Queue one digest per user with pending items; returns how many were queued"""
+    batch_size = batch_size or digest_batch_size()
+    # Items queued while the job runs wait for the next digest
+    cutoff = DigestItem.objects.aggregate(cutoff=Max('id'))['cutoff']
+    if cutoff is None:
+        return 0
+
+    last_user_id = 0
+    queued = 0
+    while True:
+        user_ids = list(
+            DigestItem.objects.filter(id__lte=cutoff, user_id__gt=last_user_id)
+            .order_by('user_id').values_list('user_id', flat=True).distinct()[:batch_size]
+        )
+        if not user_ids:
+            return queued
+        last_user_id = user_ids[-1]
+
+        items = DigestItem.objects.filter(user_id__in=user_ids, id__lte=cutoff)
+        rows = items.order_by('user_id', 'id').values_list(
+            'user_id', 'user__email', 'kind', 'event_id', 'event__title', 'event__start_time', 'event__location',
+        )
+        digests = []
+        for (_, email), group in groupby(rows, key=itemgetter(0, 1)):
+            if email:
+                digests.append([email, DIGEST_SUBJECT, render_digest([row[2:] for row in group])])
+
+        with transaction.atomic():
+            items.delete()
+            if digests:
+                enqueue('events.tasks.send_digest_batch', digests)
+        queued += len(digests)
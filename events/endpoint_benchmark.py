@@ -0,0 +1,459 @@
+"""
+Latency, query and memory budgets for every route in events/urls.py.
+
+``run_endpoint_benchmark`` seeds a synthetic dataset at each scale in
+``EVENTS_ENDPOINT_BENCHMARK['SCALES']`` (see events/synthetic.py) and
+requests every endpoint in ``ENDPOINTS`` through the test client, with the
+middleware, session and JWT authentication a real request goes through.
+For each endpoint it records the p50/p99 latency, the number of SQL
+queries and the peak memory allocated while handling one request.
+
+Every request runs in a savepoint that is rolled back, so writes and
+deletes see the same data on every sample, and the whole dataset is rolled
+back at the end. The response cache is cleared before each request, so
+the numbers are those of the uncached path; the authentication cache is
+left warm, as it is in production.
+
+``compare_reports`` checks a report against a stored baseline and returns
+the regressions past ``THRESHOLDS``. Two checks need no baseline, and
+catch N+1 queries: an endpoint whose query count grows with the dataset,
+and one that runs the same query (with other parameters) more than
+``REPEATED_QUERIES`` times in a request.
+"""
+import gc
+import json
+import math
+import platform
+import re
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, reset_queries
+from django.db.models import Exists, F, OuterRef
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import urls as events_urls
+from .benchmark import percentile, rolled_back
+from .cache import get_cache
+from .models import Event, RSVP, Review
+from .synthetic import generate_synthetic_data
+
+DEFAULTS = {
+    # Name: generate_synthetic_data() sizes
+    'SCALES': {
+        'small': {'users': 200, 'events': 500, 'rsvps': 5000, 'reviews': 1000},
+        'medium': {'users': 2000, 'events': 10000, 'rsvps': 100000, 'reviews': 20000},
+        'large': {'users': 20000, 'events': 100000, 'rsvps': 1000000, 'reviews': 200000},
+    },
+    'REPEAT': 20,
+    'THRESHOLDS': {
+        # Largest allowed ratio to the baseline
+        'P50': 1.5,
+        'P99': 3.0,
+        'PEAK_MEMORY': 1.5,
+        # Extra queries allowed over the baseline
+        'QUERIES': 0,
+        # Most runs of one query shape allowed in a request (N+1 guard)
+        'REPEATED_QUERIES': 3,
+        # Differences below these are noise, whatever the ratio
+        'MIN_MS': 5.0,
+        'MIN_KIB': 64,
+    },
+}
+
+REPORT_VERSION = 1
+METRICS_TOKEN = 'endpoint-benchmark'
+
+
+def benchmark_settings():
+    config = {**DEFAULTS, **getattr(settings, 'EVENTS_ENDPOINT_BENCHMARK', {})}
+    config['THRESHOLDS'] = {**DEFAULTS['THRESHOLDS'], **config['THRESHOLDS']}
+    return config
+
+
+@dataclass
+class Endpoint:
+    """
+    One request to benchmark.
+
+    ``kwargs`` maps URL arguments to fixture names (see
+    ``benchmark_fixtures``); ``data`` is the payload, or a callable taking
+    the fixtures. ``fresh`` endpoints change the client's session (log in
+    or out), so each sample gets a new client.
+    """
+    name: str
+    route: str
+    method: str = 'get'
+    actor: str = 'member'
+    kwargs: dict = field(default_factory=dict)
+    query: str = ''
+    data: object = None
+    format: str = None
+    status: int = 200
+    fresh: bool = False
+
+
+def _event_form(fixtures):
+    start = timezone.localtime() + timedelta(days=30)
+    return {
+        'title': 'Benchmark Event', 'description': 'Benchmarked', 'location': 'Bench Hall',
+        'start_time': start.strftime('%Y-%m-%dT%H:%M'),
+        'end_time': (start + timedelta(hours=2)).strftime('%Y-%m-%dT%H:%M'),
+        'is_public': 'on',
+    }
+
+
+def _event_json(fixtures):
+    start = timezone.now() + timedelta(days=30)
+    return {
+        'title': 'Benchmark Event', 'description': 'Benchmarked', 'location': 'Bench Hall',
+        'start_time': start.isoformat(), 'end_time': (start + timedelta(hours=2)).isoformat(), 'is_public': True,
+    }
+
+
+def _import_upload(fixtures):
+    rows = ''.join(
+        f'Imported {number},Benchmarked,Bench Hall,2031-01-0{number}T18:00:00Z,2031-01-0{number}T20:00:00Z,true\n'
+        for number in range(1, 6)
+    )
+    content = f'title,description,location,start_time,end_time,is_public\n{rows}'.encode()
+    return {'file': SimpleUploadedFile('events.csv', content, content_type='text/csv')}
+
+
+EVENT = {'event_id': 'event'}
+API_EVENT = {'pk': 'event'}
+
+ENDPOINTS = [
+    # Pages
+    Endpoint('event_list', 'event_list'),
+    Endpoint('event_list anonymous', 'event_list', actor='anonymous'),
+    Endpoint('event_list search', 'event_list', query='search=python&when=later'),
+    Endpoint('event_detail', 'event_detail', kwargs=EVENT),
+    Endpoint('event_attendees', 'event_attendees', kwargs=EVENT),
+    Endpoint('event_reviews', 'event_reviews', kwargs=EVENT),
+    Endpoint('create_event form', 'create_event', actor='organizer'),
+    Endpoint('create_event', 'create_event', 'post', actor='organizer', data=_event_form, status=302),
+    Endpoint('edit_event form', 'edit_event', actor='organizer', kwargs=EVENT),
+    Endpoint('edit_event', 'edit_event', 'post', actor='organizer', kwargs=EVENT, data=_event_form, status=302),
+    Endpoint('delete_event', 'delete_event', 'post', actor='organizer', kwargs=EVENT, status=302),
+    Endpoint('rsvp_event', 'rsvp_event', 'post', kwargs=EVENT, data={'status': 'Maybe'}, status=302),
+    Endpoint('submit_review form', 'submit_review', kwargs=EVENT),
+    Endpoint('submit_review', 'submit_review', 'post', actor='guest', kwargs=EVENT,
+             data={'rating': 4, 'comment': 'Benchmarked'}, status=302),
+    Endpoint('delete_review', 'delete_review', 'post', kwargs=EVENT, status=302),
+    Endpoint('register form', 'register', actor='anonymous'),
+    Endpoint('register', 'register', 'post', actor='anonymous', fresh=True, status=302, data={
+        'username': 'bench_registered', 'email': 'bench_registered@example.com', 'full_name': 'Bench',
+        'password1': 'Str0ng-passphrase', 'password2': 'Str0ng-passphrase',
+    }),
+    Endpoint('login form', 'login', actor='anonymous'),
+    Endpoint('logout', 'logout', fresh=True, status=302),
+    Endpoint('profile', 'profile'),
+    Endpoint('profile_edit form', 'profile_edit'),
+    Endpoint('profile_edit', 'profile_edit', 'post', data={'full_name': 'Bench', 'bio': '', 'location': 'Bench'},
+             status=302),
+    Endpoint('metrics', 'metrics', actor='scraper'),
+
+    # API
+    Endpoint('api-root', 'api-root'),
+    Endpoint('event-list', 'event-list'),
+    Endpoint('event-list anonymous', 'event-list', actor='anonymous'),
+    Endpoint('event-list search', 'event-list', query='search=python'),
+    Endpoint('event-list count', 'event-list', query='count=true'),
+    Endpoint('event-list create', 'event-list', 'post', actor='organizer', data=_event_json, format='json',
+             status=201),
+    Endpoint('event-detail', 'event-detail', kwargs=API_EVENT),
+    Endpoint('event-detail update', 'event-detail', 'patch', actor='organizer', kwargs=API_EVENT,
+             data={'title': 'Renamed'}, format='json'),
+    Endpoint('event-detail delete', 'event-detail', 'delete', actor='organizer', kwargs=API_EVENT, status=204),
+    Endpoint('event-import-events', 'event-import-events', 'post', actor='organizer', data=_import_upload,
+             format='multipart'),
+    Endpoint('event-rsvp', 'event-rsvp', 'post', actor='guest', kwargs=API_EVENT, data={'status': 'Going'},
+             format='json'),
+    Endpoint('event-reviews', 'event-reviews', kwargs=API_EVENT),
+    Endpoint('event-reviews create', 'event-reviews', 'post', actor='guest', kwargs=API_EVENT,
+             data={'rating': 5, 'comment': 'Benchmarked'}, format='json', status=201),
+    Endpoint('event-attendees', 'event-attendees', kwargs=API_EVENT),
+    Endpoint('event-attendees going', 'event-attendees', kwargs=API_EVENT, query='status=Going'),
+    Endpoint('event-update-rsvp', 'event-update-rsvp', 'patch', kwargs={'pk': 'event', 'user_id': 'member'},
+             data={'status': 'Maybe'}, format='json'),
+    Endpoint('rsvp-list', 'rsvp-list'),
+    Endpoint('rsvp-detail', 'rsvp-detail', kwargs={'pk': 'rsvp'}),
+    Endpoint('rsvp-bulk', 'rsvp-bulk', 'post', actor='guest', format='json',
+             data=lambda fixtures: {'rsvps': [{'event': fixtures['event'], 'status': 'Going'}]}),
+    Endpoint('review-list', 'review-list'),
+    Endpoint('review-detail', 'review-detail', kwargs={'pk': 'review'}),
+]
+
+
+def route_names():
+    """Names of every route in events/urls.py, including the API router's"""
+    names = set()
+    for pattern in events_urls.urlpatterns + events_urls.router.urls:
+        if getattr(pattern, 'name', None):
+            names.add(pattern.name)
+        for included in getattr(pattern, 'url_patterns', []):
+            if included.name:
+                names.add(included.name)
+    return names
+
+
+def uncovered_routes():
+    """Routes with no entry in ENDPOINTS"""
+    return sorted(route_names() - {endpoint.route for endpoint in ENDPOINTS})
+
+
+def benchmark_fixtures():
+    """
+    Ids the endpoints are requested with: the most attended past public
+    event, its organizer, a "Going" attendee who reviewed it (``member``,
+    with their RSVP and review) and a user who has not RSVP'd (``guest``).
+    """
+    # A "Going" reviewer, so the RSVP endpoints make the same change at every scale
+    going_reviews = Review.objects.filter(
+        event=OuterRef('pk'), user__rsvp__event=OuterRef('pk'), user__rsvp__status='Going',
+    ).exclude(user=OuterRef('organizer'))
+    event = (
+        Event.objects.filter(is_public=True, start_time__lt=timezone.now())
+        .alias(attendees=F('going_count') + F('maybe_count') + F('not_going_count'))
+        # Leave room for a guest besides the organizer
+        .filter(Exists(going_reviews), attendees__lt=User.objects.count() - 1)
+        .order_by('-going_count', 'id').first()
+    )
+    if event is None:
+        raise ValueError('The dataset has no reviewed public event to benchmark with.')
+    review = (
+        Review.objects.filter(event=event, user__rsvp__event=event, user__rsvp__status='Going')
+        .exclude(user=event.organizer_id).order_by('user_id').first()
+    )
+    guest = (
+        User.objects.exclude(pk=event.organizer_id)
+        .exclude(pk__in=RSVP.objects.filter(event=event).values('user'))
+        .order_by('id').first()
+    )
+    return {
+        'event': event.id,
+        'organizer': event.organizer_id,
+        'member': review.user_id,
+        'rsvp': RSVP.objects.get(event=event, user=review.user_id).id,
+        'review': review.id,
+        'guest': guest.id,
+    }
+
+
+def _client(actor, fixtures):
+    client = APIClient()
+    if actor == 'scraper':
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {METRICS_TOKEN}')
+    elif actor != 'anonymous':
+        user = User.objects.get(pk=fixtures[actor])
+        # Sessions for the pages, a bearer token for the API
+        client.force_login(user)
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return client
+
+
+def _application_queries(queries):
+    # Savepoints stand in for the BEGIN/COMMIT of autocommit requests, which are not logged
+    return [query['sql'] for query in queries if 'SAVEPOINT' not in query['sql']]
+
+
+def query_shape(sql):
+    """A statement with its literals taken out, so the same query with other parameters matches"""
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'\b\d+(?:\.\d+)?\b', '?', sql)
+    return re.sub(r'\((?:\?, )+\?\)', '(?)', sql)
+
+
+def most_repeated(queries):
+    """How often the most frequent query shape ran; one per row on a page is an N+1"""
+    return max(Counter(query_shape(sql) for sql in queries).values(), default=0)
+
+
+@contextmanager
+def _timed(samples):
+    started = time.perf_counter()
+    yield
+    samples.append(time.perf_counter() - started)
+
+
+@contextmanager
+def _peak_memory(result):
+    tracemalloc.start()
+    try:
+        yield
+        result['peak'] = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure_endpoint(endpoint, fixtures, clients, repeat):
+    """{'status', 'p50_ms', 'p99_ms', 'queries', 'repeated_queries', 'peak_kib'} of one endpoint"""
+    path = reverse(endpoint.route, kwargs={name: fixtures[key] for name, key in endpoint.kwargs.items()})
+    if endpoint.query:
+        path = f'{path}?{endpoint.query}'
+    cache = get_cache()
+
+    def sample(measurement):
+        client = _client(endpoint.actor, fixtures) if endpoint.fresh else clients[endpoint.actor]
+        data = endpoint.data(fixtures) if callable(endpoint.data) else endpoint.data
+        extra = {'format': endpoint.format} if endpoint.format else {}
+        with rolled_back():
+            cache.clear()
+            # Start each sample without garbage left by the previous ones
+            gc.collect()
+            with measurement:
+                return getattr(client, endpoint.method)(path, data, **extra)
+
+    # One untimed request warms up imports, templates and the auth cache
+    sample(nullcontext())
+    samples = []
+    for _ in range(repeat):
+        response = sample(_timed(samples))
+    # Each request empties the query log (request_started), so the log
+    # starts out empty and is read before the next request
+    reset_queries()
+    with CaptureQueriesContext(connection) as captured:
+        sample(nullcontext())
+    queries = _application_queries(captured.captured_queries)
+    memory = {}
+    sample(_peak_memory(memory))
+
+    return {
+        'status': response.status_code,
+        'p50_ms': round(percentile(samples, 50) * 1000, 3),
+        'p99_ms': round(percentile(samples, 99) * 1000, 3),
+        'queries': len(queries),
+        'repeated_queries': most_repeated(queries),
+        'peak_kib': math.ceil(memory['peak'] / 1024),
+    }
+
+
+def run_endpoint_benchmark(scales, repeat=None, seed=0, endpoints=None, log=None):
+    """
+    Benchmark ``endpoints`` (all of ENDPOINTS by default) at each named scale
+    and return the report. The seeded data is rolled back afterwards.
+    """
+    config = benchmark_settings()
+    repeat = repeat or config['REPEAT']
+    endpoints = ENDPOINTS if endpoints is None else endpoints
+    log = log or (lambda message: None)
+    report = {
+        'version': REPORT_VERSION,
+        'created_at': timezone.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+        },
+        'repeat': repeat,
+        'seed': seed,
+        'scales': {},
+    }
+    metrics = {**settings.EVENTS_METRICS, 'TOKEN': METRICS_TOKEN}
+    # DEBUG would log every query of the timed requests
+    with override_settings(ALLOWED_HOSTS=['testserver'], DEBUG=False, EVENTS_METRICS=metrics):
+        for scale in scales:
+            sizes = config['SCALES'][scale]
+            with rolled_back():
+                started = time.perf_counter()
+                rows = generate_synthetic_data(**sizes, seed=seed, prefix='endpoint_bench')
+                log(f'{scale}: seeded {rows["rsvps"]} RSVPs in {time.perf_counter() - started:.1f}s')
+                fixtures = benchmark_fixtures()
+                clients = {
+                    actor: _client(actor, fixtures)
+                    for actor in ('anonymous', 'member', 'organizer', 'guest', 'scraper')
+                }
+                results = {}
+                for endpoint in endpoints:
+                    results[endpoint.name] = measure_endpoint(endpoint, fixtures, clients, repeat)
+                    log(f'{scale}: {endpoint.name} {results[endpoint.name]}')
+            report['scales'][scale] = {'rows': rows, 'endpoints': results}
+    return report
+
+
+def endpoint_errors(report, endpoints=None):
+    """Endpoints that answered with another status than expected"""
+    expected = {endpoint.name: endpoint.status for endpoint in (ENDPOINTS if endpoints is None else endpoints)}
+    return [
+        f'{scale} {name}: status {result["status"]}, expected {expected[name]}'
+        for scale, data in report['scales'].items()
+        for name, result in data['endpoints'].items()
+        if name in expected and result['status'] != expected[name]
+    ]
+
+
+def scaling_regressions(report):
+    """Endpoints making more queries on a larger dataset than on the smallest one"""
+    scales = sorted(report['scales'].values(), key=lambda data: sum(data['rows'].values()))
+    if len(scales) < 2:
+        return []
+    regressions = []
+    smallest = scales[0]['endpoints']
+    for scale_name, data in report['scales'].items():
+        for name, result in data['endpoints'].items():
+            if name in smallest and result['queries'] > smallest[name]['queries']:
+                regressions.append(
+                    f'{scale_name} {name}: {result["queries"]} queries, {smallest[name]["queries"]} '
+                    f'on the smallest dataset'
+                )
+    return regressions
+
+
+def repeated_query_regressions(report, limit=None):
+    """Endpoints running the same query, with other parameters, more than ``limit`` times"""
+    limit = benchmark_settings()['THRESHOLDS']['REPEATED_QUERIES'] if limit is None else limit
+    return [
+        f'{scale} {name}: one query ran {result["repeated_queries"]} times, likely an N+1'
+        for scale, data in report['scales'].items()
+        for name, result in data['endpoints'].items()
+        if result['repeated_queries'] > limit
+    ]
+
+
+def compare_reports(report, baseline, thresholds=None):
+    """Regressions of ``report`` against ``baseline``, for scales and endpoints in both"""
+    thresholds = {**benchmark_settings()['THRESHOLDS'], **(thresholds or {})}
+    regressions = []
+    for scale, data in report['scales'].items():
+        base_endpoints = baseline.get('scales', {}).get(scale, {}).get('endpoints', {})
+        for name, result in data['endpoints'].items():
+            base = base_endpoints.get(name)
+            if base is None:
+                continue
+            where = f'{scale} {name}'
+            if result['status'] != base['status']:
+                regressions.append(f'{where}: status {base["status"]} -> {result["status"]}')
+            if result['queries'] > base['queries'] + thresholds['QUERIES']:
+                regressions.append(f'{where}: queries {base["queries"]} -> {result["queries"]}')
+            for metric, limit, floor, unit in (
+                ('p50_ms', thresholds['P50'], thresholds['MIN_MS'], 'ms'),
+                ('p99_ms', thresholds['P99'], thresholds['MIN_MS'], 'ms'),
+                ('peak_kib', thresholds['PEAK_MEMORY'], thresholds['MIN_KIB'], 'KiB'),
+            ):
+                if result[metric] > base[metric] * limit and result[metric] - base[metric] > floor:
+                    regressions.append(f'{where}: {metric} {base[metric]} -> {result[metric]} {unit}')
+    return regressions
+
+
+def load_report(path):
+    with open(path, encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+def write_report(report, path):
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump(report, handle, indent=2, sort_keys=True)
+        handle.write('\n')
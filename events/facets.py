@@ -0,0 +1,136 @@
+"""
+Filter facets for the event list: organizers, locations and date buckets,
+each with the number of events the viewer can see.
+
+All three come from one grouped query over the visible events, grouped by
+(organizer, location, date bucket) and folded together in Python. Results
+are cached in the response cache alias per visibility class (anonymous
+viewers share one entry, each signed-in user has their own) under the
+event list version, so any event or RSVP change makes them stale at once.
+Date buckets start at local midnight and the date is part of the key.
+"""
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Case, CharField, Count, Value, When
+from django.utils import timezone
+
+from .cache import LIST_VERSION_KEY, get_cache, get_version
+from .visibility import visible_events
+
+DEFAULTS = {
+    'TIMEOUT': 300,
+    'LOCATION_LIMIT': 20,
+}
+
+# (value, label, days from today's midnight the bucket ends at)
+DATE_BUCKETS = (
+    ('past', 'Past', 0),
+    ('today', 'Today', 1),
+    ('week', 'Next 7 days', 7),
+    ('month', 'Next 30 days', 30),
+    ('later', 'Later', None),
+)
+
+
+def facet_settings():
+    return {**DEFAULTS, **getattr(settings, 'EVENTS_FACETS', {})}
+
+
+def _today():
+    return timezone.localdate()
+
+
+def _midnight(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def date_bucket_range(value, today=None):
+    """(start, end) of a date bucket, either may be None; None for unknown buckets"""
+    midnight = _midnight(today or _today())
+    start = None
+    for bucket, _, days in DATE_BUCKETS:
+        end = midnight + timedelta(days=days) if days is not None else None
+        if bucket == value:
+            return start, end
+        start = end
+    return None
+
+
+def _bucket_expression(today):
+    midnight = _midnight(today)
+    whens = [
+        When(start_time__lt=midnight + timedelta(days=days), then=Value(bucket))
+        for bucket, _, days in DATE_BUCKETS if days is not None
+    ]
+    return Case(*whens, default=Value(DATE_BUCKETS[-1][0]), output_field=CharField())
+
+
+def _facets_key(user, today):
+    viewer = f'user:{user.pk}' if user.is_authenticated else 'anon'
+    return f'events:facets:{viewer}:{today.isoformat()}:{get_version(LIST_VERSION_KEY)}'
+
+
+def _facets_query(user, today):
+    return (
+        visible_events(user)
+        .order_by()
+        .annotate(bucket=_bucket_expression(today))
+        .values('organizer_id', 'organizer__username', 'location', 'bucket')
+        .annotate(count=Count('id'))
+    )
+
+
+def _fold(rows):
+    organizers = {}
+    locations = {}
+    buckets = dict.fromkeys([bucket for bucket, _, _ in DATE_BUCKETS], 0)
+    for row in rows:
+        organizer = organizers.setdefault(
+            row['organizer_id'], {'id': row['organizer_id'], 'username': row['organizer__username'], 'count': 0},
+        )
+        organizer['count'] += row['count']
+        locations[row['location']] = locations.get(row['location'], 0) + row['count']
+        buckets[row['bucket']] += row['count']
+
+    location_limit = facet_settings()['LOCATION_LIMIT']
+    return {
+        'organizers': sorted(organizers.values(), key=lambda organizer: organizer['username'].lower()),
+        'locations': [
+            {'value': location, 'count': count}
+            for location, count in sorted(locations.items(), key=lambda item: (-item[1], item[0]))[:location_limit]
+        ],
+        'dates': [
+            {'value': bucket, 'label': label, 'count': buckets[bucket]}
+            for bucket, label, _ in DATE_BUCKETS if buckets[bucket]
+        ],
+    }
+
+
+def event_facets(user):
+    """
+    {'organizers': [{'id', 'username', 'count'}], 'locations': [{'value',
+    'count'}], 'dates': [{'value', 'label', 'count'}]} for the events the
+    user may see. Locations are the most common ones only.
+    """
+    today = _today()
+    key = _facets_key(user, today)
+    cache = get_cache()
+    facets = cache.get(key)
+    if facets is None:
+        facets = _fold(_facets_query(user, today))
+        cache.set(key, facets, facet_settings()['TIMEOUT'])
+    return facets
+
+
+async def aevent_facets(user):
+    """event_facets() for async views"""
+    today = _today()
+    key = await sync_to_async(_facets_key)(user, today)
+    cache = get_cache()
+    facets = await cache.aget(key)
+    if facets is None:
+        facets = _fold([row async for row in _facets_query(user, today)])
+        await cache.aset(key, facets, facet_settings()['TIMEOUT'])
+    return facets
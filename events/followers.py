@@ -0,0 +1,80 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import OrganizerFollower, RSVP
+
+
+def apply_follower_deltas(changes):
+    """
+    Apply (organizer_id, follower_id, delta) changes to the "Going" counts.
+
+    Pairs are grouped so the number of queries depends on the number of
+    organizers, not of followers. Rows that drop to zero are deleted.
+    """
+    totals = Counter()
+    for organizer_id, follower_id, delta in changes:
+        totals[(organizer_id, follower_id)] += delta
+
+    grouped = defaultdict(list)
+    for (organizer_id, follower_id), delta in totals.items():
+        if delta:
+            grouped[(organizer_id, delta)].append(follower_id)
+    if not grouped:
+        return
+
+    OrganizerFollower.objects.bulk_create(
+        [
+            OrganizerFollower(organizer_id=organizer_id, follower_id=follower_id)
+            for (organizer_id, delta), follower_ids in grouped.items() if delta > 0
+            for follower_id in follower_ids
+        ],
+        ignore_conflicts=True,
+    )
+    for (organizer_id, delta), follower_ids in grouped.items():
+        pairs = OrganizerFollower.objects.filter(organizer_id=organizer_id, follower_id__in=follower_ids)
+        if delta > 0:
+            pairs.update(going_count=F('going_count') + delta)
+        else:
+            # Never go negative on drifted data; rebuild_followers repairs it
+            pairs.update(going_count=Greatest(F('going_count') + delta, 0))
+            pairs.filter(going_count=0).delete()
+
+
+def remove_event_followers(event):
+    """
+    Take an event's "Going" RSVPs off its organizer's follower counts, in
+    two queries however many there are. Called before the event is deleted.
+    """
+    # One RSVP per (event, user), so each of these followers loses one
+    pairs = OrganizerFollower.objects.filter(
+        organizer_id=event.organizer_id,
+        follower__in=RSVP.objects.filter(event_id=event.pk, status='Going').values('user'),
+    )
+    pairs.update(going_count=Greatest(F('going_count') - 1, 0))
+    pairs.filter(going_count=0).delete()
+
+
+def rebuild_followers(batch_size=5000):
+    """Recompute the follower table from the RSVP table; returns the number of rows"""
+    pairs = (
+        RSVP.objects.filter(status='Going')
+        .order_by()
+        .values_list('event__organizer_id', 'user_id')
+        .annotate(going=Count('id'))
+    )
+    total = 0
+    with transaction.atomic():
+        OrganizerFollower.objects.all().delete()
+        batch = []
+        for organizer_id, follower_id, going in pairs.iterator(chunk_size=batch_size):
+            batch.append(OrganizerFollower(organizer_id=organizer_id, follower_id=follower_id, going_count=going))
+            if len(batch) >= batch_size:
+                OrganizerFollower.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        OrganizerFollower.objects.bulk_create(batch)
+        total += len(batch)
+    return total
@@ -23,6 +23,16 @@ class EventForm(forms.ModelForm):
             raise forms.ValidationError("Location is required.")
         return location.strip()
 
+    def clean(self):
+        cleaned_data = super().clean()
+        start_time = cleaned_data.get('start_time')
+        end_time = cleaned_data.get('end_time')
+
+        if start_time and end_time and end_time <= start_time:
+            raise forms.ValidationError("End time must be greater than start time.")
+
+        return cleaned_data
+
 
 class ReviewForm(forms.ModelForm):
     class Meta:
@@ -104,12 +114,13 @@ class CustomAuthenticationForm(AuthenticationForm):
 class UserProfileForm(forms.ModelForm):
     class Meta:
         model = UserProfile
-        fields = ['full_name', 'bio', 'location', 'profile_picture']
+        fields = ['full_name', 'bio', 'location', 'profile_picture', 'notification_digest']
         widgets = {
             'full_name': forms.TextInput(attrs={'class': 'form-control'}),
             'bio': forms.Textarea(attrs={'class': 'form-control', 'rows': 4}),
             'location': forms.TextInput(attrs={'class': 'form-control'}),
             'profile_picture': forms.FileInput(attrs={'class': 'form-control'}),
+            'notification_digest': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         }
     
     def clean_full_name(self):
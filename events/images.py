@@ -0,0 +1,130 @@
+"""
+Resized variants of uploaded profile pictures.
+
+Uploads are stored as they arrive; ``process_profile_picture`` then runs in
+a worker (queued through the outbox by the register and profile views)
+and writes one square variant per size in ``EVENTS_PROFILE_IMAGES``. The
+variants are re-encoded as WebP, which drops EXIF, GPS and colour profile
+metadata, and are named after a hash of their content, so their URLs never
+change meaning and can be cached for as long as a client likes.
+
+``UserProfile.profile_picture_variants`` maps each size name to its file,
+plus ``source`` for the upload they were made from. Pages fall back to the
+original upload until the variants exist.
+"""
+import hashlib
+import io
+import logging
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import F, Q
+from django.db.models.fields.json import KT
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import UserProfile
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    # Size name: edge length in pixels
+    'SIZES': {'sm': 64, 'md': 150, 'lg': 400},
+    'FORMAT': 'WEBP',
+    'QUALITY': 80,
+    'PREFIX': 'profiles/variants/',
+}
+
+EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg', 'PNG': 'png'}
+
+# Refuse decompression bombs well before they exhaust a worker's memory
+MAX_SOURCE_PIXELS = 50_000_000
+
+
+def image_settings():
+    return {**DEFAULTS, **getattr(settings, 'EVENTS_PROFILE_IMAGES', {})}
+
+
+def variants_enabled():
+    return image_settings()['ENABLED']
+
+
+def render_variants(source):
+    """{size name: encoded bytes} for an image file object"""
+    config = image_settings()
+    with Image.open(source) as image:
+        if image.width * image.height > MAX_SOURCE_PIXELS:
+            raise ValueError(f'Image too large: {image.width}x{image.height}')
+        # Apply the EXIF orientation before the metadata is dropped
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        if config['FORMAT'] == 'JPEG':
+            image = image.convert('RGB')
+
+        variants = {}
+        for name, edge in config['SIZES'].items():
+            resized = ImageOps.fit(image, (edge, edge), Image.LANCZOS)
+            buffer = io.BytesIO()
+            # No exif= or icc_profile= is passed, so none is written
+            resized.save(buffer, config['FORMAT'], quality=config['QUALITY'], method=4)
+            variants[name] = buffer.getvalue()
+    return variants
+
+
+def variant_name(content, edge):
+    config = image_settings()
+    digest = hashlib.sha256(content).hexdigest()[:20]
+    return f'{config["PREFIX"]}{digest}-{edge}.{EXTENSIONS.get(config["FORMAT"], "img")}'
+
+
+def store_variants(rendered):
+    """Save rendered variants under content-hashed names; returns {size name: storage name}"""
+    sizes = image_settings()['SIZES']
+    names = {}
+    for name, content in rendered.items():
+        path = variant_name(content, sizes[name])
+        # Same name means same bytes, so an existing file is already right
+        if not default_storage.exists(path):
+            path = default_storage.save(path, ContentFile(content))
+        names[name] = path
+    return names
+
+
+def process_profile_picture(profile_id, force=False):
+    """
+    Build the variants of a profile's current picture. Returns the stored
+    variants dict, or None when the profile is gone or has no picture.
+    """
+    profile = UserProfile.objects.filter(pk=profile_id).first()
+    if profile is None:
+        return None
+    source = profile.profile_picture.name if profile.profile_picture else ''
+    if not source:
+        if profile.profile_picture_variants:
+            UserProfile.objects.filter(pk=profile_id).update(profile_picture_variants={})
+        return None
+    if not force and profile.profile_picture_variants.get('source') == source:
+        return profile.profile_picture_variants
+
+    try:
+        with profile.profile_picture.open('rb') as upload:
+            rendered = render_variants(upload)
+    except (OSError, UnidentifiedImageError, ValueError, Image.DecompressionBombError) as exc:
+        logger.warning('Could not process profile picture %s: %s', source, exc)
+        return None
+
+    variants = {'source': source, **store_variants(rendered)}
+    # A newer upload may have landed meanwhile; its own task will handle it
+    UserProfile.objects.filter(pk=profile_id, profile_picture=source).update(profile_picture_variants=variants)
+    return variants
+
+
+def stale_profiles():
+    """Profiles whose picture has no variants yet, or variants of an older upload"""
+    return (
+        UserProfile.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+        .annotate(variant_source=KT('profile_picture_variants__source'))
+        # The IS NOT NULL keeps profiles without variants when negated
+        .exclude(Q(variant_source=F('profile_picture')) & Q(variant_source__isnull=False))
+    )
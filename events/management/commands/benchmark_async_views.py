@@ -0,0 +1,113 @@
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.utils import timezone
+from events.benchmark import PooledWSGIServer, format_ms, http_load, percentile, serve_asgi
+from events.cache import invalidate_event
+from events.models import Event
+
+SERVERS = ('wsgi', 'asgi')
+ORGANIZER = 'bench_async_views'
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare throughput of the read views under WSGI (a fixed pool of sync threads) '
+        'and ASGI (the async views) with many slow concurrent clients'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=500, help='Concurrent clients')
+        parser.add_argument('--requests', type=int, default=4, help='Requests per client')
+        parser.add_argument('--slow', type=float, default=0.2,
+                            help='Seconds each client pauses while sending its headers')
+        parser.add_argument('--threads', type=int, default=16, help='WSGI worker threads')
+        parser.add_argument('--events', type=int, default=200, help='Number of events to seed')
+        parser.add_argument('--paths', default='/,/api/events/', help='Comma-separated paths to request')
+        parser.add_argument('--cache', action='store_true', help='Keep the response cache enabled')
+        parser.add_argument('--serve', choices=SERVERS, help=argparse.SUPPRESS)
+        parser.add_argument('--port', type=int, default=0, help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['serve']:
+            self._serve(options)
+            return
+
+        # The servers run in child processes, so the seeded rows are
+        # committed and removed again at the end
+        organizer, _ = User.objects.get_or_create(username=ORGANIZER, defaults={'password': '!'})
+        try:
+            now = timezone.now()
+            Event.objects.bulk_create([
+                Event(
+                    title=f'Async benchmark event {i}',
+                    description='Benchmark',
+                    organizer=organizer,
+                    location='Benchmark',
+                    start_time=now + timedelta(hours=i),
+                    end_time=now + timedelta(hours=i + 1),
+                )
+                for i in range(options['events'])
+            ])
+            invalidate_event()
+            paths = options['paths'].split(',')
+            self.stdout.write(
+                f'{options["connections"]} clients x {options["requests"]} requests, '
+                f'{options["slow"]}s slow headers, paths {", ".join(paths)}'
+            )
+            self.stdout.write(f'{"server":<6}  {"req/s":>8}  {"p50":>12}  {"p99":>12}  {"failed":>6}')
+            for server in SERVERS:
+                self._run(server, paths, options)
+        finally:
+            Event.objects.filter(organizer=organizer).delete()
+            organizer.delete()
+            invalidate_event()
+
+    def _run(self, server, paths, options):
+        command = [
+            sys.executable, '-m', 'django', 'benchmark_async_views',
+            '--serve', server, '--threads', str(options['threads']),
+        ]
+        if options['cache']:
+            command.append('--cache')
+        env = dict(os.environ, EVENTS_ASYNC_VIEWS='1' if server == 'asgi' else '0')
+        process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env, stdout=subprocess.PIPE, text=True)
+        try:
+            port = int(process.stdout.readline().split()[-1])
+            latencies, failures, elapsed = asyncio.run(http_load(
+                '127.0.0.1', port, paths, options['connections'], options['requests'], options['slow'],
+            ))
+        finally:
+            process.terminate()
+            process.wait()
+        self.stdout.write(
+            f'{server:<6}  {len(latencies) / elapsed:>8.1f}  {format_ms(percentile(latencies, 50)):>12}  '
+            f'{format_ms(percentile(latencies, 99)):>12}  {failures:>6}'
+        )
+
+    def _serve(self, options):
+        def ready(port):
+            self.stdout.write(f'Listening on {port}')
+            self.stdout.flush()
+
+        cache = {**settings.EVENTS_RESPONSE_CACHE, 'ENABLED': options['cache']}
+        with override_settings(EVENTS_RESPONSE_CACHE=cache):
+            if options['serve'] == 'asgi':
+                from django.core.asgi import get_asgi_application
+
+                asyncio.run(serve_asgi(get_asgi_application(), port=options['port'], ready=ready))
+            else:
+                from django.core.wsgi import get_wsgi_application
+
+                address = ('127.0.0.1', options['port'])
+                with PooledWSGIServer(address, get_wsgi_application(), options['threads']) as server:
+                    ready(server.server_address[1])
+                    server.serve_forever()
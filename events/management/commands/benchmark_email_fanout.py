@@ -0,0 +1,87 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import send_mail
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.utils import timezone
+from event_management.celery import app
+from events.benchmark import SMTPSink, rolled_back
+from events.models import Event, RSVP
+from events.tasks import event_updated_recipients, send_event_notification
+
+
+class Command(BaseCommand):
+    help = 'Measure event notification throughput against a local SMTP stand-in'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipients', type=int, default=100000)
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help='Messages per SMTP connection (defaults to EVENTS_EMAIL_CHUNK_SIZE)')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            event = self._seed(options['recipients'], options['batch_size'])
+            with SMTPSink() as sink:
+                email_settings = {
+                    'EMAIL_BACKEND': 'django.core.mail.backends.smtp.EmailBackend',
+                    'EMAIL_HOST': sink.host,
+                    'EMAIL_PORT': sink.port,
+                    'EMAIL_USE_TLS': False,
+                    'EMAIL_HOST_USER': '',
+                    'EMAIL_HOST_PASSWORD': '',
+                    'EVENTS_EMAIL_CHUNK_SIZE': options['chunk_size'] or settings.EVENTS_EMAIL_CHUNK_SIZE,
+                }
+                with override_settings(**email_settings):
+                    self._run(event, sink)
+
+    def _seed(self, total, batch_size):
+        self.stdout.write(f'Seeding {total} recipients...')
+        User.objects.bulk_create(
+            [User(username=f'bench_email_{i}', email=f'bench_email_{i}@example.com', password='!')
+             for i in range(total + 1)],
+            batch_size=batch_size,
+        )
+        users = User.objects.filter(username__startswith='bench_email_').order_by('id')
+        organizer = users.first()
+        now = timezone.now()
+        event = Event.objects.create(
+            title='Benchmark event', description='Benchmark', organizer=organizer, location='Benchmark',
+            start_time=now + timedelta(days=1), end_time=now + timedelta(days=1, hours=1),
+        )
+        batch = []
+        for user_id in users.exclude(pk=organizer.pk).values_list('id', flat=True).iterator():
+            batch.append(RSVP(event=event, user_id=user_id, status='Going'))
+            if len(batch) >= batch_size:
+                RSVP.objects.bulk_create(batch)
+                batch = []
+        RSVP.objects.bulk_create(batch)
+        return event
+
+    def _run(self, event, sink):
+        self.stdout.write(f'{"strategy":<22}  {"seconds":>8}  {"rcpt/s":>8}  {"messages":>9}  {"recipients":>10}  {"connections":>11}')
+
+        # Before: one message listing every recipient
+        started = time.perf_counter()
+        send_mail('Benchmark', 'Benchmark', settings.DEFAULT_FROM_EMAIL, list(event_updated_recipients(event)))
+        self._report('single send_mail', time.perf_counter() - started, sink)
+
+        # After: chunked subtasks, run inline instead of through a broker
+        sink.reset()
+        eager = app.conf.task_always_eager
+        app.conf.task_always_eager = True
+        try:
+            started = time.perf_counter()
+            send_event_notification(event.id, 'event_updated')
+            self._report('chunked fan-out', time.perf_counter() - started, sink)
+        finally:
+            app.conf.task_always_eager = eager
+
+    def _report(self, label, elapsed, sink):
+        rate = sink.recipients / elapsed if elapsed else 0
+        self.stdout.write(
+            f'{label:<22}  {elapsed:>8.2f}  {rate:>8.0f}  {sink.messages:>9}  {sink.recipients:>10}  {sink.connections:>11}'
+        )
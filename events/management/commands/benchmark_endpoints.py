@@ -0,0 +1,90 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from events.endpoint_benchmark import (
+    ENDPOINTS, benchmark_settings, compare_reports, endpoint_errors, load_report, repeated_query_regressions,
+    run_endpoint_benchmark, scaling_regressions, uncovered_routes, write_report,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure p50/p99 latency, query count and peak memory of every endpoint on synthetic datasets, '
+        'and fail on regressions against a baseline report (runs in a rolled-back transaction)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', action='append', dest='scales', choices=sorted(benchmark_settings()['SCALES']),
+            help='Dataset size to run at (may be repeated; defaults to small and medium)',
+        )
+        parser.add_argument('--repeat', type=int, help='Timed requests per endpoint')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--endpoint', action='append', dest='endpoints',
+            help='Only benchmark endpoints whose name starts with this (may be repeated)',
+        )
+        parser.add_argument('--output', help="Write the JSON report to this file ('-' for standard output)")
+        parser.add_argument('--baseline', help='Report to compare against')
+        for name, metric in (('p50', 'P50'), ('p99', 'P99'), ('memory', 'PEAK_MEMORY')):
+            parser.add_argument(
+                f'--max-{name}-ratio', type=float, dest=metric,
+                help=f'Largest allowed {name} ratio to the baseline',
+            )
+        parser.add_argument('--max-extra-queries', type=int, dest='QUERIES', help='Queries allowed over the baseline')
+
+    def handle(self, *args, **options):
+        for route in uncovered_routes():
+            self.stderr.write(f'Route "{route}" has no endpoint benchmark.')
+
+        endpoints = ENDPOINTS
+        if options['endpoints']:
+            endpoints = [
+                endpoint for endpoint in ENDPOINTS
+                if any(endpoint.name.startswith(prefix) for prefix in options['endpoints'])
+            ]
+            if not endpoints:
+                raise CommandError('No endpoint matches --endpoint.')
+        baseline = load_report(options['baseline']) if options['baseline'] else None
+
+        try:
+            report = run_endpoint_benchmark(
+                options['scales'] or ['small', 'medium'], options['repeat'], options['seed'], endpoints,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        for scale, data in report['scales'].items():
+            rows = ', '.join(f'{count} {name}' for name, count in data['rows'].items())
+            self.stdout.write(f'\n{scale}: {rows}')
+            self.stdout.write(
+                f'{"endpoint":<28}  {"status":>6}  {"p50 ms":>9}  {"p99 ms":>9}  {"queries":>7}  {"repeated":>8}  '
+                f'{"peak KiB":>8}'
+            )
+            for name, result in data['endpoints'].items():
+                self.stdout.write(
+                    f'{name:<28}  {result["status"]:>6}  {result["p50_ms"]:>9.2f}  {result["p99_ms"]:>9.2f}  '
+                    f'{result["queries"]:>7}  {result["repeated_queries"]:>8}  {result["peak_kib"]:>8}'
+                )
+
+        if options['output'] == '-':
+            self.stdout.write(json.dumps(report, indent=2, sort_keys=True))
+        elif options['output']:
+            write_report(report, options['output'])
+            self.stdout.write(f'\nReport written to {options["output"]}')
+
+        problems = (
+            endpoint_errors(report, endpoints) + scaling_regressions(report)
+            + repeated_query_regressions(report)
+        )
+        if baseline is not None:
+            thresholds = {
+                metric: options[metric] for metric in ('P50', 'P99', 'PEAK_MEMORY', 'QUERIES')
+                if options[metric] is not None
+            }
+            problems += compare_reports(report, baseline, thresholds)
+        if problems:
+            for problem in problems:
+                self.stderr.write(problem)
+            raise CommandError(f'{len(problems)} endpoint regressions.')
+        self.stdout.write(self.style.SUCCESS('\nAll endpoints within budget.'))
@@ -0,0 +1,98 @@
+import time
+from contextlib import ExitStack
+
+from celery.contrib.testing.worker import start_worker
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from event_management.celery import app
+from events.benchmark import SMTPSink, format_ms, percentile
+from events.routing import BULK_QUEUE, TRANSACTIONAL_QUEUE, notification_queue
+from events.tasks import fan_out_notification, send_notification_chunk
+
+DEFAULT_QUEUE = 'celery'
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure RSVP confirmation latency while a bulk notification blast drains, '
+        'on one shared queue and on the routed queues (in-memory broker, local SMTP stand-in)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipients', type=int, default=5000, help='Size of the bulk blast')
+        parser.add_argument('--chunk-size', type=int, default=100)
+        parser.add_argument('--confirmations', type=int, default=20)
+        parser.add_argument('--interval', type=float, default=0.05, help='Seconds between confirmations')
+        parser.add_argument('--smtp-delay', type=float, default=0.001, help='Seconds the SMTP server spends per message')
+        parser.add_argument('--bulk-rate', type=int, default=0, help='Bulk queue messages per second (0: unlimited)')
+
+    def handle(self, *args, **options):
+        # Settings are loaded lazily with the CELERY_ namespace: load them
+        # first, then override the namespaced keys so they take precedence
+        app.conf.result_backend
+        app.conf.update(
+            CELERY_BROKER_URL='memory://', CELERY_RESULT_BACKEND='cache+memory://', CELERY_TASK_ALWAYS_EAGER=False,
+            # An idle in-memory queue is polled once a second by default
+            CELERY_BROKER_TRANSPORT_OPTIONS={'polling_interval': 0.01},
+        )
+        with SMTPSink(delay=options['smtp_delay']) as sink:
+            overrides = {
+                'EMAIL_BACKEND': 'django.core.mail.backends.smtp.EmailBackend',
+                'EMAIL_HOST': sink.host,
+                'EMAIL_PORT': sink.port,
+                'EMAIL_USE_TLS': False,
+                'EMAIL_HOST_USER': '',
+                'EMAIL_HOST_PASSWORD': '',
+                'EVENTS_EMAIL_CHUNK_SIZE': options['chunk_size'],
+                'EVENTS_QUEUE_RATE_LIMITS': {'ALIAS': 'default', 'RATES': {BULK_QUEUE: options['bulk_rate']}},
+            }
+            with override_settings(**overrides):
+                self.stdout.write(
+                    f'{"setup":<16}  {"conf p50":>10}  {"conf p99":>10}  {"conf max":>10}  {"bulk drained":>12}'
+                )
+                self._run('single queue', {DEFAULT_QUEUE: 1}, DEFAULT_QUEUE, DEFAULT_QUEUE, sink, options)
+                self._run(
+                    'routed queues', {BULK_QUEUE: 1, TRANSACTIONAL_QUEUE: 1},
+                    BULK_QUEUE, notification_queue('rsvp_confirmation'), sink, options,
+                )
+
+    def _run(self, label, workers, bulk_queue, confirmation_queue, sink, options):
+        sink.reset()
+        total = options['recipients'] + options['confirmations']
+        with ExitStack() as stack:
+            for queue, concurrency in workers.items():
+                stack.enter_context(start_worker(
+                    app, queues=[queue], concurrency=concurrency, pool='solo', perform_ping_check=False,
+                ))
+
+            started = time.perf_counter()
+            recipients = [f'bulk{i}@example.com' for i in range(options['recipients'])]
+            fan_out_notification('New Event Created', 'Bulk', recipients, bulk_queue)
+
+            pending = []
+            latencies = []
+            next_confirmation = time.perf_counter()
+            while len(pending) < options['confirmations'] or pending:
+                now = time.perf_counter()
+                if len(pending) + len(latencies) < options['confirmations'] and now >= next_confirmation:
+                    result = send_notification_chunk.apply_async(
+                        ('RSVP Confirmation', 'See you there', [f'guest{len(latencies) + len(pending)}@example.com']),
+                        queue=confirmation_queue,
+                    )
+                    pending.append((now, result))
+                    next_confirmation = now + options['interval']
+                for item in [item for item in pending if item[1].ready()]:
+                    latencies.append(time.perf_counter() - item[0])
+                    pending.remove(item)
+                if len(latencies) == options['confirmations']:
+                    break
+                time.sleep(0.002)
+
+            while sink.messages < total:
+                time.sleep(0.01)
+            drained = time.perf_counter() - started
+
+        self.stdout.write(
+            f'{label:<16}  {format_ms(percentile(latencies, 50)):>10}  {format_ms(percentile(latencies, 99)):>10}  '
+            f'{format_ms(max(latencies)):>10}  {drained:>11.2f}s'
+        )
@@ -0,0 +1,96 @@
+import io
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.test import Client, RequestFactory
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.views.static import serve
+from events.benchmark import format_ms, percentile, rolled_back, time_call
+from events.images import process_profile_picture
+from events.models import UserProfile
+from PIL import Image
+
+
+def sample_photo(width, height, quality):
+    """A photo-like JPEG with camera metadata, roughly the size of a phone picture"""
+    gradient = Image.linear_gradient('L').resize((width, height))
+    noise = Image.effect_noise((width, height), 40)
+    image = Image.merge('RGB', (gradient, noise, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera Maker'
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=quality, exif=exif)
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare profile picture upload latency, profile page latency and bytes served '
+        'with the original uploads and with the resized variants (runs in a rolled-back transaction)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--width', type=int, default=4032)
+        parser.add_argument('--height', type=int, default=3024)
+        parser.add_argument('--quality', type=int, default=92, help='JPEG quality of the sample upload')
+        parser.add_argument('--repeat', type=int, default=10, help='Samples per measurement')
+
+    def handle(self, *args, **options):
+        photo = sample_photo(options['width'], options['height'], options['quality'])
+        self.stdout.write(f'Sample upload: {options["width"]}x{options["height"]} JPEG, {len(photo) / 1024:.0f} KiB')
+        # The test client's host, and uploads kept out of the real MEDIA_ROOT
+        with tempfile.TemporaryDirectory() as media_root:
+            with override_settings(MEDIA_ROOT=media_root, ALLOWED_HOSTS=['testserver']), rolled_back():
+                user = User.objects.create_user(username='bench_pictures', password='!')
+                profile = UserProfile.objects.create(user=user, full_name='Bench', location='Bench')
+                client = Client()
+                client.force_login(user)
+
+                self.stdout.write(
+                    f'{"setup":<8}  {"upload p50":>12}  {"upload p99":>12}  {"page p50":>12}  {"page p99":>12}  '
+                    f'{"bytes/view":>10}'
+                )
+                for label, enabled in (('before', False), ('after', True)):
+                    config = {**settings.EVENTS_PROFILE_IMAGES, 'ENABLED': enabled}
+                    with override_settings(EVENTS_PROFILE_IMAGES=config):
+                        self._run(label, client, profile, photo, options)
+
+                builds = time_call(lambda: process_profile_picture(profile.id, force=True), options['repeat'])
+                self.stdout.write(
+                    f'Variant build in the worker: p50 {format_ms(percentile(builds, 50))}, '
+                    f'p99 {format_ms(percentile(builds, 99))}'
+                )
+
+    def _run(self, label, client, profile, photo, options):
+        def upload():
+            response = client.post(reverse('profile_edit'), {
+                'full_name': 'Bench', 'bio': '', 'location': 'Bench',
+                'profile_picture': SimpleUploadedFile('photo.jpg', photo, content_type='image/jpeg'),
+            })
+            assert response.status_code == 302, response.status_code
+
+        uploads = time_call(upload, options['repeat'])
+        profile.refresh_from_db()
+        if label == 'after':
+            # What the worker does once the outbox row is relayed
+            process_profile_picture(profile.id)
+            profile.refresh_from_db()
+
+        image_path = profile.picture_url()[len(settings.MEDIA_URL):]
+        request = RequestFactory().get(profile.picture_url())
+        served = {}
+
+        def view_page():
+            page = client.get(reverse('profile'))
+            image = serve(request, image_path, document_root=settings.MEDIA_ROOT)
+            served['bytes'] = len(page.content) + sum(len(chunk) for chunk in image.streaming_content)
+
+        views = time_call(view_page, options['repeat'])
+        self.stdout.write(
+            f'{label:<8}  {format_ms(percentile(uploads, 50)):>12}  {format_ms(percentile(uploads, 99)):>12}  '
+            f'{format_ms(percentile(views, 50)):>12}  {format_ms(percentile(views, 99)):>12}  {served["bytes"]:>10}'
+        )
@@ -0,0 +1,81 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from events.benchmark import format_ms, percentile, rolled_back, time_call
+from events.models import Event
+from events.search import SEARCH_ORDERING, search_events
+
+THEMES = (
+    'jazz rock summit workshop festival startup networking photography marketing charity '
+    'conference bootcamp tasting retreat meetup hackathon lecture concert exhibition gala '
+    'python design community outdoor running yoga wine coffee film theatre poetry science '
+    'robotics gardening cooking painting dance comedy trivia chess board games career'
+).split()
+# Filler vocabulary with a Zipf-like frequency curve, like real prose
+FILLER = [f'lorem{i}' for i in range(5000)]
+FILLER_WEIGHTS = [1 / (rank + 1) for rank in range(len(FILLER))]
+CITIES = ['San Francisco', 'New York', 'Austin', 'Chicago', 'Seattle', 'Boston', 'Denver', 'Miami']
+
+
+class Command(BaseCommand):
+    help = 'Compare icontains search with the FTS5 search backend on a synthetic event table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=100000, help='Number of events to seed')
+        parser.add_argument('--queries', default='jazz,robot,wine tasting,san fran,hackathon python,lorem4321',
+                            help='Comma-separated search strings')
+        parser.add_argument('--repeat', type=int, default=10, help='Samples per measurement')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self._seed(options)
+            self._measure(options)
+
+    def _seed(self, options):
+        rng = random.Random(options['seed'])
+        organizer = User.objects.create(username='bench_search_organizer', password='!')
+        now = timezone.now()
+        self.stdout.write(f'Seeding {options["events"]} events...')
+        batch = []
+        for i in range(options['events']):
+            themes = rng.sample(THEMES, 3)
+            batch.append(Event(
+                title=' '.join(themes).title(),
+                description=' '.join(rng.choices(FILLER, FILLER_WEIGHTS, k=40) + themes),
+                organizer=organizer,
+                location=f'{rng.randint(1, 999)} Main St, {rng.choice(CITIES)}',
+                start_time=now + timedelta(minutes=i),
+                end_time=now + timedelta(minutes=i + 90),
+            ))
+            if len(batch) >= options['batch_size']:
+                Event.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Event.objects.bulk_create(batch)
+
+    def _measure(self, options):
+        self.stdout.write(f'{"query":<22}  {"icontains p50":>14}  {"icontains p99":>14}  {"fts p50":>10}  {"fts p99":>10}')
+        for text in options['queries'].split(','):
+            legacy = time_call(lambda: self._icontains_page(text), options['repeat'])
+            fts = time_call(lambda: self._fts_page(text), options['repeat'])
+            self.stdout.write(
+                f'{text:<22}  {format_ms(percentile(legacy, 50)):>14}  {format_ms(percentile(legacy, 99)):>14}'
+                f'  {format_ms(percentile(fts, 50)):>10}  {format_ms(percentile(fts, 99)):>10}'
+            )
+
+    def _icontains_page(self, text):
+        events = Event.objects.filter(
+            Q(title__icontains=text) |
+            Q(description__icontains=text) |
+            Q(location__icontains=text)
+        ).order_by('start_time', 'id')
+        return list(events[:12])
+
+    def _fts_page(self, text):
+        return list(search_events(Event.objects.all(), text).order_by(*SEARCH_ORDERING)[:12])
@@ -0,0 +1,97 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from events.benchmark import format_ms, percentile, rolled_back, time_call
+from events.models import Event, RSVP
+from events.visibility import visible_events
+
+
+class Command(BaseCommand):
+    help = 'Compare the legacy OR-join visibility filter with visible_events as RSVP volume grows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000',
+                            help='Comma-separated RSVP totals to measure at')
+        parser.add_argument('--events', type=int, default=2000, help='Number of events to seed')
+        parser.add_argument('--repeat', type=int, default=20, help='Samples per measurement')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        with rolled_back():
+            self._run(sizes, options)
+
+    def _run(self, sizes, options):
+        event_total = options['events']
+        batch_size = options['batch_size']
+        user_total = -(-sizes[-1] // event_total) + 2
+
+        self.stdout.write(f'Seeding {user_total} users and {event_total} events...')
+        User.objects.bulk_create(
+            [User(username=f'bench_visibility_{i}', password='!') for i in range(user_total)],
+            batch_size=batch_size,
+        )
+        users = list(User.objects.filter(username__startswith='bench_visibility_').order_by('id'))
+        organizer = users[0]
+        now = timezone.now()
+        Event.objects.bulk_create(
+            [
+                Event(
+                    title=f'Benchmark event {i}',
+                    description='Benchmark',
+                    organizer=organizer,
+                    location='Benchmark',
+                    start_time=now + timedelta(hours=i),
+                    end_time=now + timedelta(hours=i + 1),
+                    is_public=i % 5 != 0,
+                )
+                for i in range(event_total)
+            ],
+            batch_size=batch_size,
+        )
+        event_ids = list(Event.objects.filter(organizer=organizer).order_by('id').values_list('id', flat=True))
+
+        # The viewer RSVPs to a handful of private events, everyone else fills the table
+        viewer = users[1]
+        RSVP.objects.bulk_create(
+            [RSVP(event_id=event_id, user=viewer, status='Going') for event_id in event_ids[::50]]
+        )
+        seeded = RSVP.objects.count()
+
+        self.stdout.write(f'{"RSVPs":>10}  {"legacy p50":>12}  {"legacy p99":>12}  {"new p50":>12}  {"new p99":>12}')
+        for size in sizes:
+            seeded = self._grow_rsvps(users[2:], event_ids, seeded, size, batch_size)
+            legacy = time_call(lambda: self._legacy_page(viewer), options['repeat'])
+            current = time_call(lambda: self._visible_page(viewer), options['repeat'])
+            self.stdout.write(
+                f'{seeded:>10}  {format_ms(percentile(legacy, 50)):>12}  {format_ms(percentile(legacy, 99)):>12}'
+                f'  {format_ms(percentile(current, 50)):>12}  {format_ms(percentile(current, 99)):>12}'
+            )
+
+    def _grow_rsvps(self, users, event_ids, seeded, target, batch_size):
+        # RSVP n belongs to user n // len(event_ids), which keeps (event, user) unique
+        batch = []
+        for n in range(seeded, target):
+            user = users[n // len(event_ids)]
+            batch.append(RSVP(event_id=event_ids[n % len(event_ids)], user=user, status='Going'))
+            if len(batch) >= batch_size:
+                RSVP.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            RSVP.objects.bulk_create(batch)
+        return max(seeded, target)
+
+    def _legacy_page(self, user):
+        events = Event.objects.filter(
+            Q(is_public=True) |
+            Q(organizer=user) |
+            Q(rsvps__user=user)
+        ).distinct().order_by('start_time', 'id')
+        return list(events[:12]), events.count()
+
+    def _visible_page(self, user):
+        events = visible_events(user).order_by('start_time', 'id')
+        return list(events[:12]), events.count()
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from events.images import process_profile_picture, stale_profiles
+from events.models import UserProfile
+from events.outbox import enqueue
+from events.tasks import build_profile_picture_variants
+
+
+class Command(BaseCommand):
+    help = 'Build resized variants for profile pictures uploaded before the image pipeline, or after a size change'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Rebuild every picture, not only stale ones')
+        parser.add_argument('--queue', action='store_true', help='Queue the work for the workers instead')
+
+    def handle(self, *args, **options):
+        profiles = UserProfile.objects.exclude(profile_picture='') if options['all'] else stale_profiles()
+        profile_ids = list(profiles.exclude(profile_picture__isnull=True).values_list('id', flat=True))
+        self.stdout.write(f'Processing {len(profile_ids)} profile pictures...')
+
+        if options['queue']:
+            with transaction.atomic():
+                for profile_id in profile_ids:
+                    enqueue(build_profile_picture_variants, profile_id, force=options['all'])
+            self.stdout.write(self.style.SUCCESS(f'Queued {len(profile_ids)} profile pictures.'))
+            return
+
+        built = 0
+        for profile_id in profile_ids:
+            if process_profile_picture(profile_id, force=options['all']):
+                built += 1
+        self.stdout.write(self.style.SUCCESS(f'Built variants for {built} of {len(profile_ids)} profile pictures.'))
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from events.synthetic import generate_synthetic_data
+
+
+class Command(BaseCommand):
+    help = 'Add seeded synthetic users, events, RSVPs and reviews for load tests and benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--events', type=int, default=20000)
+        parser.add_argument('--rsvps', type=int, default=200000)
+        parser.add_argument('--reviews', type=int, default=50000)
+        parser.add_argument('--seed', type=int, default=0, help='Same seed and sizes, same data')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert')
+        parser.add_argument('--prefix', default='synth', help='Username prefix of the synthetic users')
+        parser.add_argument('--password', default='password123', help='Password of every synthetic user')
+        parser.add_argument('--private-share', type=float, default=0.15, help='Share of private events')
+
+    def handle(self, *args, **options):
+        if not 0 <= options['private_share'] <= 1:
+            raise CommandError('--private-share must be between 0 and 1.')
+        self.stdout.write(
+            f'Generating {options["users"]} users, {options["events"]} events, {options["rsvps"]} RSVPs '
+            f'and {options["reviews"]} reviews (seed {options["seed"]})...'
+        )
+        started = time.perf_counter()
+        try:
+            rows = generate_synthetic_data(
+                options['users'], options['events'], options['rsvps'], options['reviews'],
+                seed=options['seed'], batch_size=options['batch_size'], prefix=options['prefix'],
+                password=options['password'], private_share=options['private_share'],
+                log=lambda message: self.stdout.write(f'  {message}'),
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {rows["users"]} users, {rows["events"]} events, {rows["rsvps"]} RSVPs and '
+            f'{rows["reviews"]} reviews in {time.perf_counter() - started:.1f}s.'
+        ))
@@ -0,0 +1,41 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from events.bulk import IMPORT_FORMATS, ImportReport, detect_import_format, import_events, iter_import_rows
+
+
+class Command(BaseCommand):
+    help = 'Stream events from a CSV or NDJSON file into the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' for standard input")
+        parser.add_argument('--organizer', required=True, help='Username that will organize the imported events')
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help='Input format (defaults to the file extension)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per bulk insert')
+        parser.add_argument('--max-errors', type=int, default=100, help='Row errors to print')
+
+    def handle(self, *args, **options):
+        try:
+            organizer = User.objects.get(username=options['organizer'])
+        except User.DoesNotExist:
+            raise CommandError(f'User "{options["organizer"]}" does not exist.')
+
+        path = options['path']
+        fmt = options['format'] or detect_import_format(path)
+        report = ImportReport(max_errors=options['max_errors'])
+
+        self.stdout.write(f'Importing {fmt} events from {path}...')
+        if path == '-':
+            import_events(organizer, iter_import_rows(sys.stdin, fmt), options['batch_size'], report)
+        else:
+            with open(path, newline='', encoding='utf-8-sig') as stream:
+                import_events(organizer, iter_import_rows(stream, fmt), options['batch_size'], report)
+
+        for error in report.errors:
+            messages = '; '.join(f'{field}: {" ".join(errors)}' for field, errors in error['errors'].items())
+            self.stderr.write(f'Row {error["row"]}: {messages}')
+        if report.failed > len(report.errors):
+            self.stderr.write(f'... and {report.failed - len(report.errors)} more errors')
+
+        self.stdout.write(self.style.SUCCESS(f'Created {report.created} events, {report.failed} rows failed.'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from events.models import Event
+from events.stats import rebuild_event_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized RSVP and review counters on every event'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--event', type=int, action='append', dest='event_ids',
+            help='Only rebuild the given event id (may be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        queryset = Event.objects.all()
+        if options['event_ids']:
+            queryset = queryset.filter(id__in=options['event_ids'])
+
+        self.stdout.write('Rebuilding event counters...')
+        updated = rebuild_event_stats(queryset)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt counters for {updated} events.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from events.followers import rebuild_followers
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the organizer follower table used by event_created notifications'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding organizer followers...')
+        total = rebuild_followers(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total} organizer follower rows.'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand, CommandError
+from events.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for events'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding event search index...')
+        if not rebuild_search_index():
+            raise CommandError('Full-text search requires the SQLite database backend.')
+        self.stdout.write(self.style.SUCCESS('Event search index rebuilt.'))
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from events.outbox import outbox_batch_size, purge_outbox, relay_outbox
+from events.updates import flush_due_updates
+
+
+class Command(BaseCommand):
+    help = 'Hand pending outbox rows (and due coalesced event updates) to Celery, continuously or once'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the outbox once and exit')
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Seconds to wait between polls when the outbox is empty')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Rows claimed per batch (defaults to EVENTS_OUTBOX_BATCH_SIZE)')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size'] or outbox_batch_size()
+        if options['once']:
+            flush_due_updates()
+            purge_outbox()
+            dispatched = relay_outbox(batch_size=batch_size)
+            self.stdout.write(self.style.SUCCESS(f'Dispatched {dispatched} outbox messages'))
+            return
+
+        self.stdout.write(f'Relaying outbox every {options["interval"]}s (Ctrl+C to stop)')
+        try:
+            while True:
+                flush_due_updates()
+                purge_outbox()
+                dispatched = relay_outbox(batch_size=batch_size)
+                if dispatched:
+                    self.stdout.write(f'Dispatched {dispatched} outbox messages')
+                else:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS('Outbox relay stopped'))
@@ -1,4 +1,5 @@
 from django.core.management.base import BaseCommand
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
 from events.models import UserProfile, Event, RSVP, Review
 from django.utils import timezone
@@ -34,12 +35,14 @@ class Command(BaseCommand):
             {'username': 'lisa_garcia', 'email': 'lisa@example.com', 'full_name': 'Lisa Garcia', 'bio': 'Photography enthusiast', 'location': 'Miami, FL'},
         ]
         
+        # Hash the shared password once instead of once per user
+        password_hash = make_password('password123')
         created_users = []
         for user_data in users_data:
-            user = User.objects.create_user(
+            user = User.objects.create(
                 username=user_data['username'],
                 email=user_data['email'],
-                password='password123'
+                password=password_hash
             )
             UserProfile.objects.create(
                 user=user,
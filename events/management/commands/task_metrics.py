@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from events.metrics import reset_metrics, task_summary
+
+
+def _seconds(value):
+    return '-' if value is None else f'{value * 1000:.1f}ms'
+
+
+def _number(value):
+    return '-' if value is None else f'{value:.1f}'
+
+
+class Command(BaseCommand):
+    help = 'Print a per-task summary of the Celery task metrics (run counts, timings, recipients, SMTP errors)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Clear the metrics after printing them')
+
+    def handle(self, *args, **options):
+        rows = task_summary()
+        if not rows:
+            self.stdout.write('No task metrics recorded yet.')
+        else:
+            header = (
+                f'{"task":<44} {"runs":>6} {"ok":>6} {"fail":>5} {"retry":>5} {"errors":>6} '
+                f'{"mean":>9} {"p95":>9} {"queued":>9} {"rcpt":>8} {"rcpt/run":>8} {"sent":>8} {"smtp err":>8}'
+            )
+            self.stdout.write(header)
+            self.stdout.write('-' * len(header))
+            for row in rows:
+                self.stdout.write(
+                    f'{row["task"]:<44} {row["runs"]:>6} {row["success"]:>6} {row["failure"]:>5} '
+                    f'{row["retry"]:>5} {row["errors"]:>6} {_seconds(row["mean_seconds"]):>9} '
+                    f'{_seconds(row["p95_seconds"]):>9} {_seconds(row["mean_queue_seconds"]):>9} '
+                    f'{row["recipients"]:>8} {_number(row["mean_recipients"]):>8} '
+                    f'{row["emails_sent"]:>8} {row["smtp_errors"]:>8}'
+                )
+        if options['reset']:
+            reset_metrics()
+            self.stdout.write(self.style.SUCCESS('Task metrics reset.'))
@@ -0,0 +1,266 @@
+"""
+Task metrics for the Celery workers.
+
+Celery's prerun/postrun signals time every task in the ``events`` app and
+count its outcome; the tasks themselves add recipients, emails sent and
+SMTP errors. Values are kept as counters in the ``EVENTS_METRICS`` cache
+alias, so every process reporting to the same Redis or Memcached
+instance adds up to one set of numbers. Histograms store one counter per
+bucket plus a sum and a count, like Prometheus histograms.
+
+``render_prometheus()`` backs the ``/metrics`` endpoint and
+``task_summary()`` the ``task_metrics`` management command.
+"""
+import itertools
+import threading
+import time
+
+from celery import current_app, current_task
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    'TOKEN': '',
+}
+
+TASK_PREFIX = 'events.'
+PUBLISHED_HEADER = 'events_published_at'
+
+# Sums are stored as integers so they can be updated with an atomic incr
+SUM_SCALE = 1000000
+
+COUNTERS = {
+    'events_task_total': ('Finished task runs by outcome', ('task', 'outcome')),
+    'events_task_errors_total': ('Errors a task caught and reported instead of raising', ('task',)),
+    'events_emails_sent_total': ('Emails accepted by the SMTP server', ('task',)),
+    'events_smtp_errors_total': ('SMTP failures by kind', ('task', 'kind')),
+}
+
+HISTOGRAMS = {
+    'events_task_duration_seconds': (
+        'Task run time',
+        (0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 15, 60, 300),
+    ),
+    'events_task_queue_seconds': (
+        'Time between publishing a task and a worker starting it',
+        (0.01, 0.1, 0.5, 1, 5, 15, 60, 300, 900),
+    ),
+    'events_task_recipients': (
+        'Recipients handled per task run',
+        (1, 10, 50, 100, 500, 1000, 5000, 10000, 50000),
+    ),
+}
+
+LABEL_VALUES = {
+    'outcome': ('success', 'failure', 'retry'),
+    'kind': ('refused', 'connection'),
+}
+
+_started = {}
+_started_lock = threading.Lock()
+
+
+def metrics_settings():
+    return {**DEFAULTS, **getattr(settings, 'EVENTS_METRICS', {})}
+
+
+def get_cache():
+    return caches[metrics_settings()['ALIAS']]
+
+
+def _key(name, labels):
+    return 'events:metrics:' + name + ''.join(f':{value}' for value in labels)
+
+
+def _incr(cache, key, amount):
+    if not amount:
+        return
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        if not cache.add(key, amount, None):
+            cache.incr(key, amount)
+
+
+def inc(name, amount=1, **labels):
+    """Add ``amount`` to a counter; ``labels`` must match its label names"""
+    _, label_names = COUNTERS[name]
+    _incr(get_cache(), _key(name, [labels[label] for label in label_names]), amount)
+
+
+def observe(name, value, task):
+    """Record one observation of a per-task histogram"""
+    _, buckets = HISTOGRAMS[name]
+    cache = get_cache()
+    bucket = next((str(bound) for bound in buckets if value <= bound), '+Inf')
+    _incr(cache, _key(name, [task, 'bucket', bucket]), 1)
+    _incr(cache, _key(name, [task, 'sum']), int(value * SUM_SCALE))
+    _incr(cache, _key(name, [task, 'count']), 1)
+
+
+def current_task_name():
+    task = current_task
+    return task.name if task else None
+
+
+def tracked_tasks():
+    """Names of the registered tasks that metrics are reported for"""
+    if not any(name.startswith(TASK_PREFIX) for name in current_app.tasks):
+        # Outside a worker, task modules are only autodiscovered on demand
+        current_app.loader.import_default_modules()
+    return sorted(name for name in current_app.tasks if name.startswith(TASK_PREFIX))
+
+
+def _series(tasks):
+    """Every (name, labels, key) that can hold a value, in output order"""
+    for name, (_, label_names) in COUNTERS.items():
+        values = [tasks if label == 'task' else LABEL_VALUES[label] for label in label_names]
+        for labels in itertools.product(*values):
+            yield name, dict(zip(label_names, labels)), _key(name, labels)
+    for name, (_, buckets) in HISTOGRAMS.items():
+        for task in tasks:
+            for bound in [str(bound) for bound in buckets] + ['+Inf']:
+                yield name, {'task': task, 'le': bound}, _key(name, [task, 'bucket', bound])
+            yield name + '_sum', {'task': task}, _key(name, [task, 'sum'])
+            yield name + '_count', {'task': task}, _key(name, [task, 'count'])
+
+
+def snapshot(tasks=None):
+    """Current values as a {(name, labels tuple): value} dict, stored values only"""
+    tasks = tracked_tasks() if tasks is None else tasks
+    series = list(_series(tasks))
+    stored = get_cache().get_many([key for _, _, key in series])
+    values = {}
+    for name, labels, key in series:
+        if key in stored:
+            value = stored[key]
+            if name.endswith('_sum'):
+                value = value / SUM_SCALE
+            values[(name, tuple(labels.items()))] = value
+    return values
+
+
+def reset_metrics(tasks=None):
+    tasks = tracked_tasks() if tasks is None else tasks
+    get_cache().delete_many([key for _, _, key in _series(tasks)])
+
+
+def _bucket_counts(values, name, task):
+    """Cumulative (bound, count) pairs of a histogram"""
+    _, buckets = HISTOGRAMS[name]
+    total = 0
+    counts = []
+    for bound in [str(bound) for bound in buckets] + ['+Inf']:
+        total += values.get((name, (('task', task), ('le', bound))), 0)
+        counts.append((bound, total))
+    return counts
+
+
+def render_prometheus(values=None):
+    """Text exposition format, version 0.0.4"""
+    values = snapshot() if values is None else values
+    lines = []
+    for name, (help_text, _) in COUNTERS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for (series, labels), value in values.items():
+            if series == name:
+                lines.append(_sample(name, labels, value))
+    for name, (help_text, _) in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        tasks = [dict(labels)['task'] for series, labels in values if series == name + '_count']
+        for task in tasks:
+            for bound, count in _bucket_counts(values, name, task):
+                lines.append(_sample(name + '_bucket', (('task', task), ('le', bound)), count))
+            for suffix in ('_sum', '_count'):
+                labels = (('task', task),)
+                lines.append(_sample(name + suffix, labels, values[(name + suffix, labels)]))
+    return '\n'.join(lines) + '\n'
+
+
+def _sample(name, labels, value):
+    label_text = ','.join(f'{label}="{value}"' for label, value in labels)
+    return f'{name}{{{label_text}}} {value}'
+
+
+def histogram_quantile(values, name, task, quantile):
+    """Upper bound of the bucket holding ``quantile``, or None without observations"""
+    counts = _bucket_counts(values, name, task)
+    total = counts[-1][1]
+    if not total:
+        return None
+    for bound, count in counts:
+        if count >= quantile * total:
+            return float(bound)
+
+
+def task_summary(values=None):
+    """One dict per task that has run, for the task_metrics command"""
+    values = snapshot() if values is None else values
+
+    def get(name, task, **labels):
+        return values.get((name, (('task', task),) + tuple(labels.items())), 0)
+
+    rows = []
+    for task in tracked_tasks():
+        outcomes = {outcome: get('events_task_total', task, outcome=outcome) for outcome in LABEL_VALUES['outcome']}
+        runs = get('events_task_duration_seconds_count', task)
+        if not runs and not any(outcomes.values()):
+            continue
+        queued = get('events_task_queue_seconds_count', task)
+        recipient_runs = get('events_task_recipients_count', task)
+        rows.append({
+            'task': task,
+            'runs': runs,
+            **outcomes,
+            'errors': get('events_task_errors_total', task),
+            'mean_seconds': get('events_task_duration_seconds_sum', task) / runs if runs else None,
+            'p95_seconds': histogram_quantile(values, 'events_task_duration_seconds', task, 0.95),
+            'mean_queue_seconds': get('events_task_queue_seconds_sum', task) / queued if queued else None,
+            'recipients': int(get('events_task_recipients_sum', task)),
+            'mean_recipients': get('events_task_recipients_sum', task) / recipient_runs if recipient_runs else None,
+            'emails_sent': get('events_emails_sent_total', task),
+            'smtp_errors': sum(get('events_smtp_errors_total', task, kind=kind) for kind in LABEL_VALUES['kind']),
+        })
+    return rows
+
+
+def _tracked(task):
+    return task is not None and task.name.startswith(TASK_PREFIX)
+
+
+def stamp_published(headers=None, **kwargs):
+    """before_task_publish: remember when the task was sent, for queue latency"""
+    if headers is not None:
+        headers.setdefault(PUBLISHED_HEADER, time.time())
+
+
+def task_started(task_id=None, task=None, **kwargs):
+    """task_prerun: start the run timer and record how long the task waited in the queue"""
+    if not _tracked(task):
+        return
+    with _started_lock:
+        _started[task_id] = time.perf_counter()
+    published = getattr(task.request, PUBLISHED_HEADER, None)
+    if published:
+        observe('events_task_queue_seconds', max(time.time() - published, 0), task.name)
+
+
+def task_finished(task_id=None, task=None, state=None, **kwargs):
+    """task_postrun: record run time and outcome"""
+    if not _tracked(task):
+        return
+    with _started_lock:
+        started = _started.pop(task_id, None)
+    if started is not None:
+        observe('events_task_duration_seconds', time.perf_counter() - started, task.name)
+    outcome = {'SUCCESS': 'success', 'RETRY': 'retry'}.get(state, 'failure')
+    inc('events_task_total', task=task.name, outcome=outcome)
+
+
+def connect_signals():
+    from celery.signals import before_task_publish, task_postrun, task_prerun
+
+    before_task_publish.connect(stamp_published, weak=False, dispatch_uid='events.metrics.publish')
+    task_prerun.connect(task_started, weak=False, dispatch_uid='events.metrics.prerun')
+    task_postrun.connect(task_finished, weak=False, dispatch_uid='events.metrics.postrun')
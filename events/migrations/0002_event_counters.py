@@ -0,0 +1,93 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:14
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    RSVP = apps.get_model('events', 'RSVP')
+    Review = apps.get_model('events', 'Review')
+
+    def child_aggregate(model, aggregate):
+        rows = (
+            model.objects.filter(event=OuterRef('pk'))
+            .order_by()
+            .values('event')
+            .annotate(value=aggregate)
+            .values('value')
+        )
+        return Coalesce(Subquery(rows, output_field=IntegerField()), Value(0))
+
+    updates = {
+        'going_count': child_aggregate(RSVP, Count('pk', filter=Q(status='Going'))),
+        'maybe_count': child_aggregate(RSVP, Count('pk', filter=Q(status='Maybe'))),
+        'not_going_count': child_aggregate(RSVP, Count('pk', filter=Q(status='Not Going'))),
+        'review_count': child_aggregate(Review, Count('pk')),
+        'rating_sum': child_aggregate(Review, Sum('rating')),
+    }
+    for rating in range(1, 6):
+        updates[f'rating_{rating}_count'] = child_aggregate(Review, Count('pk', filter=Q(rating=rating)))
+    Event.objects.update(**updates)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='going_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='maybe_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='not_going_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
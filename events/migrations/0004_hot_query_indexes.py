@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_event_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['start_time', 'id'], name='event_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['start_time', 'id'], name='event_public_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['organizer', 'start_time'], name='event_organizer_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['location', 'start_time'], name='event_location_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['event', 'created_at'], name='review_event_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='review_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rsvp',
+            index=models.Index(fields=['event', 'status'], name='rsvp_event_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rsvp',
+            index=models.Index(fields=['user', 'status'], name='rsvp_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rsvp',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='rsvp_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rsvp',
+            index=models.Index(fields=['event', 'created_at'], name='rsvp_event_created_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0007_outbox_message'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingEventUpdate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('snapshot', models.JSONField()),
+                ('first_changed_at', models.DateTimeField()),
+                ('due_at', models.DateTimeField(db_index=True)),
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pending_update', to='events.event')),
+            ],
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('events', '0008_pending_event_update'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DigestItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('event_created', 'New event'), ('event_updated', 'Updated event')], max_length=20)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='notification_digest',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(condition=models.Q(('notification_digest', True)), fields=['user'], name='profile_digest_idx'),
+        ),
+        migrations.AddField(
+            model_name='digestitem',
+            name='event',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='events.event'),
+        ),
+        migrations.AddField(
+            model_name='digestitem',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='digest_items', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='digestitem',
+            index=models.Index(fields=['user', 'id'], name='digest_user_idx'),
+        ),
+    ]
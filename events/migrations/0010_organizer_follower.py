@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:05
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def backfill_followers(apps, schema_editor):
+    RSVP = apps.get_model('events', 'RSVP')
+    OrganizerFollower = apps.get_model('events', 'OrganizerFollower')
+
+    pairs = (
+        RSVP.objects.filter(status='Going')
+        .order_by()
+        .values_list('event__organizer_id', 'user_id')
+        .annotate(going=Count('id'))
+    )
+    batch = []
+    for organizer_id, follower_id, going in pairs.iterator(chunk_size=5000):
+        batch.append(OrganizerFollower(organizer_id=organizer_id, follower_id=follower_id, going_count=going))
+        if len(batch) >= 5000:
+            OrganizerFollower.objects.bulk_create(batch)
+            batch = []
+    OrganizerFollower.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('events', '0009_notification_digest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrganizerFollower',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('going_count', models.PositiveIntegerField(default=0)),
+                ('follower', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='following', to=settings.AUTH_USER_MODEL)),
+                ('organizer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='followers', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('organizer', 'follower')},
+            },
+        ),
+        migrations.RunPython(backfill_followers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0010_organizer_follower'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='rsvp',
+            name='rsvp_event_status_idx',
+        ),
+        migrations.AddIndex(
+            model_name='rsvp',
+            index=models.Index(fields=['event', 'status', 'created_at'], name='rsvp_event_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0012_profile_picture_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventSearchEntry',
+            fields=[
+                ('event', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='events.event')),
+                ('title', models.TextField()),
+                ('description', models.TextField()),
+                ('location', models.TextField()),
+                ('document', models.TextField(db_column='events_event_fts')),
+            ],
+            options={
+                'db_table': 'events_event_fts',
+                'managed': False,
+            },
+        ),
+    ]
@@ -1,5 +1,6 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 
@@ -9,10 +10,42 @@ class UserProfile(models.Model):
     bio = models.TextField(blank=True)
     location = models.CharField(max_length=255, blank=True)
     profile_picture = models.ImageField(upload_to='profiles/', blank=True, null=True)
+    # Resized copies of profile_picture, see events/images.py
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
+    # Collect event_created/event_updated emails into one daily digest
+    notification_digest = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Lets recipient queries exclude digest users without a scan
+            models.Index(fields=['user'], name='profile_digest_idx',
+                         condition=models.Q(notification_digest=True)),
+        ]
 
     def __str__(self):
         return self.full_name or self.user.username
 
+    def picture_url(self, size='md'):
+        """URL of a resized picture, or of the original upload until the variants exist"""
+        if not self.profile_picture:
+            return ''
+        variants = self.profile_picture_variants
+        if variants.get('source') == self.profile_picture.name and size in variants:
+            return default_storage.url(variants[size])
+        return self.profile_picture.url
+
+    @property
+    def picture_md_url(self):
+        return self.picture_url('md')
+
+    @property
+    def picture_srcset(self):
+        """``srcset`` of the 150px picture and its 400px variant for high density screens"""
+        variants = self.profile_picture_variants
+        if variants.get('source') != self.profile_picture.name or not {'md', 'lg'} <= variants.keys():
+            return ''
+        return f'{self.picture_url("md")} 1x, {self.picture_url("lg")} 2x'
+
 
 class Event(models.Model):
     title = models.CharField(max_length=255)
@@ -25,9 +58,114 @@ class Event(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Denormalized counters, maintained by the RSVP/Review signal handlers
+    # and rebuilt by the rebuild_event_stats management command.
+    going_count = models.PositiveIntegerField(default=0)
+    maybe_count = models.PositiveIntegerField(default=0)
+    not_going_count = models.PositiveIntegerField(default=0)
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+    # Bumped whenever an RSVP or review of the event changes; used with
+    # updated_at to build ETag/Last-Modified validators
+    child_version = models.PositiveIntegerField(default=0)
+    child_updated_at = models.DateTimeField(null=True, blank=True)
+
+    DENORMALIZED_FIELDS = (
+        'going_count', 'maybe_count', 'not_going_count', 'review_count', 'rating_sum',
+        'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count',
+        'child_version', 'child_updated_at',
+    )
+
+    class Meta:
+        indexes = [
+            # Keyset pagination and start_time range scans (reminders)
+            models.Index(fields=['start_time', 'id'], name='event_start_idx'),
+            # Anonymous listings only ever touch public events
+            models.Index(fields=['start_time', 'id'], name='event_public_start_idx',
+                         condition=models.Q(is_public=True)),
+            models.Index(fields=['organizer', 'start_time'], name='event_organizer_start_idx'),
+            models.Index(fields=['location', 'start_time'], name='event_location_start_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # The denormalized fields are only written with F() updates, so a
+        # full save of a stale instance must not roll them back
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.DENORMALIZED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    def delete(self, using=None, keep_parents=False):
+        # RSVPs and reviews have delete signal handlers, so the collector would
+        # load every one and delete them 100 per query. Settle the followers
+        # and drop them in bulk first; the event's own counters go with it.
+        # followers imports this module, hence the late import.
+        from .followers import remove_event_followers
+        using = using or router.db_for_write(type(self), instance=self)
+        if any(model._meta.related_objects for model in (RSVP, Review)):
+            # Something references RSVPs or reviews: let the collector cascade
+            return super().delete(using=using, keep_parents=keep_parents)
+        with transaction.atomic(using=using):
+            remove_event_followers(self)
+            for model in (RSVP, Review):
+                # QuerySet._raw_delete is private Django API (checked on 4.2):
+                # one DELETE, with no collector, cascades or delete signals.
+                # Only the events.signals receivers listen for these deletes
+                # and they have nothing to do for a deleted event; a new
+                # receiver must be vetted and added to the list in
+                # OrganizerFollowerTestCase.test_bulk_deleted_children_have_no_dependents.
+                model.objects.using(using).filter(event_id=self.pk)._raw_delete(using)
+            return super().delete(using=using, keep_parents=keep_parents)
+
+    @property
+    def rsvp_count(self):
+        return self.going_count + self.maybe_count + self.not_going_count
+
+    @property
+    def average_rating(self):
+        if not self.review_count:
+            return 0
+        return self.rating_sum / self.review_count
+
+    @property
+    def rating_histogram(self):
+        """Review counts keyed by rating, from 1 to 5"""
+        return {rating: getattr(self, f'rating_{rating}_count') for rating in range(1, 6)}
+
+
+class EventSearchEntry(models.Model):
+    """
+    A row of the SQLite FTS5 index over events (see events.search).
+
+    The table and its triggers are created by ensure_search_index, not by
+    migrations. ``document`` is FTS5's hidden column named after the table:
+    full-text queries are ``document__match=<query>`` (registered in
+    events.search), and bm25() and snippet() take it as their first
+    argument.
+    """
+    event = models.OneToOneField(
+        Event, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid',
+        db_constraint=False, related_name='search_entry',
+    )
+    title = models.TextField()
+    description = models.TextField()
+    location = models.TextField()
+    document = models.TextField(db_column='events_event_fts')
+
+    class Meta:
+        managed = False
+        db_table = 'events_event_fts'
+
 
 class RSVP(models.Model):
     STATUS_CHOICES = [
@@ -35,7 +173,12 @@ class RSVP(models.Model):
         ('Maybe', 'Maybe'),
         ('Not Going', 'Not Going'),
     ]
-    
+    STATUS_COUNT_FIELDS = {
+        'Going': 'going_count',
+        'Maybe': 'maybe_count',
+        'Not Going': 'not_going_count',
+    }
+
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='rsvps')
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES)
@@ -43,6 +186,22 @@ class RSVP(models.Model):
 
     class Meta:
         unique_together = ['event', 'user']
+        indexes = [
+            # Reminders, event_updated fan-out and attendee lists filtered by status
+            models.Index(fields=['event', 'status', 'created_at'], name='rsvp_event_status_created_idx'),
+            # event_created fan-out and per-user RSVP lookups
+            models.Index(fields=['user', 'status'], name='rsvp_user_status_idx'),
+            models.Index(fields=['user', 'created_at', 'id'], name='rsvp_user_created_idx'),
+            models.Index(fields=['event', 'created_at'], name='rsvp_event_created_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored values so the counter signals can apply a delta
+        instance._stored_event_id = instance.__dict__.get('event_id')
+        instance._stored_status = instance.__dict__.get('status')
+        return instance
 
     def __str__(self):
         return f"{self.user.username} - {self.event.title} - {self.status}"
@@ -57,6 +216,133 @@ class Review(models.Model):
 
     class Meta:
         unique_together = ['event', 'user']
+        indexes = [
+            models.Index(fields=['event', 'created_at'], name='review_event_created_idx'),
+            models.Index(fields=['user', 'created_at', 'id'], name='review_user_created_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored values so the counter signals can apply a delta
+        instance._stored_event_id = instance.__dict__.get('event_id')
+        instance._stored_rating = instance.__dict__.get('rating')
+        return instance
+
+    def __str__(self):
+        return f"{self.user.username} - {self.event.title} - {self.rating}/5"
+
+
+class EventReminder(models.Model):
+    """
+    Marker recording that a reminder of a given kind was claimed for an event.
+
+    The (event, kind) unique constraint is what stops overlapping sweeps
+    from sending the same reminder twice; ``claim_token`` tells a sweep
+    which of the markers it tried to insert are its own. A marker whose
+    ``sent_at`` is still empty a while after ``claimed_at`` is taken over
+    by a later sweep.
+    """
+    KIND_CHOICES = [
+        ('24h', '24 hours before'),
+    ]
+
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='reminders')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    claim_token = models.CharField(max_length=32, db_index=True)
+    claimed_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ['event', 'kind']
+
+    def __str__(self):
+        return f"{self.event.title} - {self.kind}"
+
+
+class OutboxMessage(models.Model):
+    """
+    A task call recorded in the same transaction as the change that caused it.
+
+    Rows are handed to Celery (or run in-process when there is no broker)
+    by the outbox relay; see events.outbox.
+    """
+    task = models.CharField(max_length=255)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claim_token = models.CharField(max_length=32, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # The relay only ever scans undispatched rows, oldest first
+            models.Index(fields=['id'], name='outbox_pending_idx',
+                         condition=models.Q(dispatched_at__isnull=True)),
+            # The retention purge deletes dispatched rows, oldest first
+            models.Index(fields=['dispatched_at'], name='outbox_dispatched_idx',
+                         condition=models.Q(dispatched_at__isnull=False)),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk}"
+
+
+class PendingEventUpdate(models.Model):
+    """
+    An event_updated notification waiting out its coalescing window.
+
+    ``snapshot`` holds the user-visible fields as they were before the
+    first edit in the window; the notification is sent with the diff
+    against the event as it stands when the window closes.
+    """
+    event = models.OneToOneField(Event, on_delete=models.CASCADE, related_name='pending_update')
+    snapshot = models.JSONField()
+    first_changed_at = models.DateTimeField()
+    due_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.event.title} - due {self.due_at}"
+
+
+class DigestItem(models.Model):
+    """A notification waiting for its recipient's next daily digest"""
+    KIND_CHOICES = [
+        ('event_created', 'New event'),
+        ('event_updated', 'Updated event'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='digest_items')
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='+')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+
+    class Meta:
+        indexes = [
+            # The digest job groups and drains items user by user
+            models.Index(fields=['user', 'id'], name='digest_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.kind} - {self.event_id}"
+
+
+class OrganizerFollower(models.Model):
+    """
+    Users with at least one "Going" RSVP to an organizer's events.
+
+    Maintained by the RSVP signal handlers and the bulk RSVP upsert, and
+    rebuilt by the rebuild_followers management command. event_created
+    notifications fan out from here instead of from every past RSVP.
+    """
+    organizer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='followers')
+    follower = models.ForeignKey(User, on_delete=models.CASCADE, related_name='following')
+    going_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['organizer', 'follower']
 
     def __str__(self):
-        return f"{self.user.username} - {self.event.title} - {self.rating}/5"
\ No newline at end of file
+        return f"{self.follower.username} follows {self.organizer.username}"
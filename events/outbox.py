@@ -0,0 +1,163 @@
+"""
+Transactional outbox for background tasks.
+
+Views call ``enqueue()`` inside the transaction that changes an Event or
+RSVP, so a task call is recorded if and only if that change commits, and
+the request never waits on the broker. The relay drains pending rows in
+batches: the ``relay_outbox`` management command for a dedicated
+process, or the ``relay_outbox_task`` beat entry.
+
+Delivery is at least once, not exactly once: a relay that dies after
+publishing a row but before marking it dispatched leaves it to be sent
+again once its claim goes stale, so tasks run through the outbox must
+tolerate the occasional duplicate. Each row is published with a task id
+derived from the row (``outbox-<id>``), which only makes duplicates easy
+to spot in the worker logs; Celery does not deduplicate on it. Without a
+broker (``CELERY_TASK_ALWAYS_EAGER``), rows are run by an in-process
+worker thread as soon as the transaction commits.
+
+A row that fails EVENTS_OUTBOX_MAX_ATTEMPTS times is parked: it stays in
+the table with its last error but is no longer retried. Dispatched rows
+are purged once they are older than EVENTS_OUTBOX_RETENTION.
+"""
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from celery import current_app
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def outbox_batch_size():
+    return getattr(settings, 'EVENTS_OUTBOX_BATCH_SIZE', 100)
+
+
+def outbox_claim_timeout():
+    return timedelta(seconds=getattr(settings, 'EVENTS_OUTBOX_CLAIM_TIMEOUT', 300))
+
+
+def outbox_max_attempts():
+    return getattr(settings, 'EVENTS_OUTBOX_MAX_ATTEMPTS', 10)
+
+
+def outbox_retention():
+    return timedelta(seconds=getattr(settings, 'EVENTS_OUTBOX_RETENTION', 7 * 24 * 60 * 60))
+
+
+def uses_broker():
+    return not current_app.conf.task_always_eager
+
+
+def enqueue(task, *args, **kwargs):
+    """Record a call to ``task`` that is dispatched once the current transaction commits"""
+    message = OutboxMessage.objects.create(task=getattr(task, 'name', task), args=list(args), kwargs=kwargs)
+    if not uses_broker():
+        transaction.on_commit(wake_relay)
+    return message
+
+
+def enqueue_many(task, calls):
+    """``enqueue()`` for many calls to ``task``, each a tuple of positional arguments, in one INSERT"""
+    messages = OutboxMessage.objects.bulk_create(
+        [OutboxMessage(task=getattr(task, 'name', task), args=list(args)) for args in calls]
+    )
+    if messages and not uses_broker():
+        transaction.on_commit(wake_relay)
+    return messages
+
+
+def wake_relay():
+    """Drain the outbox on a background thread so the request does not wait for it"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='outbox-relay')
+    _executor.submit(_relay_in_thread)
+
+
+def _relay_in_thread():
+    try:
+        relay_outbox()
+    finally:
+        connection.close()
+
+
+def pending_messages(now=None):
+    """Undispatched, unparked rows that are unclaimed, or whose claim has gone stale"""
+    now = now or timezone.now()
+    return OutboxMessage.objects.filter(dispatched_at__isnull=True, attempts__lt=outbox_max_attempts()).filter(
+        Q(claim_token='') | Q(claimed_at__lt=now - outbox_claim_timeout())
+    )
+
+
+def purge_outbox(now=None):
+    """Delete rows dispatched longer than EVENTS_OUTBOX_RETENTION ago and return how many"""
+    now = now or timezone.now()
+    deleted, _ = OutboxMessage.objects.filter(dispatched_at__lt=now - outbox_retention()).delete()
+    return deleted
+
+
+def dispatch(message):
+    if message.task not in current_app.tasks:
+        # Outside a worker, task modules are only autodiscovered on demand
+        current_app.loader.import_default_modules()
+    task = current_app.tasks[message.task]
+    task_id = f'outbox-{message.pk}'
+    if uses_broker():
+        task.apply_async(message.args, message.kwargs, task_id=task_id)
+    else:
+        task.apply(message.args, message.kwargs, task_id=task_id)
+
+
+def relay_outbox(batch_size=None, max_batches=None):
+    """
+    Hand pending outbox rows to Celery in id order and return how many were dispatched.
+
+    Each batch is claimed with a conditional UPDATE before anything is
+    sent, so concurrent relays never dispatch the same row, and every row
+    is marked as dispatched as soon as it is handed off. A row that fails
+    is released with its error recorded and retried by a later run, until
+    it is parked after EVENTS_OUTBOX_MAX_ATTEMPTS attempts.
+    """
+    batch_size = batch_size or outbox_batch_size()
+    token = uuid.uuid4().hex
+    last_id = 0
+    batches = dispatched = 0
+    while max_batches is None or batches < max_batches:
+        now = timezone.now()
+        ids = list(
+            pending_messages(now).filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        batches += 1
+        last_id = ids[-1]
+        pending_messages(now).filter(id__in=ids).update(claim_token=token, claimed_at=now)
+
+        for message in OutboxMessage.objects.filter(id__in=ids, claim_token=token).order_by('id'):
+            try:
+                dispatch(message)
+            except Exception as e:
+                OutboxMessage.objects.filter(pk=message.pk).update(
+                    claim_token='', claimed_at=None, attempts=F('attempts') + 1, last_error=repr(e),
+                )
+                if message.attempts + 1 >= outbox_max_attempts():
+                    logger.error('Parking outbox message %s after %s attempts: %r', message.pk, message.attempts + 1, e)
+                continue
+            OutboxMessage.objects.filter(pk=message.pk).update(
+                dispatched_at=timezone.now(), attempts=F('attempts') + 1,
+            )
+            dispatched += 1
+    return dispatched
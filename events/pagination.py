@@ -0,0 +1,275 @@
+import base64
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def _field_name(ordering_field):
+    return ordering_field.lstrip('-')
+
+
+def encode_cursor(values, reverse=False):
+    payload = {'v': [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]}
+    if reverse:
+        payload['r'] = 1
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _to_python(model, ordering_field, value):
+    try:
+        field = model._meta.get_field(_field_name(ordering_field))
+    except FieldDoesNotExist:
+        # Annotations such as search_rank keep their JSON value
+        if not isinstance(value, (int, float)):
+            raise ValueError(value)
+        return value
+    return field.to_python(value)
+
+
+def decode_cursor(cursor, model, ordering):
+    """Turn a cursor string back into typed ordering values and a direction"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        raw_values = payload['v']
+        if len(raw_values) != len(ordering):
+            raise ValueError
+        values = [_to_python(model, field, value) for field, value in zip(ordering, raw_values)]
+    except Exception:
+        raise InvalidCursor(cursor)
+    return values, bool(payload.get('r'))
+
+
+class KeysetPage:
+    """One page of results plus the cursors needed to move around it"""
+
+    def __init__(self, items, next_cursor=None, previous_cursor=None, count=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.count = count
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+class KeysetPaginator:
+    """
+    Seek-based pagination over a fixed, unique ordering.
+
+    Each page is fetched with a WHERE clause on the ordering columns of the
+    last row seen, so the cost of a page does not depend on how deep it is.
+    The ordering must end with a unique column (normally ``id``). Total
+    counts are only computed when asked for, and are cached briefly.
+    """
+
+    def __init__(self, ordering=('start_time', 'id'), page_size=12):
+        self.ordering = tuple(ordering)
+        self.page_size = page_size
+
+    def _seek_filter(self, values, reverse):
+        # (a, b) > (x, y)  ==  a > x OR (a = x AND b > y)
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            descending = field.startswith('-')
+            lookup = 'lt' if descending != reverse else 'gt'
+            clause = Q(**{f'{_field_name(field)}__{lookup}': values[index]})
+            for previous_field, previous_value in zip(self.ordering[:index], values):
+                clause &= Q(**{_field_name(previous_field): previous_value})
+            condition |= clause
+        return condition
+
+    def _cursor_for(self, item, reverse=False):
+        return encode_cursor([getattr(item, _field_name(field)) for field in self.ordering], reverse=reverse)
+
+    def _page_queryset(self, queryset, cursor):
+        """The query for one page (plus one row to detect more), and whether it runs backwards"""
+        reverse = False
+        if cursor:
+            values, reverse = decode_cursor(cursor, queryset.model, self.ordering)
+            queryset = queryset.filter(self._seek_filter(values, reverse))
+
+        if reverse:
+            ordering = [field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering]
+        else:
+            ordering = list(self.ordering)
+        return queryset.order_by(*ordering)[:self.page_size + 1], reverse
+
+    def paginate(self, queryset, cursor=None, with_count=False):
+        count = cached_count(queryset) if with_count else None
+        page_queryset, reverse = self._page_queryset(queryset, cursor)
+        return self._page(list(page_queryset), cursor, reverse, count)
+
+    async def apaginate(self, queryset, cursor=None, with_count=False):
+        """paginate() for async views, using the async ORM"""
+        count = await acached_count(queryset) if with_count else None
+        page_queryset, reverse = self._page_queryset(queryset, cursor)
+        return self._page([row async for row in page_queryset], cursor, reverse, count)
+
+    def _page(self, rows, cursor, reverse, count):
+        has_more = len(rows) > self.page_size
+        items = rows[:self.page_size]
+        if reverse:
+            items.reverse()
+
+        next_cursor = previous_cursor = None
+        if items:
+            if has_more or reverse:
+                next_cursor = self._cursor_for(items[-1])
+            if (has_more and reverse) or (cursor and not reverse):
+                previous_cursor = self._cursor_for(items[0], reverse=True)
+
+        return KeysetPage(items, next_cursor, previous_cursor, count)
+
+
+def _count_key(queryset):
+    sql, params = queryset.query.sql_with_params()
+    return 'events:count:' + hashlib.sha1(f'{sql}|{params}'.encode()).hexdigest()
+
+
+def count_cache_timeout():
+    return getattr(settings, 'EVENTS_COUNT_CACHE_TIMEOUT', 60)
+
+
+def cached_count(queryset):
+    """COUNT(*) for a queryset, cached for EVENTS_COUNT_CACHE_TIMEOUT seconds"""
+    queryset = queryset.order_by()
+    key = _count_key(queryset)
+    total = cache.get(key)
+    if total is None:
+        total = queryset.count()
+        cache.set(key, total, count_cache_timeout())
+    return total
+
+
+async def acached_count(queryset):
+    queryset = queryset.order_by()
+    key = _count_key(queryset)
+    total = await cache.aget(key)
+    if total is None:
+        total = await queryset.acount()
+        await cache.aset(key, total, count_cache_timeout())
+    return total
+
+
+class KeysetPagination(BasePagination):
+    """
+    DRF pagination class built on KeysetPaginator.
+
+    Views may set ``keyset_ordering``, or define
+    ``get_keyset_ordering(request)``, to override the default ordering.
+    Clients pass ``?count=true`` to also receive a (cached) total.
+    """
+    ordering = ('start_time', 'id')
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, request, view):
+        if hasattr(view, 'get_keyset_ordering'):
+            return view.get_keyset_ordering(request)
+        return getattr(view, 'keyset_ordering', self.ordering)
+
+    def get_page_size(self, request):
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(requested, self.max_page_size))
+
+    def wants_count(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        paginator = KeysetPaginator(self.get_ordering(request, view), self.get_page_size(request))
+        cursor = request.query_params.get(self.cursor_query_param)
+        try:
+            self.page = paginator.paginate(queryset, cursor, with_count=self.wants_count(request))
+        except InvalidCursor:
+            raise NotFound(self.invalid_cursor_message)
+        return self.page.items
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        paginator = KeysetPaginator(self.get_ordering(request, view), self.get_page_size(request))
+        cursor = request.query_params.get(self.cursor_query_param)
+        try:
+            self.page = await paginator.apaginate(queryset, cursor, with_count=self.wants_count(request))
+        except InvalidCursor:
+            raise NotFound(self.invalid_cursor_message)
+        return self.page.items
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        return self._link(self.page.next_cursor)
+
+    def get_previous_link(self):
+        return self._link(self.page.previous_cursor)
+
+    def get_paginated_response(self, data):
+        payload = {}
+        if self.page.count is not None:
+            payload['count'] = self.page.count
+        payload['next'] = self.get_next_link()
+        payload['previous'] = self.get_previous_link()
+        payload['results'] = data
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer', 'example': 123},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+def keyset_querystring(query_dict, cursor, cursor_param='cursor'):
+    """Rebuild a request's query string pointing at another cursor"""
+    params = query_dict.copy()
+    params.pop(cursor_param, None)
+    params.pop('page', None)
+    if cursor:
+        params[cursor_param] = cursor
+    return params.urlencode()
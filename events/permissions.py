@@ -30,4 +30,14 @@ class IsPublicEventOrInvited(permissions.BasePermission):
             return (obj.organizer == request.user or 
                    obj.rsvps.filter(user=request.user).exists())
         
-        return False
\ No newline at end of file
+        return False
+
+
+class IsOrganizerOrAttendee(permissions.BasePermission):
+    """
+    Only the organizer of an event and users who have RSVP'd to it may see who else is attending.
+    """
+
+    def has_object_permission(self, request, view, obj):
+        return (obj.organizer == request.user or
+                obj.rsvps.filter(user=request.user).exists())
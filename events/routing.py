@@ -0,0 +1,94 @@
+"""
+Queue routing and send rate limits for notification tasks.
+
+Time-sensitive mail (RSVP confirmations) goes to its own ``transactional``
+queue so it never waits behind a bulk ``event_created`` or
+``event_updated`` blast, and reminders get a queue of their own. Give each
+queue its own worker, e.g. ``celery -A event_management worker -Q
+transactional``.
+
+Fan-out chunks are published to the queue of the notification that
+created them. Each queue can be capped at a number of messages per second
+(``EVENTS_QUEUE_RATE_LIMITS``) to stay within the SMTP provider's limits;
+the budget is counted in a cache shared by all workers.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+TRANSACTIONAL_QUEUE = 'transactional'
+BULK_QUEUE = 'bulk'
+REMINDER_QUEUE = 'reminders'
+
+NOTIFICATION_QUEUES = {
+    'rsvp_confirmation': TRANSACTIONAL_QUEUE,
+    'event_created': BULK_QUEUE,
+    'event_updated': BULK_QUEUE,
+}
+
+TASK_QUEUES = {
+    'events.tasks.send_event_reminder': REMINDER_QUEUE,
+    'events.tasks.schedule_event_reminders': REMINDER_QUEUE,
+    'events.tasks.send_digest_batch': BULK_QUEUE,
+    'events.tasks.send_daily_digests': BULK_QUEUE,
+}
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    'RATES': {},
+}
+
+
+def notification_queue(notification_type):
+    return NOTIFICATION_QUEUES.get(notification_type, BULK_QUEUE)
+
+
+def route_task(name, args, kwargs, options, task=None, **kw):
+    """Celery router (``CELERY_TASK_ROUTES``); other tasks keep the default queue"""
+    if name == 'events.tasks.send_event_notification':
+        notification_type = kwargs.get('notification_type') or (args[1] if len(args) > 1 else None)
+        return {'queue': notification_queue(notification_type)}
+    if name in TASK_QUEUES:
+        return {'queue': TASK_QUEUES[name]}
+    return None
+
+
+def rate_limit_settings():
+    return {**DEFAULTS, **getattr(settings, 'EVENTS_QUEUE_RATE_LIMITS', {})}
+
+
+def task_queue(task):
+    """Queue the running task was delivered from, or None when it was run in-process"""
+    delivery_info = task.request.delivery_info or {}
+    return delivery_info.get('routing_key')
+
+
+def throttle(queue, clock=time.time, sleep=time.sleep):
+    """
+    Block until ``queue`` may send one more message; returns the seconds waited.
+
+    The budget is a counter per one-second window, so workers sharing the
+    cache never send more than the configured rate between them.
+    """
+    config = rate_limit_settings()
+    rate = config['RATES'].get(queue)
+    if not rate:
+        return 0
+    cache = caches[config['ALIAS']]
+    waited = 0
+    while True:
+        now = clock()
+        window = int(now)
+        key = f'events:ratelimit:{queue}:{window}'
+        cache.add(key, 0, 5)
+        try:
+            sent = cache.incr(key)
+        except ValueError:
+            # Expired between add and incr; try the window again
+            continue
+        if sent <= rate:
+            return waited
+        pause = window + 1 - now
+        sleep(pause)
+        waited += pause
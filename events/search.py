@@ -0,0 +1,187 @@
+"""
+Full-text search over events.
+
+On SQLite the events are indexed in an external-content FTS5 table that is
+kept in sync with ``events_event`` by triggers, so every write path (ORM
+saves, ``bulk_create``, queryset updates, cascades) updates the index.
+Queries reach it through the unmanaged ``EventSearchEntry`` model, joined
+to each event by rowid.
+Other database backends fall back to the original ``icontains`` filter.
+"""
+import re
+
+from django.db import connection, connections
+from django.db.models import F, FloatField, Func, Lookup, Q, TextField, Value
+from rest_framework.filters import SearchFilter
+
+from .models import Event, EventSearchEntry
+
+FTS_TABLE = EventSearchEntry._meta.db_table
+
+# Column weights for bm25(): title, description, location
+RANK_WEIGHTS = (10.0, 1.0, 5.0)
+
+# snippet() markers; swapped for <mark> tags after the text is HTML-escaped
+_MARK_OPEN = '\x02'
+_MARK_CLOSE = '\x03'
+
+SEARCH_ORDERING = ('search_rank', 'id')
+
+_SCHEMA_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description, location,
+        content='events_event', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3 4'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON events_event BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON events_event BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description, location ON events_event BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+        INSERT INTO {FTS_TABLE}(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END
+    """,
+]
+
+_DROP_SQL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+
+def is_supported(using_connection=None):
+    return (using_connection or connection).vendor == 'sqlite'
+
+
+def ensure_search_index(using_connection=None):
+    """
+    Create the FTS table and its triggers if they are missing.
+
+    SQLite migrations that rebuild ``events_event`` drop its triggers, so
+    this also runs after every migrate.
+    """
+    using_connection = using_connection or connection
+    if not is_supported(using_connection):
+        return False
+    with using_connection.cursor() as cursor:
+        for statement in _SCHEMA_SQL:
+            cursor.execute(statement)
+    return True
+
+
+def drop_search_index(using_connection=None):
+    using_connection = using_connection or connection
+    if not is_supported(using_connection):
+        return
+    with using_connection.cursor() as cursor:
+        for statement in _DROP_SQL:
+            cursor.execute(statement)
+
+
+def rebuild_search_index(using_connection=None):
+    """Repopulate the index from events_event and merge its segments"""
+    using_connection = using_connection or connection
+    if not ensure_search_index(using_connection):
+        return False
+    with using_connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    return True
+
+
+def build_match_query(text):
+    """
+    Turn free text into an FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term, so user input can never be
+    parsed as FTS5 syntax and partially typed words still match.
+    """
+    terms = re.findall(r'\w+', text or '')
+    if not terms:
+        return None
+    return ' '.join('"{}"*'.format(term.replace('"', '')) for term in terms)
+
+
+class Match(Lookup):
+    """
+    ``document__match=<query>``: a full-text MATCH on the FTS table.
+
+    FTS5 also accepts ``=`` on the hidden column, but not when bm25() is
+    in the WHERE clause too, as it is for keyset pages ordered by rank.
+    """
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+EventSearchEntry._meta.get_field('document').register_lookup(Match)
+
+
+def _legacy_filter(text):
+    return (
+        Q(title__icontains=text) |
+        Q(description__icontains=text) |
+        Q(location__icontains=text)
+    )
+
+
+def search_events(queryset, text):
+    """
+    Restrict an Event queryset to matches for ``text``.
+
+    Matching rows are annotated with ``search_rank`` (bm25, lower is more
+    relevant) and ``search_snippet`` (HTML-escaped description excerpt
+    with matches wrapped in <mark>). Order by SEARCH_ORDERING for
+    relevance.
+    """
+    if not text or not text.strip():
+        return queryset
+
+    match = build_match_query(text)
+    if match is None or not is_supported(connections[queryset.db]):
+        return queryset.filter(_legacy_filter(text.strip())).annotate(
+            search_rank=Value(0.0, output_field=FloatField()),
+            search_snippet=Value('', output_field=TextField()),
+        )
+
+    # The MATCH joins the FTS table once; the annotations reuse that join
+    entry = F('search_entry__document')
+    weights = ', '.join(str(weight) for weight in RANK_WEIGHTS)
+    snippet = "snippet(%(expressions)s, -1, char(2), char(3), '…', 16)"
+    escaped_snippet = (
+        f"replace(replace(replace(replace(replace({snippet}, '&', '&amp;'), '<', '&lt;'), '>', '&gt;'),"
+        f" char(2), '<mark>'), char(3), '</mark>')"
+    )
+    return queryset.filter(search_entry__document__match=match).annotate(
+        search_rank=Func(entry, template=f'bm25(%(expressions)s, {weights})', output_field=FloatField()),
+        search_snippet=Func(entry, template=escaped_snippet, output_field=TextField()),
+    )
+
+
+class FullTextSearchFilter(SearchFilter):
+    """Drop-in replacement for SearchFilter backed by search_events()"""
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '')
+        if queryset.model is not Event or not text.strip():
+            return super().filter_queryset(request, queryset, view)
+        return search_events(queryset, text)
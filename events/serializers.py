@@ -1,12 +1,35 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from .images import image_settings
 from .models import UserProfile, Event, RSVP, Review
 
 
 class UserProfileSerializer(serializers.ModelSerializer):
+    # The medium variant, or the original upload until the variants exist,
+    # as on the profile page
+    profile_picture = serializers.SerializerMethodField()
+    # Every resized variant by size name; null until a worker has built them
+    profile_pictures = serializers.SerializerMethodField()
+
     class Meta:
         model = UserProfile
-        fields = ['full_name', 'bio', 'location', 'profile_picture']
+        fields = ['full_name', 'bio', 'location', 'profile_picture', 'profile_pictures']
+
+    def _absolute(self, url):
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+    def get_profile_picture(self, profile):
+        return self._absolute(profile.picture_url('md')) if profile.profile_picture else None
+
+    def get_profile_pictures(self, profile):
+        variants = profile.profile_picture_variants
+        if not profile.profile_picture or variants.get('source') != profile.profile_picture.name:
+            return None
+        return {
+            size: self._absolute(profile.picture_url(size))
+            for size in image_settings()['SIZES'] if size in variants
+        }
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -17,20 +40,31 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'profile']
 
 
+class PublicUserSerializer(serializers.ModelSerializer):
+    """A user as other users see them, without their email address"""
+    profile = UserProfileSerializer(source='userprofile', read_only=True)
+
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'profile']
+
+
 class EventSerializer(serializers.ModelSerializer):
     organizer = UserSerializer(read_only=True)
-    rsvp_count = serializers.SerializerMethodField()
-    
+    rsvp_count = serializers.IntegerField(read_only=True)
+    review_count = serializers.IntegerField(read_only=True)
+    average_rating = serializers.FloatField(read_only=True)
+    # Only present on search results
+    search_snippet = serializers.CharField(read_only=True)
+
     class Meta:
         model = Event
         fields = ['id', 'title', 'description', 'organizer', 'location', 
                  'start_time', 'end_time', 'is_public', 'created_at', 
-                 'updated_at', 'rsvp_count']
+                 'updated_at', 'rsvp_count', 'review_count', 'average_rating',
+                 'search_snippet']
         read_only_fields = ['organizer', 'created_at', 'updated_at']
     
-    def get_rsvp_count(self, obj):
-        return obj.rsvps.count()
-    
     def create(self, validated_data):
         validated_data['organizer'] = self.context['request'].user
         return super().create(validated_data)
@@ -49,6 +83,14 @@ class RSVPSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class AttendeeSerializer(serializers.ModelSerializer):
+    user = PublicUserSerializer(read_only=True)
+
+    class Meta:
+        model = RSVP
+        fields = ['id', 'user', 'status', 'created_at']
+
+
 class ReviewSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     
@@ -59,4 +101,10 @@ class ReviewSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+
+class BulkRSVPItemSerializer(serializers.Serializer):
+    event = serializers.IntegerField()
+    user = serializers.IntegerField(required=False)
+    status = serializers.ChoiceField(choices=RSVP.STATUS_CHOICES)
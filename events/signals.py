@@ -0,0 +1,177 @@
+from django.contrib.auth.models import User
+from django.db import connections
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, post_migrate
+from django.dispatch import receiver
+
+from .authentication import invalidate_cached_user
+from .cache import invalidate_event
+from .followers import apply_follower_deltas, remove_event_followers
+from .models import Event, RSVP, Review, UserProfile
+from .search import FTS_TABLE, ensure_search_index
+from .stats import apply_event_counter_deltas, apply_grouped_counter_deltas
+
+
+def _load_stored_values(instance, *fields):
+    """Fetch the stored row for an instance that was not loaded through from_db"""
+    stored = type(instance).objects.filter(pk=instance.pk).values(*fields).first() or {}
+    for field in fields:
+        setattr(instance, f'_stored_{field}', stored.get(field))
+
+
+@receiver(pre_save, sender=RSVP)
+def rsvp_pre_save(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None or instance._state.adding:
+        return
+    if getattr(instance, '_stored_status', None) is None:
+        _load_stored_values(instance, 'event_id', 'status')
+
+
+def _event_deleted(event_id, origin):
+    """Whether the event is being deleted along with the row, as marked by event_pre_delete"""
+    return event_id in getattr(origin, '_deleted_event_ids', ())
+
+
+def _organizer_id(instance, event_id):
+    event = instance._state.fields_cache.get('event')
+    if event is not None and event.pk == event_id:
+        return event.organizer_id
+    return Event.objects.filter(pk=event_id).values_list('organizer_id', flat=True).first()
+
+
+@receiver(post_save, sender=RSVP)
+def rsvp_post_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    changes = []
+    was_going = False
+    if not created:
+        old_status = getattr(instance, '_stored_status', None)
+        old_field = RSVP.STATUS_COUNT_FIELDS.get(old_status)
+        if old_field:
+            changes.append((instance._stored_event_id, old_field, -1))
+        was_going = old_status == 'Going'
+    new_field = RSVP.STATUS_COUNT_FIELDS.get(instance.status)
+    if new_field:
+        changes.append((instance.event_id, new_field, 1))
+    apply_grouped_counter_deltas(changes)
+
+    # Keep the organizer -> follower table in step with "Going" RSVPs
+    is_going = instance.status == 'Going'
+    moved = not created and instance._stored_event_id != instance.event_id
+    if was_going != is_going or (moved and is_going):
+        follower_changes = []
+        if was_going:
+            follower_changes.append((_organizer_id(instance, instance._stored_event_id), instance.user_id, -1))
+        if is_going:
+            follower_changes.append((_organizer_id(instance, instance.event_id), instance.user_id, 1))
+        apply_follower_deltas(follower_changes)
+
+    instance._stored_event_id = instance.event_id
+    instance._stored_status = instance.status
+
+
+@receiver(pre_delete, sender=Event)
+def event_pre_delete(sender, instance, origin=None, **kwargs):
+    # Mark the event on whatever is being deleted (the event, a queryset, its
+    # organizer...) so the handlers of the RSVPs and reviews cascading with it
+    # skip their counter updates, and settle its followers in one go instead
+    if origin is not None:
+        if not hasattr(origin, '_deleted_event_ids'):
+            origin._deleted_event_ids = set()
+        origin._deleted_event_ids.add(instance.pk)
+    remove_event_followers(instance)
+
+
+@receiver(post_delete, sender=RSVP)
+def rsvp_post_delete(sender, instance, origin=None, **kwargs):
+    if _event_deleted(instance.event_id, origin):
+        return
+    status = getattr(instance, '_stored_status', None) or instance.status
+    field = RSVP.STATUS_COUNT_FIELDS.get(status)
+    if field:
+        event_id = getattr(instance, '_stored_event_id', None) or instance.event_id
+        apply_event_counter_deltas(event_id, {field: -1})
+        if status == 'Going':
+            apply_follower_deltas([(_organizer_id(instance, event_id), instance.user_id, -1)])
+
+
+def _review_changes(event_id, rating, sign):
+    changes = [(event_id, 'review_count', sign)]
+    if rating in range(1, 6):
+        changes.append((event_id, 'rating_sum', sign * rating))
+        changes.append((event_id, f'rating_{rating}_count', sign))
+    return changes
+
+
+@receiver(pre_save, sender=Review)
+def review_pre_save(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None or instance._state.adding:
+        return
+    if getattr(instance, '_stored_rating', None) is None:
+        _load_stored_values(instance, 'event_id', 'rating')
+
+
+@receiver(post_save, sender=Review)
+def review_post_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    changes = []
+    if not created:
+        old_rating = getattr(instance, '_stored_rating', None)
+        if old_rating is not None:
+            changes += _review_changes(instance._stored_event_id, old_rating, -1)
+    changes += _review_changes(instance.event_id, instance.rating, 1)
+    apply_grouped_counter_deltas(changes)
+    instance._stored_event_id = instance.event_id
+    instance._stored_rating = instance.rating
+
+
+@receiver(post_delete, sender=Review)
+def review_post_delete(sender, instance, origin=None, **kwargs):
+    if _event_deleted(instance.event_id, origin):
+        return
+    rating = getattr(instance, '_stored_rating', None) or instance.rating
+    event_id = getattr(instance, '_stored_event_id', None) or instance.event_id
+    apply_grouped_counter_deltas(_review_changes(event_id, rating, -1))
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def event_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_event(instance.pk)
+
+
+@receiver(post_save, sender=RSVP)
+@receiver(post_delete, sender=RSVP)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def event_child_changed(sender, instance, raw=False, origin=None, **kwargs):
+    if raw or _event_deleted(instance.event_id, origin):
+        return
+    invalidate_event(instance.event_id)
+    stored_event_id = getattr(instance, '_stored_event_id', None)
+    if stored_event_id and stored_event_id != instance.event_id:
+        invalidate_event(stored_event_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def profile_changed(sender, instance, **kwargs):
+    invalidate_cached_user(instance.user_id)
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, using='default', **kwargs):
+    # Table rebuilds during SQLite migrations drop the FTS triggers
+    if sender.name != 'events':
+        return
+    connection = connections[using]
+    if FTS_TABLE in connection.introspection.table_names():
+        ensure_search_index(connection)
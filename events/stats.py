@@ -0,0 +1,72 @@
+from collections import Counter
+
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Event, RSVP, Review
+
+
+def apply_event_counter_deltas(event_id, deltas):
+    """
+    Atomically add the given deltas to an event's denormalized counters.
+
+    The event's child version is bumped even when every delta is zero (for
+    example a review whose comment changed), so conditional GETs see it.
+    """
+    if event_id is None:
+        return
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    updates = {
+        'child_version': F('child_version') + 1,
+        'child_updated_at': timezone.now(),
+    }
+    for field, delta in deltas.items():
+        # Never let a drifted counter go negative; rebuild_event_stats repairs it
+        updates[field] = F(field) + delta if delta > 0 else Greatest(F(field) + delta, 0)
+    Event.objects.filter(pk=event_id).update(**updates)
+
+
+def apply_grouped_counter_deltas(changes):
+    """Apply an iterable of (event_id, field, delta) changes, one UPDATE per event"""
+    per_event = {}
+    for event_id, field, delta in changes:
+        per_event.setdefault(event_id, Counter())[field] += delta
+    for event_id, deltas in per_event.items():
+        apply_event_counter_deltas(event_id, deltas)
+
+
+def _child_aggregate(model, aggregate):
+    """Correlated subquery returning one aggregate over an event's child rows"""
+    rows = (
+        model.objects.filter(event=OuterRef('pk'))
+        .order_by()
+        .values('event')
+        .annotate(value=aggregate)
+        .values('value')
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), Value(0))
+
+
+def rebuild_event_stats(queryset=None):
+    """
+    Recompute every denormalized counter from the RSVP and Review tables.
+
+    Runs as a single UPDATE statement over the given events (all events by
+    default) and returns the number of rows updated.
+    """
+    if queryset is None:
+        queryset = Event.objects.all()
+
+    updates = {
+        field: _child_aggregate(RSVP, Count('pk', filter=Q(status=status)))
+        for status, field in RSVP.STATUS_COUNT_FIELDS.items()
+    }
+    updates['review_count'] = _child_aggregate(Review, Count('pk'))
+    updates['rating_sum'] = _child_aggregate(Review, Sum('rating'))
+    for rating in range(1, 6):
+        updates[f'rating_{rating}_count'] = _child_aggregate(Review, Count('pk', filter=Q(rating=rating)))
+
+    # Counters may have changed, so cached validators must not match
+    updates['child_version'] = F('child_version') + 1
+    return queryset.order_by().update(**updates)
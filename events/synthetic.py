@@ -0,0 +1,228 @@
+"""
+Synthetic data for load tests and benchmarks.
+
+``generate_synthetic_data`` builds users, events, RSVPs and reviews at any
+scale from a seed, so the same arguments always give the same rows. The
+shape is meant to look like real traffic rather than a uniform grid:
+
+- a small share of users organize most events, and a few "power users"
+  account for a large share of RSVPs and reviews;
+- event popularity follows a Zipf curve, so a handful of events have
+  tens of thousands of RSVPs while most have a few;
+- ``private_share`` of the events are private, and reviews are left only
+  by attendees of events that have already started.
+
+Rows are written with ``bulk_create`` in batches, and every user shares one
+password hash computed up front, so millions of rows take minutes rather
+than hours. ``bulk_create`` skips the model signals, so the denormalized
+counters and the follower table are rebuilt and the caches invalidated
+once everything is in.
+"""
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import invalidate_event
+from .followers import rebuild_followers
+from .models import Event, RSVP, Review, UserProfile
+from .stats import rebuild_event_stats
+
+FIRST_NAMES = (
+    'Aarav', 'Alex', 'Amara', 'Ben', 'Chen', 'Diego', 'Elena', 'Fatima', 'Grace', 'Hiro',
+    'Isla', 'Jonas', 'Kavya', 'Liam', 'Maya', 'Noah', 'Olivia', 'Priya', 'Rosa', 'Sam',
+)
+LAST_NAMES = (
+    'Ahmed', 'Brown', 'Costa', 'Dubois', 'Evans', 'Fischer', 'Garcia', 'Haddad', 'Ito', 'Jones',
+    'Kim', 'Larsen', 'Martin', 'Nguyen', 'Okafor', 'Patel', 'Rossi', 'Silva', 'Tanaka', 'Wilson',
+)
+CITIES = (
+    'San Francisco, CA', 'New York, NY', 'Austin, TX', 'Chicago, IL', 'Seattle, WA', 'Boston, MA',
+    'Denver, CO', 'Miami, FL', 'London', 'Berlin', 'Paris', 'Toronto', 'Bangalore', 'Tokyo', 'Sydney',
+)
+VENUES = ('Convention Center', 'Community Hall', 'City Park', 'Public Library', 'Tech Hub', 'Rooftop Bar', 'Arena')
+TOPICS = (
+    'Python', 'Jazz', 'Startup', 'Photography', 'Marathon', 'Design', 'Data Science', 'Wine Tasting',
+    'Board Game', 'Yoga', 'Film', 'Robotics', 'Poetry', 'Cloud', 'Cooking', 'Chess',
+)
+FORMATS = ('Meetup', 'Workshop', 'Conference', 'Festival', 'Night', 'Summit', 'Hackathon', 'Social')
+COMMENTS = (
+    'Great event, would go again.', 'Well organized and friendly crowd.', 'Too crowded for the venue.',
+    'The talks were excellent.', 'Started late but worth it.', 'Not what the description promised.',
+)
+
+RSVP_STATUS_WEIGHTS = {'Going': 60, 'Maybe': 25, 'Not Going': 15}
+RATING_WEIGHTS = {1: 5, 2: 8, 3: 17, 4: 35, 5: 35}
+
+# Share of users who organize events, and how strongly activity leans
+# towards the lowest-numbered ("power") users; 1 would be uniform
+ORGANIZER_SHARE = 0.05
+ACTIVITY_SKEW = 3
+# Zipf exponent of event popularity
+POPULARITY_EXPONENT = 1.0
+
+
+def skewed_index(rng, size, skew=ACTIVITY_SKEW):
+    """An index in range(size), power-law biased towards 0"""
+    return int(size * rng.random() ** skew)
+
+
+def zipf_allocation(total, caps, exponent=POPULARITY_EXPONENT):
+    """
+    Split ``total`` over slots in proportion to 1 / rank**exponent, rank
+    being the slot's position, with no slot above its cap in ``caps``. The
+    result sums to min(total, sum(caps)); slots with a zero cap get nothing.
+    """
+    weights = [1 / (rank + 1) ** exponent if cap else 0 for rank, cap in enumerate(caps)]
+    scale = total / sum(weights) if any(weights) else 0
+    counts = [min(cap, int(weight * scale)) for weight, cap in zip(weights, caps)]
+    # Hand what rounding and the caps left over to the most popular slots with room
+    remaining = min(total, sum(caps)) - sum(counts)
+    for slot, cap in enumerate(caps):
+        if remaining <= 0:
+            break
+        extra = min(remaining, cap - counts[slot])
+        counts[slot] += extra
+        remaining -= extra
+    return counts
+
+
+def distinct_users(rng, count, user_count):
+    """``count`` distinct user indexes, biased towards the power users unless most users are needed"""
+    if count * 4 > user_count:
+        return rng.sample(range(user_count), count)
+    chosen = set()
+    while len(chosen) < count:
+        chosen.add(skewed_index(rng, user_count))
+    return list(chosen)
+
+
+class _BatchWriter:
+    """Collects model instances and writes them with bulk_create every ``batch_size`` rows"""
+
+    def __init__(self, model, batch_size):
+        self.model = model
+        self.batch_size = batch_size
+        self.batch = []
+        self.written = 0
+
+    def add(self, instance):
+        self.batch.append(instance)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            with transaction.atomic():
+                self.model.objects.bulk_create(self.batch, batch_size=self.batch_size)
+            self.written += len(self.batch)
+            self.batch = []
+
+
+def generate_synthetic_data(users, events, rsvps, reviews, seed=0, batch_size=5000,
+                            prefix='synth', password='password123', private_share=0.15, log=None):
+    """
+    Create the given numbers of synthetic rows and return how many of each
+    were written, as {'users', 'events', 'rsvps', 'reviews'}.
+
+    Usernames are ``<prefix><number>``. RSVPs and reviews are capped at one
+    per (event, user) pair; reviews also at the event's RSVP count. ``log``
+    is called with the duration of each phase as it finishes.
+    """
+    if User.objects.filter(username__startswith=prefix).exists():
+        raise ValueError(f'Users named "{prefix}..." already exist; pick another prefix.')
+    rng = random.Random(seed)
+    log = log or (lambda message: None)
+    now = timezone.now()
+
+    def phase(name, started):
+        log(f'{name}: {time.perf_counter() - started:.1f}s')
+
+    started = time.perf_counter()
+    # One hash for everyone; a seed-derived salt keeps reruns identical
+    password_hash = make_password(password, salt=f'synthetic{seed}')
+    writer = _BatchWriter(User, batch_size)
+    width = len(str(users))
+    for number in range(users):
+        username = f'{prefix}{number:0{width}d}'
+        writer.add(User(
+            username=username, email=f'{username}@example.com', password=password_hash,
+            date_joined=now - timedelta(days=rng.randrange(730)),
+        ))
+    writer.flush()
+    user_ids = list(
+        User.objects.filter(username__startswith=prefix).order_by('id').values_list('id', flat=True)
+    )
+    writer = _BatchWriter(UserProfile, batch_size)
+    for user_id in user_ids:
+        writer.add(UserProfile(
+            user_id=user_id,
+            full_name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            location=rng.choice(CITIES),
+        ))
+    writer.flush()
+    phase('users', started)
+
+    started = time.perf_counter()
+    organizer_count = max(1, int(users * ORGANIZER_SHARE)) if users else 0
+    writer = _BatchWriter(Event, batch_size)
+    first_event_id = (Event.objects.order_by('-id').values_list('id', flat=True).first() or 0)
+    for number in range(events if organizer_count else 0):
+        # Half a year of history and a year of upcoming events
+        start_time = now + timedelta(minutes=rng.randrange(-180 * 24 * 60, 365 * 24 * 60, 15))
+        topic, kind, city = rng.choice(TOPICS), rng.choice(FORMATS), rng.choice(CITIES)
+        writer.add(Event(
+            title=f'{topic} {kind} #{number}',
+            description=f'A {topic.lower()} {kind.lower()} in {city}. ' * rng.randint(1, 6),
+            organizer_id=user_ids[skewed_index(rng, organizer_count)],
+            location=f'{rng.choice(VENUES)}, {city}',
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=rng.choice((1, 2, 3, 4, 8, 48))),
+            is_public=rng.random() >= private_share,
+        ))
+    writer.flush()
+    event_rows = list(Event.objects.filter(id__gt=first_event_id).order_by('id').values_list('id', 'start_time'))
+    phase('events', started)
+
+    started = time.perf_counter()
+    # Popularity is by rank, so shuffle which event gets which rank
+    ranked = event_rows[:]
+    rng.shuffle(ranked)
+    rsvp_counts = zipf_allocation(rsvps, [len(user_ids)] * len(ranked))
+    # Only events that have started can be reviewed, and only by their attendees
+    review_counts = zipf_allocation(reviews, [
+        count if start_time <= now else 0 for (_, start_time), count in zip(ranked, rsvp_counts)
+    ])
+    # Write in event order so the event-leading indexes are appended to, not split
+    plan = sorted(zip(ranked, rsvp_counts, review_counts))
+    statuses, status_weights = list(RSVP_STATUS_WEIGHTS), list(RSVP_STATUS_WEIGHTS.values())
+    ratings, rating_weights = list(RATING_WEIGHTS), list(RATING_WEIGHTS.values())
+    rsvp_writer = _BatchWriter(RSVP, batch_size)
+    review_writer = _BatchWriter(Review, batch_size)
+    for (event_id, start_time), rsvp_count, review_count in plan:
+        # Power users first, so they are the ones who review the most
+        attendees = sorted(distinct_users(rng, rsvp_count, len(user_ids)))
+        for user_index, status in zip(attendees, rng.choices(statuses, status_weights, k=rsvp_count)):
+            rsvp_writer.add(RSVP(event_id=event_id, user_id=user_ids[user_index], status=status))
+        for user_index, rating in zip(attendees[:review_count], rng.choices(ratings, rating_weights, k=review_count)):
+            review_writer.add(Review(
+                event_id=event_id, user_id=user_ids[user_index], rating=rating, comment=rng.choice(COMMENTS),
+            ))
+    rsvp_writer.flush()
+    review_writer.flush()
+    phase('rsvps and reviews', started)
+
+    started = time.perf_counter()
+    rebuild_event_stats(Event.objects.filter(id__gt=first_event_id))
+    rebuild_followers(batch_size=batch_size)
+    invalidate_event()
+    phase('counters and followers', started)
+
+    return {
+        'users': len(user_ids), 'events': len(event_rows),
+        'rsvps': rsvp_writer.written, 'reviews': review_writer.written,
+    }
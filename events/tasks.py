@@ -1,13 +1,155 @@
+import logging
+import smtplib
+import uuid
+from datetime import timedelta
+
 from celery import shared_task
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage, get_connection
 from django.conf import settings
-from .models import Event, RSVP
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from . import metrics
+from .digest import queue_digest_items, send_digests
+from .images import process_profile_picture
+from .models import Event, EventReminder, OrganizerFollower, RSVP, UserProfile
+from .outbox import purge_outbox, relay_outbox
+from .updates import flush_due_updates
+from .pagination import KeysetPaginator
+from .routing import REMINDER_QUEUE, notification_queue, task_queue, throttle
+
+logger = logging.getLogger(__name__)
+
+
+def _wants_digest(user_field='user'):
+    return Exists(UserProfile.objects.filter(user=OuterRef(user_field), notification_digest=True))
+
+
+def _event_created_followers(event):
+    return OrganizerFollower.objects.filter(organizer_id=event.organizer_id)
+
+
+def _event_updated_rsvps(event):
+    return RSVP.objects.filter(event_id=event.id)
+
+
+def event_created_recipients(event):
+    """Emails of everyone who has said they are going to one of the organizer's events, digest users excepted"""
+    return (
+        _event_created_followers(event).filter(~_wants_digest('follower'))
+        .values_list('follower__email', flat=True)
+    )
+
+
+def event_created_digest_users(event):
+    return _event_created_followers(event).filter(_wants_digest('follower')).values_list('follower_id', flat=True)
+
+
+def event_updated_recipients(event):
+    """Emails of everyone who has RSVP'd to the event, digest users excepted"""
+    return _event_updated_rsvps(event).filter(~_wants_digest()).values_list('user__email', flat=True)
+
+
+def event_updated_digest_users(event):
+    return _event_updated_rsvps(event).filter(_wants_digest()).values_list('user_id', flat=True)
+
+
+def reminder_recipients(event):
+    """Emails of everyone going to the event"""
+    return RSVP.objects.filter(event_id=event.id, status='Going').values_list('user__email', flat=True)
+
+
+def notification_chunk_size():
+    return getattr(settings, 'EVENTS_EMAIL_CHUNK_SIZE', 100)
+
+
+def iter_recipient_chunks(recipients, chunk_size=None):
+    """Stream recipient emails in lists of at most chunk_size, skipping blank addresses"""
+    chunk_size = chunk_size or notification_chunk_size()
+    if hasattr(recipients, 'iterator'):
+        recipients = recipients.iterator(chunk_size=2000)
+    chunk = []
+    for email in recipients:
+        if not email:
+            continue
+        chunk.append(email)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def fan_out_notification(subject, message, recipients, queue=None):
+    """Queue one send_notification_chunk task per chunk of recipients and return how many recipients were queued"""
+    chunks = total = 0
+    for chunk in iter_recipient_chunks(recipients):
+        send_notification_chunk.apply_async((subject, message, chunk), queue=queue)
+        chunks += 1
+        total += len(chunk)
+    task_name = metrics.current_task_name()
+    if task_name:
+        metrics.observe('events_task_recipients', total, task_name)
+    return total
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def send_notification_chunk(self, subject, message, recipients):
+    """
+    Send one message per recipient over a single SMTP connection.
+
+    Refused addresses are skipped; if the connection fails, only the
+    recipients that were not sent yet are retried.
+    """
+    return _send_individually(
+        self,
+        [(email, subject, message) for email in recipients],
+        lambda index: (subject, message, recipients[index:]),
+    )
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def send_digest_batch(self, digests):
+    """Send [email, subject, body] digests over a single SMTP connection, retrying like send_notification_chunk"""
+    return _send_individually(self, digests, lambda index: (digests[index:],))
+
+
+def _send_individually(task, entries, retry_args):
+    """Send (email, subject, body) entries over one connection; retry_args(index) resumes from an entry"""
+    metrics.observe('events_task_recipients', len(entries), task.name)
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as exc:
+        metrics.inc('events_smtp_errors_total', task=task.name, kind='connection')
+        raise task.retry(exc=exc)
+
+    queue = task_queue(task)
+    sent = 0
+    try:
+        for index, (email, subject, body) in enumerate(entries):
+            mail = EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [email], connection=connection)
+            throttle(queue)
+            try:
+                sent += connection.send_messages([mail])
+            except smtplib.SMTPRecipientsRefused as e:
+                metrics.inc('events_smtp_errors_total', task=task.name, kind='refused')
+                logger.warning('Skipping refused recipient %s: %s', email, e)
+            except Exception as exc:
+                metrics.inc('events_smtp_errors_total', task=task.name, kind='connection')
+                raise task.retry(args=retry_args(index), exc=exc)
+    finally:
+        connection.close()
+        metrics.inc('events_emails_sent_total', sent, task=task.name)
+    return sent
 
 
 @shared_task
-def send_event_notification(event_id, notification_type, user_email=None):
+def send_event_notification(event_id, notification_type, user_email=None, changes=None):
     """
-    Send email notifications for events
+    Send email notifications for events.
+
+    Returns {'recipients': emails queued, 'digested': digest items added},
+    or None when the event is gone or the notification could not be sent.
     """
     try:
         event = Event.objects.get(id=event_id)
@@ -26,12 +168,8 @@ def send_event_notification(event_id, notification_type, user_email=None):
             '''
             
             # Send to all users who have RSVP'd to organizer's previous events
-            previous_attendees = RSVP.objects.filter(
-                event__organizer=event.organizer,
-                status='Going'
-            ).values_list('user__email', flat=True).distinct()
-            
-            recipient_list = list(previous_attendees)
+            recipients = event_created_recipients(event)
+            digest_users = event_created_digest_users(event)
             
         elif notification_type == 'event_updated':
             subject = f'Event Updated: {event.title}'
@@ -44,9 +182,15 @@ def send_event_notification(event_id, notification_type, user_email=None):
             Start Time: {event.start_time}
             End Time: {event.end_time}
             '''
+            if changes:
+                # Coalesced updates list every [label, old, new] change in the window
+                message += '\n            What changed:\n'
+                for label, old, new in changes:
+                    message += f'            {label}: {old} -> {new}\n'
             
             # Send to all users who have RSVP'd to this event
-            recipient_list = list(event.rsvps.values_list('user__email', flat=True))
+            recipients = event_updated_recipients(event)
+            digest_users = event_updated_digest_users(event)
             
         elif notification_type == 'rsvp_confirmation':
             subject = f'RSVP Confirmation: {event.title}'
@@ -60,34 +204,35 @@ def send_event_notification(event_id, notification_type, user_email=None):
             
             We look forward to seeing you there!
             '''
-            recipient_list = [user_email] if user_email else []
+            recipients = [user_email] if user_email else []
+            digest_users = None
         
         else:
-            return False
+            logger.error('Unknown notification type %r for event %s', notification_type, event_id)
+            return None
         
-        if recipient_list:
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=recipient_list,
-                fail_silently=False,
-            )
-            return True
+        # Users who opted into the daily digest get it there instead
+        digested = queue_digest_items(digest_users, event.id, notification_type) if digest_users is not None else 0
+        # Everyone else gets their own message, sent in chunked subtasks
+        queued = fan_out_notification(subject, message, recipients, notification_queue(notification_type))
+        return {'recipients': queued, 'digested': digested}
         
     except Event.DoesNotExist:
-        return False
-    except Exception as e:
-        print(f"Error sending email: {e}")
-        return False
-    
-    return False
+        logger.info('Skipping %s notification for deleted event %s', notification_type, event_id)
+        return None
+    except Exception:
+        metrics.inc('events_task_errors_total', task=send_event_notification.name)
+        logger.exception('Error sending %s notification for event %s', notification_type, event_id)
+        return None
 
 
 @shared_task
-def send_event_reminder(event_id):
+def send_event_reminder(event_id, kind=None):
     """
-    Send reminder emails 24 hours before event
+    Send reminder emails 24 hours before event.
+
+    Returns {'recipients': emails queued}, or None when the event is gone
+    or the reminder could not be sent.
     """
     try:
         event = Event.objects.get(id=event_id)
@@ -105,24 +250,116 @@ def send_event_reminder(event_id):
         '''
         
         # Send to all users who RSVP'd as 'Going'
-        recipient_list = list(
-            event.rsvps.filter(status='Going').values_list('user__email', flat=True)
-        )
-        
-        if recipient_list:
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=recipient_list,
-                fail_silently=False,
-            )
-            return True
+        recipients = reminder_recipients(event)
+        queued = fan_out_notification(subject, message, recipients, REMINDER_QUEUE)
+        if kind:
+            EventReminder.objects.filter(event_id=event_id, kind=kind).update(sent_at=timezone.now())
+        return {'recipients': queued}
             
     except Event.DoesNotExist:
-        return False
-    except Exception as e:
-        print(f"Error sending reminder: {e}")
-        return False
-    
-    return False
\ No newline at end of file
+        logger.info('Skipping reminder for deleted event %s', event_id)
+        return None
+    except Exception:
+        metrics.inc('events_task_errors_total', task=send_event_reminder.name)
+        logger.exception('Error sending reminder for event %s', event_id)
+        return None
+
+
+# How far ahead of an event's start each reminder kind is sent
+REMINDER_WINDOWS = {
+    '24h': timedelta(hours=24),
+}
+
+
+def reminder_batch_size():
+    return getattr(settings, 'EVENTS_REMINDER_BATCH_SIZE', 500)
+
+
+def reminder_claim_timeout():
+    return timedelta(seconds=getattr(settings, 'EVENTS_REMINDER_CLAIM_TIMEOUT', 1800))
+
+
+def _reclaimable(now):
+    """Markers whose reminder was never sent and whose claim has gone stale"""
+    return Q(sent_at__isnull=True, claimed_at__lt=now - reminder_claim_timeout())
+
+
+def pending_reminders(kind, now=None):
+    """Events starting within the window of ``kind`` whose reminder is unclaimed, or claimed but stale"""
+    now = now or timezone.now()
+    claimed = EventReminder.objects.filter(event=OuterRef('pk'), kind=kind).exclude(_reclaimable(now))
+    return Event.objects.filter(
+        start_time__gte=now,
+        start_time__lt=now + REMINDER_WINDOWS[kind],
+    ).filter(~Exists(claimed))
+
+
+def claim_reminders(event_ids, kind, token, now=None):
+    """Insert reminder markers, take over stale ones, and return the ids of the events this token won"""
+    now = now or timezone.now()
+    EventReminder.objects.bulk_create(
+        [EventReminder(event_id=event_id, kind=kind, claim_token=token) for event_id in event_ids],
+        ignore_conflicts=True,
+    )
+    EventReminder.objects.filter(_reclaimable(now), kind=kind, event_id__in=event_ids).update(
+        claim_token=token, claimed_at=now,
+    )
+    return list(
+        EventReminder.objects.filter(claim_token=token, kind=kind, event_id__in=event_ids)
+        .values_list('event_id', flat=True)
+    )
+
+
+@shared_task
+def schedule_event_reminders(kind='24h'):
+    """
+    Queue reminders for events starting within the window of ``kind``.
+
+    Events are read in keyset batches over the start_time index, so memory
+    stays bounded however many events a sweep finds. A reminder is only
+    queued once its marker has been claimed, so overlapping sweeps never
+    queue the same reminder together. A claim whose reminder was not sent
+    within EVENTS_REMINDER_CLAIM_TIMEOUT (lost publish, crashed worker,
+    failed send) is taken over by a later sweep, so delivery is at least
+    once, like the outbox.
+    """
+    token = uuid.uuid4().hex
+    pending = pending_reminders(kind).only('id', 'start_time')
+
+    paginator = KeysetPaginator(ordering=('start_time', 'id'), page_size=reminder_batch_size())
+    cursor = None
+    queued = 0
+    while True:
+        page = paginator.paginate(pending, cursor)
+        for event_id in claim_reminders([event.id for event in page], kind, token):
+            send_event_reminder.delay(event_id, kind)
+            queued += 1
+        if not page.has_next:
+            return queued
+        cursor = page.next_cursor
+
+
+@shared_task
+def relay_outbox_task():
+    """Periodic fallback for deployments without a dedicated relay_outbox process"""
+    purge_outbox()
+    return relay_outbox()
+
+
+@shared_task
+def flush_event_updates():
+    """Send the coalesced event_updated notifications whose window has closed"""
+    return flush_due_updates()
+
+
+@shared_task
+def send_daily_digests():
+    """Send every pending digest; scheduled once a day"""
+    return send_digests()
+
+
+@shared_task
+def build_profile_picture_variants(profile_id, force=False):
+    """Resize a newly uploaded profile picture; queued through the outbox"""
+    variants = process_profile_picture(profile_id, force=force)
+    return sorted(variants) if variants else []
@@ -1,13 +1,89 @@
-from django.test import TestCase
-from django.contrib.auth.models import User
+import os
+import re
+import smtplib
+import tempfile
+from unittest import mock
+from io import BytesIO, StringIO
+from PIL import Image
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User, AnonymousUser
+from django.core.cache import caches
+from django.core import mail
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.locmem import EmailBackend as LocmemEmailBackend
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, pre_delete
+from django.http import HttpResponse
 from rest_framework.test import APITestCase
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from . import async_views, urls as events_urls
+from event_management.celery import app as celery_app
 from rest_framework import status
-from django.urls import reverse
-from .models import Event, RSVP, Review, UserProfile
+from django.urls import resolve, reverse
+from .authentication import CachedJWTAuthentication
+from .bulk import bulk_upsert_rsvps
+from .checks import check_shared_caches
+from .detail import event_attendees, event_reviews, load_event_detail
+from .endpoint_benchmark import (
+    compare_reports, endpoint_errors, query_shape, repeated_query_regressions, run_endpoint_benchmark,
+    scaling_regressions, uncovered_routes,
+)
+from .facets import event_facets
+from .images import process_profile_picture, stale_profiles
+from .digest import send_digests
+from .metrics import snapshot, task_summary
+from .cache import LIST_VERSION_KEY, cache_stats, cached_response, reset_cache_stats
+from .models import (
+    DigestItem, Event, EventReminder, OrganizerFollower, OutboxMessage, PendingEventUpdate, RSVP, Review,
+    UserProfile,
+)
+from .outbox import enqueue, purge_outbox, relay_outbox
+from .routing import throttle
+from .search import SEARCH_ORDERING, search_events
+from .serializers import UserProfileSerializer
+from .synthetic import generate_synthetic_data
+from .tasks import (
+    claim_reminders, event_created_digest_users, event_created_recipients, event_updated_digest_users,
+    event_updated_recipients, reminder_recipients,
+    pending_reminders, schedule_event_reminders, send_event_notification, send_notification_chunk,
+)
+from .updates import event_snapshot, flush_due_updates, record_event_update
+from .visibility import visible_events
 from datetime import datetime, timedelta
 from django.utils import timezone
 
 
+def make_event(organizer, title='Event', start=None, hours=1, **fields):
+    """
+    Create an event starting at ``start`` (tomorrow by default) and lasting
+    ``hours``. The description defaults to the title, the location to 'Hall'.
+    """
+    start = start or timezone.now() + timedelta(days=1)
+    fields.setdefault('description', title)
+    fields.setdefault('location', 'Hall')
+    return Event.objects.create(
+        title=title, organizer=organizer, start_time=start, end_time=start + timedelta(hours=hours), **fields,
+    )
+
+
+class EagerCeleryMixin:
+    """Run Celery tasks in-process, as without a broker, for the duration of each test"""
+
+    def setUp(self):
+        super().setUp()
+        eager = celery_app.conf.task_always_eager
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, 'task_always_eager', eager)
+
+
 class EventAPITestCase(APITestCase):
     def setUp(self):
         self.user = User.objects.create_user(
@@ -73,6 +149,18 @@ class EventAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 1)
     
+    def test_list_loads_organizers_with_the_events(self):
+        with CaptureQueriesContext(connection) as before:
+            self.client.get('/api/events/')
+        for number in range(3):
+            organizer = User.objects.create_user(username=f'host{number}')
+            UserProfile.objects.create(user=organizer, full_name=f'Host {number}')
+            make_event(organizer, f'Event {number}', start=timezone.now() + timedelta(days=2), location='Annex')
+        with CaptureQueriesContext(connection) as after:
+            response = self.client.get('/api/events/')
+        self.assertEqual(len(response.data['results']), 4)
+        self.assertEqual(len(after), len(before))
+
     def test_rsvp_to_event(self):
         self.client.force_authenticate(user=self.user)
         response = self.client.post(f'/api/events/{self.event.id}/rsvp/', {'status': 'Going'})
@@ -104,3 +192,1658 @@ class EventAPITestCase(APITestCase):
             {'title': 'Updated Event Title'}
         )
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class EventCounterTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='attendee', email='attendee@example.com', password='testpass123')
+        self.other = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        self.organizer = User.objects.create_user(username='host', email='host@example.com', password='testpass123')
+        self.event = Event.objects.create(
+            title='Counter Event',
+            description='Counter Description',
+            organizer=self.organizer,
+            location='Counter Location',
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2),
+        )
+
+    def assertCounters(self, **expected):
+        self.event.refresh_from_db()
+        for field, value in expected.items():
+            self.assertEqual(getattr(self.event, field), value, field)
+
+    def test_rsvp_counters_follow_api_writes(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.post(f'/api/events/{self.event.id}/rsvp/', {'status': 'Going'})
+        self.assertCounters(going_count=1, maybe_count=0, not_going_count=0)
+
+        self.client.post(f'/api/events/{self.event.id}/rsvp/', {'status': 'Maybe'})
+        self.assertCounters(going_count=0, maybe_count=1, not_going_count=0)
+
+        self.client.patch(f'/api/events/{self.event.id}/rsvp/{self.user.id}/', {'status': 'Not Going'})
+        self.assertCounters(going_count=0, maybe_count=0, not_going_count=1)
+
+    def test_rsvp_counters_follow_template_view(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse('rsvp_event', args=[self.event.id]), {'status': 'Going'})
+        self.client.post(reverse('rsvp_event', args=[self.event.id]), {'status': 'Going'})
+        self.assertCounters(going_count=1)
+
+    def test_review_counters_and_histogram(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse('submit_review', args=[self.event.id]), {'rating': 4, 'comment': 'Good'})
+        Review.objects.create(event=self.event, user=self.other, rating=2, comment='Meh')
+        self.assertCounters(review_count=2, rating_sum=6, rating_4_count=1, rating_2_count=1)
+        self.assertEqual(self.event.average_rating, 3)
+
+        self.client.post(reverse('submit_review', args=[self.event.id]), {'rating': 5, 'comment': 'Great'})
+        self.assertCounters(review_count=2, rating_sum=7, rating_4_count=0, rating_5_count=1)
+
+        self.client.post(reverse('delete_review', args=[self.event.id]))
+        self.assertCounters(review_count=1, rating_sum=2, rating_5_count=0)
+        self.assertEqual(self.event.rating_histogram, {1: 0, 2: 1, 3: 0, 4: 0, 5: 0})
+
+    def test_cascade_delete_updates_counters(self):
+        RSVP.objects.create(event=self.event, user=self.user, status='Going')
+        RSVP.objects.create(event=self.event, user=self.other, status='Going')
+        Review.objects.create(event=self.event, user=self.user, rating=5, comment='Great')
+        self.user.delete()
+        self.assertCounters(going_count=1, review_count=0, rating_sum=0, rating_5_count=0)
+
+    def test_detail_page_does_not_aggregate_children(self):
+        RSVP.objects.create(event=self.event, user=self.user, status='Going')
+        Review.objects.create(event=self.event, user=self.user, rating=5, comment='Great')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('event_detail', args=[self.event.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['rsvp_count'], 1)
+        self.assertEqual(response.context['review_count'], 1)
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'].upper())
+            self.assertNotIn('AVG(', query['sql'].upper())
+
+    def test_detail_loader_query_count_is_constant(self):
+        RSVP.objects.create(event=self.event, user=self.user, status='Going')
+        Review.objects.create(event=self.event, user=self.user, rating=5, comment='Great')
+
+        def page_queries():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('event_detail', args=[self.event.id]))
+            self.assertEqual(response.status_code, 200)
+            return len(queries)
+
+        self.client.force_login(self.user)
+        with self.assertNumQueries(5):
+            context = load_event_detail(self.user, self.event.id)
+        self.assertEqual(context['user_rsvp'].status, 'Going')
+        self.assertEqual(context['user_review'].rating, 5)
+        small_page = page_queries()
+
+        for i in range(20):
+            guest = User.objects.create_user(username=f'guest{i}', password='testpass123')
+            RSVP.objects.create(event=self.event, user=guest, status='Maybe')
+            Review.objects.create(event=self.event, user=guest, rating=3, comment='Fine')
+        with self.assertNumQueries(5):
+            context = load_event_detail(self.user, self.event.id)
+        # Only the first page of attendees and other reviews is loaded
+        self.assertEqual(len(context['rsvps']), 20)
+        self.assertIsNotNone(context['rsvps'].next_cursor)
+        self.assertEqual(len(context['reviews']), 20)
+        self.assertEqual(page_queries(), small_page)
+
+        with self.assertNumQueries(3):
+            context = load_event_detail(AnonymousUser(), self.event.id)
+        self.assertIsNone(context['user_rsvp'])
+
+    def test_rebuild_event_stats_repairs_drift(self):
+        RSVP.objects.create(event=self.event, user=self.user, status='Maybe')
+        Review.objects.create(event=self.event, user=self.user, rating=3, comment='Okay')
+        Event.objects.filter(pk=self.event.pk).update(maybe_count=7, review_count=0, rating_sum=0, rating_3_count=0)
+
+        call_command('rebuild_event_stats', stdout=StringIO())
+        self.assertCounters(maybe_count=1, review_count=1, rating_sum=3, rating_3_count=1)
+
+
+class VisibilityTestCase(TestCase):
+    def setUp(self):
+        self.viewer = User.objects.create_user(username='viewer', password='testpass123')
+        self.organizer = User.objects.create_user(username='host', password='testpass123')
+        start = timezone.now() + timedelta(days=1)
+        self.public_event = make_event(self.organizer, 'Public', start=start)
+        self.private_event = make_event(self.organizer, 'Private', start=start, is_public=False)
+        self.own_private_event = make_event(self.viewer, 'Own private', start=start, is_public=False)
+        self.invited_event = make_event(self.organizer, 'Invited', start=start, is_public=False)
+        RSVP.objects.create(event=self.invited_event, user=self.viewer, status='Maybe')
+        # Several RSVPs on one event used to duplicate rows before DISTINCT
+        for i in range(3):
+            guest = User.objects.create_user(username=f'guest{i}', password='testpass123')
+            RSVP.objects.create(event=self.public_event, user=guest, status='Going')
+
+    def test_matches_legacy_or_join(self):
+        legacy = Event.objects.filter(
+            Q(is_public=True) | Q(organizer=self.viewer) | Q(rsvps__user=self.viewer)
+        ).distinct()
+        self.assertCountEqual(visible_events(self.viewer), legacy)
+        self.assertCountEqual(
+            visible_events(self.viewer).values_list('title', flat=True),
+            ['Public', 'Own private', 'Invited'],
+        )
+
+    def test_anonymous_sees_public_only(self):
+        self.assertEqual(list(visible_events(AnonymousUser())), [self.public_event])
+
+    def test_query_has_no_join_or_distinct(self):
+        sql = str(visible_events(self.viewer).query).upper()
+        self.assertIn('EXISTS', sql)
+        self.assertNotIn('DISTINCT', sql)
+        self.assertNotIn('JOIN', sql)
+
+    def test_private_event_detail_hidden(self):
+        self.client.force_login(self.viewer)
+        response = self.client.get(reverse('event_detail', args=[self.private_event.id]))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('event_detail', args=[self.invited_event.id]))
+        self.assertEqual(response.status_code, 200)
+
+
+class KeysetPaginationTestCase(APITestCase):
+    def setUp(self):
+        # Totals are cached by query, so start every test from a clean cache
+        caches['default'].clear()
+        self.organizer = User.objects.create_user(username='host', password='testpass123')
+        start = timezone.now() + timedelta(days=1)
+        # Pairs of events share a start time so ties are broken by id
+        for i in range(25):
+            make_event(self.organizer, f'Event {i}', start=start + timedelta(hours=i // 2), location='Here')
+        self.expected = list(Event.objects.order_by('start_time', 'id').values_list('id', flat=True))
+
+    def test_api_walks_every_event_once_in_order(self):
+        seen = []
+        url = '/api/events/'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            seen += [item['id'] for item in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, self.expected)
+
+    def test_api_previous_link_returns_to_prior_page(self):
+        first = self.client.get('/api/events/').data
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertEqual([item['id'] for item in back['results']], [item['id'] for item in first['results']])
+        self.assertEqual([item['id'] for item in second['results']], self.expected[10:20])
+
+    def test_api_count_only_on_request(self):
+        response = self.client.get('/api/events/', {'count': 'true'})
+        self.assertEqual(response.data['count'], 25)
+
+    def test_api_invalid_cursor(self):
+        response = self.client.get('/api/events/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_template_list_uses_cursor_links(self):
+        response = self.client.get(reverse('event_list'))
+        page = response.context['page_obj']
+        self.assertEqual([event.id for event in page], self.expected[:12])
+        self.assertIsNone(page.count)
+        response = self.client.get(reverse('event_list') + '?' + response.context['next_query'])
+        self.assertEqual([event.id for event in response.context['page_obj']], self.expected[12:24])
+
+
+class EventSearchTestCase(APITestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user(username='host', password='testpass123')
+        start = timezone.now() + timedelta(days=1)
+        self.jazz = make_event(
+            self.organizer, 'Jazz Night', start=start, location='Blue Note',
+            description='Live saxophone & <b>brass</b> quartet',
+        )
+        self.rock = make_event(
+            self.organizer, 'Rock Concert', start=start, location='Stadium',
+            description='Loud guitars and a jazz encore',
+        )
+        self.quiz = make_event(
+            self.organizer, 'Pub Quiz', start=start, description='Trivia evening', location='Jazzland Tavern',
+        )
+        self.other = make_event(
+            self.organizer, 'Chess Club', start=start, description='Weekly games', location='Library',
+        )
+
+    def test_ranking_prefers_title_matches(self):
+        response = self.client.get('/api/events/', {'search': 'jazz'})
+        ids = [item['id'] for item in response.data['results']]
+        self.assertEqual(ids[0], self.jazz.id)
+        self.assertCountEqual(ids, [self.jazz.id, self.rock.id, self.quiz.id])
+
+    def test_ranked_results_page_by_cursor(self):
+        seen = []
+        url = '/api/events/?search=jazz&page_size=1'
+        while url:
+            response = self.client.get(url)
+            seen += [item['id'] for item in response.data['results']]
+            url = response.data['next']
+        first = self.client.get('/api/events/', {'search': 'jazz'}).data['results']
+        self.assertEqual(seen, [item['id'] for item in first])
+
+    def test_prefix_matching(self):
+        response = self.client.get('/api/events/', {'search': 'saxo'})
+        self.assertEqual([item['id'] for item in response.data['results']], [self.jazz.id])
+
+    def test_snippet_is_escaped_and_highlighted(self):
+        response = self.client.get('/api/events/', {'search': 'brass'})
+        snippet = response.data['results'][0]['search_snippet']
+        self.assertIn('<mark>brass</mark>', snippet)
+        self.assertIn('&amp;', snippet)
+        self.assertNotIn('<b>', snippet)
+        self.assertNotIn('search_snippet', self.client.get('/api/events/').data['results'][0])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.other.title = 'Jazz Chess'
+        self.other.save()
+        self.jazz.delete()
+        ids = [event.id for event in search_events(Event.objects.all(), 'jazz')]
+        self.assertCountEqual(ids, [self.other.id, self.rock.id, self.quiz.id])
+
+    def test_template_list_search(self):
+        response = self.client.get(reverse('event_list'), {'search': 'quiz'})
+        self.assertEqual([event.id for event in response.context['page_obj']], [self.quiz.id])
+        self.assertContains(response, '<mark>')
+
+    def test_fts_syntax_is_not_interpreted(self):
+        response = self.client.get('/api/events/', {'search': 'jazz" OR NEAR('})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO events_event_fts(events_event_fts) VALUES ('delete-all')")
+        self.assertFalse(search_events(Event.objects.all(), 'chess').exists())
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertTrue(search_events(Event.objects.all(), 'chess').exists())
+
+
+class QueryPlanTestCase(TestCase):
+    """
+    Run EXPLAIN QUERY PLAN on the hot view and task queries and fail if any
+    of them falls back to a full table scan.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='planner', password='testpass123')
+        self.event = make_event(self.user, 'Planned')
+
+    def assertNoFullScan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = [row[-1] for row in cursor.fetchall()]
+        full_scans = [detail for detail in plan if re.fullmatch(r'SCAN \w+', detail)]
+        self.assertEqual(full_scans, [], '\n'.join(plan))
+
+    def test_event_list_queries(self):
+        anonymous = visible_events(AnonymousUser()).order_by('start_time', 'id')
+        self.assertNoFullScan(anonymous[:12])
+        self.assertNoFullScan(anonymous.filter(location='Hall')[:12])
+        self.assertNoFullScan(visible_events(self.user).order_by('start_time', 'id')[:12])
+        self.assertNoFullScan(visible_events(self.user).filter(organizer=self.user).order_by('start_time', 'id')[:12])
+        self.assertNoFullScan(search_events(visible_events(self.user), 'planned').order_by(*SEARCH_ORDERING)[:12])
+
+    def test_event_detail_queries(self):
+        self.assertNoFullScan(visible_events(self.user).filter(id=self.event.id))
+        self.assertNoFullScan(self.event.rsvps.order_by('created_at'))
+        self.assertNoFullScan(self.event.reviews.order_by('-created_at'))
+        self.assertNoFullScan(RSVP.objects.filter(event=self.event, user=self.user))
+        self.assertNoFullScan(event_attendees(self.event, 'Going').order_by('created_at', 'id')[:21])
+        self.assertNoFullScan(event_reviews(self.event, self.user).order_by('-created_at', '-id')[:21])
+
+    def test_api_user_collections(self):
+        self.assertNoFullScan(RSVP.objects.filter(user=self.user).order_by('created_at', 'id')[:10])
+        self.assertNoFullScan(Review.objects.filter(user=self.user).order_by('created_at', 'id')[:10])
+        self.assertNoFullScan(RSVP.objects.filter(user=self.user, status='Going'))
+
+    def test_task_queries(self):
+        now = timezone.now()
+        self.assertNoFullScan(Event.objects.filter(start_time__gt=now, start_time__lte=now + timedelta(hours=24)))
+        self.assertNoFullScan(pending_reminders('24h').only('id', 'start_time').order_by('start_time', 'id')[:500])
+        self.assertNoFullScan(reminder_recipients(self.event))
+        self.assertNoFullScan(event_updated_recipients(self.event))
+        self.assertNoFullScan(event_created_recipients(self.event))
+        self.assertNoFullScan(event_updated_digest_users(self.event))
+        self.assertNoFullScan(event_created_digest_users(self.event))
+        self.assertNoFullScan(DigestItem.objects.order_by('user_id').values_list('user_id', flat=True).distinct()[:100])
+
+
+class EventSubResourceTestCase(APITestCase):
+    def setUp(self):
+        caches['events'].clear()
+        self.organizer = User.objects.create_user(username='host', password='testpass123')
+        self.event = make_event(self.organizer, 'Big Event', hours=2, description='Big')
+        self.guests = []
+        for i, rsvp_status in enumerate(['Going', 'Maybe', 'Going', 'Not Going', 'Going']):
+            guest = User.objects.create_user(username=f'guest{i}', password='testpass123')
+            RSVP.objects.create(event=self.event, user=guest, status=rsvp_status)
+            Review.objects.create(event=self.event, user=guest, rating=i + 1, comment=f'Review {i}')
+            self.guests.append(guest)
+
+    def test_attendees_are_paginated_and_filtered(self):
+        url = f'/api/events/{self.event.id}/attendees/'
+        self.client.force_authenticate(user=self.guests[0])
+        response = self.client.get(url, {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([rsvp['user']['username'] for rsvp in response.data['results']], ['guest0', 'guest1'])
+        self.assertNotIn('email', response.data['results'][0]['user'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([rsvp['user']['username'] for rsvp in response.data['results']], ['guest2', 'guest3'])
+
+        response = self.client.get(url, {'status': 'Going', 'count': 'true'})
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual({rsvp['status'] for rsvp in response.data['results']}, {'Going'})
+
+        response = self.client.get(url, {'status': 'Interested'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_attendees_are_for_the_organizer_and_attendees(self):
+        url = f'/api/events/{self.event.id}/attendees/'
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+        stranger = User.objects.create_user(username='stranger', password='testpass123')
+        self.client.force_authenticate(user=stranger)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=self.organizer)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    def test_reviews_are_paginated_newest_first(self):
+        self.client.force_authenticate(user=self.guests[0])
+        response = self.client.get(f'/api/events/{self.event.id}/reviews/', {'page_size': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([review['comment'] for review in response.data['results']],
+                         ['Review 4', 'Review 3', 'Review 2'])
+        self.assertIsNotNone(response.data['next'])
+
+    @override_settings(EVENTS_DETAIL_PAGE_SIZE=2)
+    def test_detail_page_loads_more(self):
+        self.client.force_login(self.guests[0])
+        response = self.client.get(reverse('event_detail', args=[self.event.id]))
+        self.assertEqual([rsvp.user.username for rsvp in response.context['rsvps']], ['guest0', 'guest1'])
+        # The viewer's own review is shown separately
+        self.assertEqual([review.comment for review in response.context['reviews']], ['Review 4', 'Review 3'])
+        self.assertContains(response, 'Load more attendees')
+
+        cursor = response.context['rsvps'].next_cursor
+        response = self.client.get(reverse('event_attendees', args=[self.event.id]), {'cursor': cursor})
+        self.assertEqual([rsvp.user.username for rsvp in response.context['rsvps']], ['guest2', 'guest3'])
+        self.assertNotContains(response, '<html')
+
+        cursor = response.context['rsvps'].next_cursor
+        response = self.client.get(reverse('event_attendees', args=[self.event.id]), {'cursor': cursor})
+        self.assertEqual([rsvp.user.username for rsvp in response.context['rsvps']], ['guest4'])
+        self.assertNotContains(response, 'Load more attendees')
+
+        cursor = self.client.get(reverse('event_detail', args=[self.event.id])).context['reviews'].next_cursor
+        response = self.client.get(reverse('event_reviews', args=[self.event.id]), {'cursor': cursor})
+        self.assertEqual([review.comment for review in response.context['reviews']], ['Review 2', 'Review 1'])
+
+        response = self.client.get(reverse('event_reviews', args=[self.event.id]), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 404)
+
+
+class EventFacetTestCase(TestCase):
+    def setUp(self):
+        caches['events'].clear()
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+        self.viewer = User.objects.create_user(username='viewer', password='testpass123')
+        midnight = timezone.make_aware(datetime.combine(timezone.localdate(), datetime.min.time()))
+        self.week_event = make_event(self.alice, 'Hall event', start=midnight + timedelta(days=3, hours=12))
+        make_event(self.alice, 'Hall event', start=midnight + timedelta(days=60))
+        private = make_event(
+            self.bob, 'Garden event', start=midnight - timedelta(days=2), location='Garden', is_public=False,
+        )
+        RSVP.objects.create(event=private, user=self.viewer, status='Going')
+
+    def test_facets_count_visible_events_in_one_query(self):
+        with self.assertNumQueries(1):
+            facets = event_facets(AnonymousUser())
+        self.assertEqual(facets['organizers'], [{'id': self.alice.id, 'username': 'alice', 'count': 2}])
+        self.assertEqual(facets['locations'], [{'value': 'Hall', 'count': 2}])
+        self.assertEqual([(bucket['value'], bucket['count']) for bucket in facets['dates']], [('week', 1), ('later', 1)])
+
+        facets = event_facets(self.viewer)
+        self.assertEqual([(organizer['username'], organizer['count']) for organizer in facets['organizers']],
+                         [('alice', 2), ('bob', 1)])
+        self.assertEqual(facets['locations'], [{'value': 'Hall', 'count': 2}, {'value': 'Garden', 'count': 1}])
+        self.assertEqual(facets['dates'][0], {'value': 'past', 'label': 'Past', 'count': 1})
+
+    def test_facets_are_cached_until_events_change(self):
+        event_facets(AnonymousUser())
+        with self.assertNumQueries(0):
+            event_facets(AnonymousUser())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_event(self.bob, 'Garden event', start=timezone.now() + timedelta(days=90), location='Garden')
+        facets = event_facets(AnonymousUser())
+        self.assertEqual([organizer['username'] for organizer in facets['organizers']], ['alice', 'bob'])
+
+    def test_list_page_loads_organizers_with_the_events(self):
+        def page_queries():
+            caches['events'].clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(reverse('event_list')).status_code, 200)
+            return len(queries)
+
+        before = page_queries()
+        for number in range(3):
+            organizer = User.objects.create_user(username=f'host{number}')
+            make_event(organizer, 'Annex event', start=timezone.now() + timedelta(days=number + 1), location='Annex')
+        self.assertEqual(page_queries(), before)
+
+    def test_list_filters_by_date_bucket(self):
+        response = self.client.get(reverse('event_list'), {'when': 'week'})
+        self.assertEqual(list(response.context['events']), [self.week_event])
+        self.assertContains(response, 'alice (2)')
+
+        response = self.client.get(reverse('event_list'), {'when': 'someday'})
+        self.assertEqual(len(response.context['events']), 2)
+
+
+class CachedJWTAuthenticationTestCase(APITestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.user = User.objects.create_user(username='tokened', password='testpass123')
+        UserProfile.objects.create(user=self.user, full_name='Tokened')
+        self.token = AccessToken.for_user(self.user)
+        self.authentication = CachedJWTAuthentication()
+
+    def test_user_and_profile_come_from_the_cache(self):
+        with self.assertNumQueries(1):
+            user = self.authentication.get_user(self.token)
+        with self.assertNumQueries(0):
+            user = self.authentication.get_user(self.token)
+            self.assertEqual(user.userprofile.full_name, 'Tokened')
+        self.assertEqual(user, self.user)
+
+        profile = self.user.userprofile
+        profile.full_name = 'Renamed'
+        with self.captureOnCommitCallbacks() as callbacks:
+            profile.save()
+        # Other requests still read the old row until the change commits
+        self.assertEqual(self.authentication.get_user(self.token).userprofile.full_name, 'Tokened')
+        for callback in callbacks:
+            callback()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authentication.get_user(self.token).userprofile.full_name, 'Renamed')
+
+    def test_saved_changes_apply_at_once(self):
+        self.authentication.get_user(self.token)
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.get_user(self.token)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.get_user(self.token)
+
+    def test_cache_holds_no_password_hash(self):
+        self.authentication.get_user(self.token)
+        entry = caches['default'].get(f'events:auth:user:v2:{self.user.pk}')
+        self.assertNotIn(self.user.password, repr(entry))
+
+        # simplejwt modules hold on to api_settings, so override_settings can't reach it
+        with mock.patch.object(jwt_settings, 'CHECK_REVOKE_TOKEN', True):
+            token = AccessToken.for_user(self.user)
+            user = self.authentication.get_user(token)
+            self.assertEqual((user.username, user.userprofile.full_name), ('tokened', 'Tokened'))
+            # The hash is deferred, so saving the cached user keeps it
+            user.first_name = 'Token'
+            user.save()
+            self.user.refresh_from_db()
+            self.assertEqual(self.user.first_name, 'Token')
+            self.assertTrue(self.user.check_password('testpass123'))
+
+            self.user.set_password('changed456')
+            with self.captureOnCommitCallbacks(execute=True):
+                self.user.save()
+            with self.assertRaises(AuthenticationFailed):
+                self.authentication.get_user(token)
+
+    def test_api_requests_skip_the_user_query(self):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {self.token}'}
+        with CaptureQueriesContext(connection) as cold:
+            self.assertEqual(self.client.get('/api/rsvps/', **headers).status_code, status.HTTP_200_OK)
+        with CaptureQueriesContext(connection) as warm:
+            self.assertEqual(self.client.get('/api/rsvps/', **headers).status_code, status.HTTP_200_OK)
+        self.assertEqual(len(warm), len(cold) - 1)
+        self.assertFalse([query for query in warm.captured_queries if 'FROM "auth_user"' in query['sql']])
+
+        response = self.client.get('/api/rsvps/', HTTP_AUTHORIZATION='Bearer not-a-token')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deploy_check_wants_a_shared_cache(self):
+        # The shipped settings leave rate limits off, so they pass the check
+        self.assertEqual([message.id for message in check_shared_caches(None)], ['events.W001'])
+        rates = {'RATES': {'bulk': 50}}
+        with override_settings(EVENTS_QUEUE_RATE_LIMITS={'ALIAS': 'default', **rates}):
+            self.assertEqual([message.id for message in check_shared_caches(None)], ['events.W001', 'events.E002'])
+        with override_settings(EVENTS_AUTH_CACHE={'ALIAS': 'shared'}, EVENTS_QUEUE_RATE_LIMITS={'ALIAS': 'shared', **rates},
+                               CACHES={
+                                   'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                                   'shared': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+                               }):
+            self.assertEqual(check_shared_caches(None), [])
+
+
+class BulkRSVPTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='kiosk', password='testpass123')
+        self.organizer = User.objects.create_user(username='host', password='testpass123')
+        self.guests = [User.objects.create_user(username=f'guest{i}', password='testpass123') for i in range(3)]
+        start = timezone.now() + timedelta(days=1)
+        self.events = [make_event(self.organizer, f'Bulk {i}', start=start, is_public=i != 2) for i in range(3)]
+
+    def test_caller_upserts_many_events(self):
+        RSVP.objects.create(event=self.events[0], user=self.user, status='Maybe')
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post('/api/rsvps/bulk/', {'rsvps': [
+            {'event': self.events[0].id, 'status': 'Going'},
+            {'event': self.events[1].id, 'status': 'Going'},
+            {'event': self.events[2].id, 'status': 'Going'},
+            {'event': self.events[1].id, 'status': 'Wrong'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['result'] for item in response.data['results']],
+                         ['updated', 'created', 'error', 'error'])
+        self.assertEqual(response.data['results'][2]['errors'], {'event': ['Event not found.']})
+        self.assertIn('status', response.data['results'][3]['errors'])
+        self.assertEqual(RSVP.objects.get(event=self.events[0], user=self.user).status, 'Going')
+
+        self.events[0].refresh_from_db()
+        self.assertEqual((self.events[0].going_count, self.events[0].maybe_count), (1, 0))
+
+    def test_organizer_upserts_many_users(self):
+        self.client.force_authenticate(user=self.organizer)
+        items = [{'event': self.events[2].id, 'user': guest.id, 'status': 'Going'} for guest in self.guests]
+        # Two more than the counters alone: insert and bump the follower rows;
+        # one more to look up whom to confirm (these guests have no email)
+        with self.assertNumQueries(10):
+            response = self.client.post('/api/rsvps/bulk/', items, format='json')
+        self.assertEqual(response.data['created'], 3)
+        self.events[2].refresh_from_db()
+        self.assertEqual(self.events[2].going_count, 3)
+
+    def test_created_and_changed_rsvps_are_confirmed(self):
+        for guest in self.guests:
+            guest.email = f'{guest.username}@example.com'
+            guest.save()
+        RSVP.objects.create(event=self.events[2], user=self.guests[0], status='Going')
+        RSVP.objects.create(event=self.events[2], user=self.guests[1], status='Maybe')
+        self.client.force_authenticate(user=self.organizer)
+        response = self.client.post('/api/rsvps/bulk/', [
+            {'event': self.events[2].id, 'user': guest.id, 'status': 'Going'} for guest in self.guests
+        ], format='json')
+        self.assertEqual([item['result'] for item in response.data['results']], ['unchanged', 'updated', 'created'])
+        self.assertEqual(
+            [message.args for message in OutboxMessage.objects.order_by('id')],
+            [[self.events[2].id, 'rsvp_confirmation', f'guest{i}@example.com'] for i in (1, 2)],
+        )
+
+    def test_only_organizer_may_rsvp_for_others(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post('/api/rsvps/bulk/', [
+            {'event': self.events[0].id, 'user': self.guests[0].id, 'status': 'Going'},
+        ], format='json')
+        self.assertEqual(response.data['error'], 1)
+        self.assertFalse(RSVP.objects.exists())
+
+    def test_rejects_empty_and_oversized_batches(self):
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.post('/api/rsvps/bulk/', [], format='json').status_code, 400)
+        with self.settings(EVENTS_BULK_RSVP_MAX_ITEMS=1):
+            response = self.client.post('/api/rsvps/bulk/', [
+                {'event': self.events[0].id, 'status': 'Going'},
+                {'event': self.events[1].id, 'status': 'Going'},
+            ], format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class EventImportTestCase(APITestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user(username='importer', password='testpass123')
+
+    def _csv(self):
+        return (
+            'title,description,location,start_time,end_time,is_public\n'
+            'Meetup,Monthly meetup,Hall A,2030-01-01T18:00:00Z,2030-01-01T20:00:00Z,true\n'
+            'No Place,Missing location,  ,2030-01-02T18:00:00Z,2030-01-02T20:00:00Z,false\n'
+            'Backwards,Ends early,Hall B,2030-01-03T18:00:00Z,2030-01-03T17:00:00Z,\n'
+            'Private,Invite only,Hall C,2030-01-04T18:00:00Z,2030-01-04T20:00:00Z,0\n'
+        )
+
+    def test_api_csv_upload(self):
+        self.client.force_authenticate(user=self.organizer)
+        upload = SimpleUploadedFile('events.csv', self._csv().encode(), content_type='text/csv')
+        response = self.client.post('/api/events/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['row'] for error in response.data['errors']], [3, 4])
+        self.assertIn('location', response.data['errors'][0]['errors'])
+        self.assertIn('__all__', response.data['errors'][1]['errors'])
+        self.assertEqual(
+            dict(Event.objects.values_list('title', 'is_public')),
+            {'Meetup': True, 'Private': False},
+        )
+        self.assertTrue(search_events(Event.objects.all(), 'meetup').exists())
+        # Imports deliberately do not notify followers
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_api_requires_authentication(self):
+        response = self.client.post('/api/events/import/', {}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_command_ndjson_in_batches(self):
+        lines = [
+            '{"title": "Talk %d", "description": "d", "location": "Room", '
+            '"start_time": "2030-02-01T10:00:00Z", "end_time": "2030-02-01T11:00:00Z"}' % i
+            for i in range(5)
+        ] + ['not json', '[1, 2]']
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as handle:
+            handle.write('\n'.join(lines))
+        self.addCleanup(os.unlink, handle.name)
+        out, err = StringIO(), StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('import_events', handle.name, organizer='importer', batch_size=2, stdout=out, stderr=err)
+        inserts = [query for query in queries.captured_queries if query['sql'].startswith('INSERT INTO "events_event"')]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(Event.objects.filter(organizer=self.organizer).count(), 5)
+        self.assertIn('Row 6', err.getvalue())
+        self.assertIn('Row 7', err.getvalue())
+        self.assertIn('Created 5 events, 2 rows failed.', out.getvalue())
+
+
+class SyntheticDataTestCase(TestCase):
+    def _events(self, prefix):
+        return list(
+            Event.objects.filter(organizer__username__startswith=prefix).order_by('id')
+            .values_list('title', 'is_public', 'going_count', 'maybe_count', 'review_count', 'rating_sum')
+        )
+
+    def test_command_builds_consistent_rows_in_batches(self):
+        out = StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command(
+                'generate_synthetic_data', users=30, events=20, rsvps=200, reviews=40, seed=3, batch_size=50,
+                stdout=out,
+            )
+        self.assertIn('Created 30 users, 20 events, 200 RSVPs and 40 reviews', out.getvalue())
+        inserts = [query for query in queries.captured_queries if query['sql'].startswith('INSERT INTO "events_rsvp"')]
+        self.assertEqual(len(inserts), 4)
+
+        users = User.objects.filter(username__startswith='synth')
+        self.assertEqual(UserProfile.objects.filter(user__in=users).count(), 30)
+        self.assertEqual(len(set(users.values_list('password', flat=True))), 1)
+        self.assertTrue(users.first().check_password('password123'))
+
+        # bulk_create skipped the signals, so the counters were rebuilt afterwards
+        for event in Event.objects.all():
+            self.assertEqual(event.going_count, event.rsvps.filter(status='Going').count())
+            self.assertEqual(event.review_count, event.reviews.count())
+        going = RSVP.objects.filter(status='Going').values_list('event__organizer', 'user').distinct()
+        self.assertEqual(OrganizerFollower.objects.count(), going.count())
+        for review in Review.objects.select_related('event'):
+            self.assertLessEqual(review.event.start_time, timezone.now())
+            self.assertTrue(RSVP.objects.filter(event=review.event, user=review.user).exists())
+
+        counts = sorted(event.rsvp_count for event in Event.objects.all())
+        self.assertGreater(counts[-1], 2 * counts[len(counts) // 2])
+
+        with self.assertRaisesMessage(CommandError, 'already exist'):
+            call_command('generate_synthetic_data', users=1, events=0, rsvps=0, reviews=0, stdout=StringIO())
+
+    def test_same_seed_same_data(self):
+        generate_synthetic_data(20, 10, 60, 15, seed=7, prefix='first')
+        generate_synthetic_data(20, 10, 60, 15, seed=7, prefix='second')
+        generate_synthetic_data(20, 10, 60, 15, seed=8, prefix='third')
+        self.assertEqual(self._events('first'), self._events('second'))
+        self.assertNotEqual(self._events('first'), self._events('third'))
+
+
+class EndpointBenchmarkTestCase(TestCase):
+    SCALES = {
+        'tiny': {'users': 30, 'events': 40, 'rsvps': 300, 'reviews': 60},
+        'small': {'users': 60, 'events': 120, 'rsvps': 1200, 'reviews': 240},
+    }
+
+    def test_every_route_is_benchmarked(self):
+        self.assertEqual(uncovered_routes(), [])
+
+    def test_endpoints_answer_within_query_budgets(self):
+        with override_settings(EVENTS_ENDPOINT_BENCHMARK={'SCALES': self.SCALES}):
+            report = run_endpoint_benchmark(['tiny', 'small'], repeat=1)
+        self.assertEqual(set(report['scales']), {'tiny', 'small'})
+        result = report['scales']['small']['endpoints']['event-list']
+        self.assertEqual(set(result), {'status', 'p50_ms', 'p99_ms', 'queries', 'repeated_queries', 'peak_kib'})
+        self.assertEqual(endpoint_errors(report), [])
+        self.assertEqual(scaling_regressions(report), [])
+        self.assertEqual(repeated_query_regressions(report), [])
+        # Every sample was rolled back
+        self.assertFalse(User.objects.exists())
+
+    def test_compare_reports(self):
+        def report(**changes):
+            result = {'status': 200, 'p50_ms': 10.0, 'p99_ms': 20.0, 'queries': 3, 'repeated_queries': 1,
+                      'peak_kib': 100, **changes}
+            return {'scales': {'small': {'rows': {}, 'endpoints': {'event-list': result}}}}
+
+        baseline = report()
+        self.assertEqual(compare_reports(report(p50_ms=13.0, p99_ms=24.0, peak_kib=140), baseline), [])
+        self.assertEqual(compare_reports(report(queries=4), baseline), ['small event-list: queries 3 -> 4'])
+        self.assertEqual(compare_reports(report(queries=4), baseline, {'QUERIES': 1}), [])
+        self.assertEqual(compare_reports(report(p50_ms=16.0), baseline), ['small event-list: p50_ms 10.0 -> 16.0 ms'])
+        self.assertEqual(compare_reports(report(status=500), baseline), ['small event-list: status 200 -> 500'])
+        # Scales and endpoints missing from the baseline are not compared
+        self.assertEqual(compare_reports(report(queries=9), {'scales': {}}), [])
+
+    def test_query_shapes(self):
+        self.assertEqual(
+            query_shape("SELECT * FROM t WHERE id = 12 AND name = 'it''s' AND pk IN (1, 2, 3)"),
+            'SELECT * FROM t WHERE id = ? AND name = ? AND pk IN (?)',
+        )
+
+
+class ResponseCacheTestCase(TestCase):
+    def setUp(self):
+        caches['events'].clear()
+        reset_cache_stats()
+        self.organizer = User.objects.create_user(username='host', password='testpass123')
+        self.user = User.objects.create_user(username='guest', password='testpass123')
+        start = timezone.now() + timedelta(days=1)
+        self.event = make_event(self.organizer, 'Cached', start=start)
+        self.private_event = make_event(self.organizer, 'Secret', start=start, is_public=False)
+
+    def test_anonymous_list_is_served_from_cache(self):
+        first = self.client.get(reverse('event_list'))
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse('event_list'))
+        self.assertEqual(first['X-Events-Cache'], 'miss')
+        self.assertEqual(second['X-Events-Cache'], 'hit')
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(cache_stats()['hits'], 1)
+        self.assertEqual(cache_stats()['misses'], 1)
+
+    def test_writes_invalidate_detail(self):
+        url = reverse('event_detail', args=[self.event.id])
+        self.client.get(url)
+        with self.captureOnCommitCallbacks() as callbacks:
+            RSVP.objects.create(event=self.event, user=self.user, status='Going')
+        # Until the write commits, other requests still read the old rows
+        self.assertEqual(self.client.get(url)['X-Events-Cache'], 'hit')
+        for callback in callbacks:
+            callback()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Events-Cache'], 'miss')
+        self.assertContains(response, 'guest')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(event=self.event, user=self.user, rating=5, comment='Lovely evening')
+        self.assertContains(self.client.get(url), 'Lovely evening')
+
+        self.event.title = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.save()
+        self.assertContains(self.client.get(url), 'Renamed')
+        self.assertContains(self.client.get(reverse('event_list')), 'Renamed')
+
+    def test_viewers_do_not_share_private_pages(self):
+        self.client.force_login(self.organizer)
+        self.assertContains(self.client.get(reverse('event_list')), 'Secret')
+        self.client.force_login(self.user)
+        self.assertNotContains(self.client.get(reverse('event_list')), 'Secret')
+        self.client.logout()
+        self.assertNotContains(self.client.get(reverse('event_list')), 'Secret')
+
+    def test_pending_messages_bypass_cache(self):
+        self.client.get(reverse('event_list'))
+        self.client.force_login(self.user)
+        self.client.get(reverse('logout'))
+        response = self.client.get(reverse('event_list'))
+        self.assertFalse(response.has_header('X-Events-Cache'))
+        self.assertContains(response, 'You have been logged out.')
+
+    def test_bulk_rsvp_invalidates(self):
+        url = reverse('event_detail', args=[self.event.id])
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_upsert_rsvps(self.user, [{'event': self.event.id, 'status': 'Maybe'}])
+        self.assertEqual(self.client.get(url)['X-Events-Cache'], 'miss')
+
+    def test_hits_replay_the_view_headers(self):
+        @cached_response('replayed', lambda request: [LIST_VERSION_KEY])
+        def view(request):
+            response = HttpResponse('{}', content_type='application/json')
+            response['Vary'] = 'Accept-Language'
+            return response
+
+        request = RequestFactory().get('/replayed/')
+        request.user = AnonymousUser()
+        self.assertEqual(view(request)['X-Events-Cache'], 'miss')
+        response = view(request)
+        self.assertEqual(response['X-Events-Cache'], 'hit')
+        self.assertEqual((response['Content-Type'], response['Vary']), ('application/json', 'Accept-Language'))
+
+
+class ConditionalGetTestCase(APITestCase):
+    def setUp(self):
+        caches['default'].clear()
+        caches['events'].clear()
+        self.organizer = User.objects.create_user(username='host', password='testpass123')
+        self.user = User.objects.create_user(username='guest', password='testpass123')
+        self.event = make_event(self.organizer, 'Polled')
+        self.url = reverse('event-detail', args=[self.event.id])
+
+    def test_retrieve_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_child_changes_bust_validators(self):
+        etag = self.client.get(self.url)['ETag']
+        rsvp = RSVP.objects.create(event=self.event, user=self.user, status='Going')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        etag = response['ETag']
+        review = Review.objects.create(event=self.event, user=self.user, rating=4, comment='Good')
+        self.assertNotEqual(self.client.get(self.url)['ETag'], etag)
+
+        # A comment edit leaves every counter unchanged but still counts
+        etag = self.client.get(self.url)['ETag']
+        review.comment = 'Very good'
+        review.save()
+        self.assertNotEqual(self.client.get(self.url)['ETag'], etag)
+
+        etag = self.client.get(self.url)['ETag']
+        rsvp.delete()
+        self.assertNotEqual(self.client.get(self.url)['ETag'], etag)
+
+    def test_stale_event_save_keeps_child_fields(self):
+        stale = Event.objects.get(pk=self.event.pk)
+        RSVP.objects.create(event=self.event, user=self.user, status='Going')
+        stale.title = 'Renamed'
+        stale.save()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.title, 'Renamed')
+        self.assertEqual(self.event.going_count, 1)
+        self.assertEqual(self.event.child_version, 1)
+
+    def test_list_not_modified(self):
+        url = reverse('event-list')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertNotEqual(self.client.get(url + '?count=true')['ETag'], etag)
+
+        make_event(self.organizer, 'Another', start=self.event.start_time)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_event_detail_page_not_modified(self):
+        url = reverse('event_detail', args=[self.event.id])
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Pages embed per-viewer content, so viewers never share validators
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+
+class FlakyEmailBackend(LocmemEmailBackend):
+    """Refuses bad@ addresses and drops the connection once on flaky@"""
+    dropped = False
+
+    def send_messages(self, messages):
+        for message in messages:
+            if 'bad@example.com' in message.to:
+                raise smtplib.SMTPRecipientsRefused({'bad@example.com': (550, b'No such user')})
+            if 'flaky@example.com' in message.to and not FlakyEmailBackend.dropped:
+                FlakyEmailBackend.dropped = True
+                raise smtplib.SMTPServerDisconnected('Connection lost')
+        return super().send_messages(messages)
+
+
+@override_settings(EVENTS_EMAIL_CHUNK_SIZE=2)
+class EmailFanOutTestCase(EagerCeleryMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.organizer = User.objects.create_user(username='host', email='host@example.com')
+        self.event = make_event(self.organizer, 'Launch')
+        for i in range(5):
+            user = User.objects.create_user(username=f'guest{i}', email=f'guest{i}@example.com')
+            RSVP.objects.create(event=self.event, user=user, status='Going')
+        User.objects.create_user(username='noemail')
+        RSVP.objects.create(event=self.event, user=User.objects.get(username='noemail'), status='Going')
+
+    def test_one_message_per_recipient(self):
+        self.assertEqual(send_event_notification(self.event.id, 'event_updated'), {'recipients': 5, 'digested': 0})
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox),
+                         [f'guest{i}@example.com' for i in range(5)])
+        self.assertTrue(all(len(message.to) == 1 for message in mail.outbox))
+        self.assertEqual(mail.outbox[0].subject, 'Event Updated: Launch')
+
+    def test_recipients_are_streamed(self):
+        with CaptureQueriesContext(connection) as queries:
+            send_event_notification(self.event.id, 'event_updated')
+        # The event lookup plus one streamed query each for email and digest
+        # recipients, however many chunks
+        self.assertEqual(len(queries), 3)
+
+    @override_settings(EMAIL_BACKEND='events.tests.FlakyEmailBackend')
+    def test_chunk_skips_refused_and_retries_remaining(self):
+        FlakyEmailBackend.dropped = False
+        with self.assertLogs('events.tasks', 'WARNING') as logs:
+            send_notification_chunk.apply(
+                args=('Subject', 'Body', ['a@example.com', 'bad@example.com', 'flaky@example.com', 'b@example.com']),
+            )
+        self.assertEqual([message.to[0] for message in mail.outbox],
+                         ['a@example.com', 'flaky@example.com', 'b@example.com'])
+        self.assertIn('Skipping refused recipient bad@example.com', logs.output[0])
+
+
+@override_settings(EVENTS_REMINDER_BATCH_SIZE=2)
+class ReminderSweepTestCase(EagerCeleryMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.organizer = User.objects.create_user(username='host', email='host@example.com')
+        self.guest = User.objects.create_user(username='guest', email='guest@example.com')
+        now = timezone.now()
+        self.upcoming = [self._event(f'Soon {i}', now + timedelta(hours=i + 1)) for i in range(5)]
+        self.later = self._event('Later', now + timedelta(days=3))
+        self.past = self._event('Past', now - timedelta(hours=1))
+
+    def _event(self, title, start):
+        event = make_event(self.organizer, title, start=start)
+        RSVP.objects.create(event=event, user=self.guest, status='Going')
+        return event
+
+    def test_sweep_reminds_events_in_window_once(self):
+        self.assertEqual(schedule_event_reminders(), 5)
+        self.assertEqual(
+            sorted(message.subject for message in mail.outbox),
+            sorted(f'Event Reminder: Soon {i} - Tomorrow!' for i in range(5)),
+        )
+        self.assertEqual(EventReminder.objects.filter(sent_at__isnull=False).count(), 5)
+
+        # A second, overlapping sweep finds nothing left to send
+        self.assertEqual(schedule_event_reminders(), 0)
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_markers_claimed_elsewhere_are_skipped(self):
+        EventReminder.objects.create(event=self.upcoming[0], kind='24h', claim_token='other-sweep')
+        self.assertEqual(claim_reminders([self.upcoming[0].id, self.upcoming[1].id], '24h', 'this-sweep'),
+                         [self.upcoming[1].id])
+        self.assertEqual(schedule_event_reminders(), 3)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_claim_that_was_never_sent_is_taken_over_once_stale(self):
+        # A sweep that claimed the reminder and died before publishing it
+        EventReminder.objects.create(event=self.upcoming[0], kind='24h', claim_token='lost-sweep')
+        self.assertEqual(schedule_event_reminders(), 4)
+
+        EventReminder.objects.filter(claim_token='lost-sweep').update(claimed_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(schedule_event_reminders(), 1)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertIsNotNone(EventReminder.objects.get(event=self.upcoming[0]).sent_at)
+        self.assertEqual(schedule_event_reminders(), 0)
+
+
+class OutboxTestCase(EagerCeleryMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.organizer = User.objects.create_user(username='host', email='host@example.com', password='testpass123')
+        self.guest = User.objects.create_user(username='guest', email='guest@example.com', password='testpass123')
+        self.event = make_event(self.organizer, 'Outbox')
+        RSVP.objects.create(event=self.event, user=self.guest, status='Going')
+
+    def test_event_edit_is_relayed_once(self):
+        self.client.force_login(self.organizer)
+        response = self.client.post(reverse('edit_event', args=[self.event.id]), {
+            'title': 'Outbox moved', 'description': 'Outbox', 'location': 'Annex',
+            'start_time': self.event.start_time.strftime('%Y-%m-%dT%H:%M'),
+            'end_time': self.event.end_time.strftime('%Y-%m-%dT%H:%M'),
+            'is_public': 'on',
+        })
+        self.assertEqual(response.status_code, 302)
+        # Nothing is sent from the request itself
+        self.assertFalse(OutboxMessage.objects.exists())
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(flush_due_updates(now=timezone.now() + timedelta(hours=1)), 1)
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.task, message.args), ('events.tasks.send_event_notification',
+                                                         [self.event.id, 'event_updated']))
+
+        self.assertEqual(relay_outbox(), 1)
+        self.assertEqual([m.subject for m in mail.outbox], ['Event Updated: Outbox moved'])
+        self.assertIsNotNone(OutboxMessage.objects.get().dispatched_at)
+        self.assertEqual(relay_outbox(), 0)
+
+    def test_rsvp_confirmation_only_on_a_change(self):
+        self.client.force_authenticate(user=self.guest)
+        url = reverse('event-update-rsvp', kwargs={'pk': self.event.id, 'user_id': self.guest.id})
+        rsvp = RSVP.objects.get(event=self.event, user=self.guest)
+        for path, data in [
+            (url, {'status': 'Going'}),
+            (reverse('rsvp-detail', args=[rsvp.id]), {'status': 'Going'}),
+            (reverse('event-rsvp', args=[self.event.id]), {'status': 'Going'}),
+        ]:
+            method = self.client.post if path.endswith('/rsvp/') else self.client.patch
+            self.assertEqual(method(path, data).status_code, status.HTTP_200_OK)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+        self.client.patch(url, {'status': 'Maybe'})
+        self.assertEqual(OutboxMessage.objects.get().args, [self.event.id, 'rsvp_confirmation', 'guest@example.com'])
+
+    def test_rolled_back_change_leaves_no_message(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                enqueue(send_event_notification, self.event.id, 'event_updated')
+                raise RuntimeError
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_rsvp_and_api_writes_enqueue(self):
+        self.client.force_login(self.guest)
+        self.client.post(reverse('rsvp_event', args=[self.event.id]), {'status': 'Maybe'})
+        # Re-sending the same status is not a change
+        self.client.post(reverse('rsvp_event', args=[self.event.id]), {'status': 'Maybe'})
+        self.client.force_authenticate(user=self.organizer)
+        self.client.post('/api/events/', {
+            'title': 'API', 'description': 'API', 'location': 'Hall',
+            'start_time': self.event.start_time.isoformat(), 'end_time': self.event.end_time.isoformat(),
+        })
+        self.assertEqual(
+            [(message.args[1], message.args[2:]) for message in OutboxMessage.objects.order_by('id')],
+            [('rsvp_confirmation', ['guest@example.com']), ('event_created', [])],
+        )
+
+    def test_failed_dispatch_is_released_for_retry(self):
+        OutboxMessage.objects.create(task='events.tasks.does_not_exist')
+        enqueue(send_event_notification, self.event.id, 'event_updated')
+        self.assertEqual(relay_outbox(), 1)
+        failed = OutboxMessage.objects.get(task='events.tasks.does_not_exist')
+        self.assertIsNone(failed.dispatched_at)
+        self.assertEqual((failed.attempts, failed.claim_token), (1, ''))
+        self.assertIn('does_not_exist', failed.last_error)
+
+    @override_settings(EVENTS_OUTBOX_MAX_ATTEMPTS=2)
+    def test_row_that_keeps_failing_is_parked(self):
+        OutboxMessage.objects.create(task='events.tasks.does_not_exist', attempts=1)
+        with self.assertLogs('events.outbox', 'ERROR'):
+            self.assertEqual(relay_outbox(), 0)
+        parked = OutboxMessage.objects.get()
+        self.assertEqual((parked.attempts, parked.dispatched_at), (2, None))
+        # Never picked up again, but kept with its error
+        self.assertEqual(relay_outbox(), 0)
+        self.assertEqual(OutboxMessage.objects.get().attempts, 2)
+
+    @override_settings(EVENTS_OUTBOX_RETENTION=3600)
+    def test_dispatched_rows_are_purged_after_the_retention(self):
+        now = timezone.now()
+        old = OutboxMessage.objects.create(task='old', dispatched_at=now - timedelta(hours=2))
+        recent = OutboxMessage.objects.create(task='recent', dispatched_at=now - timedelta(minutes=5))
+        pending = OutboxMessage.objects.create(task='pending')
+        self.assertEqual(purge_outbox(now=now), 1)
+        self.assertEqual(set(OutboxMessage.objects.values_list('pk', flat=True)), {recent.pk, pending.pk})
+        self.assertFalse(OutboxMessage.objects.filter(pk=old.pk).exists())
+
+
+def jpeg_upload(name='photo.jpg', size=(1200, 800), color=(200, 40, 40)):
+    """A JPEG carrying EXIF camera and GPS tags"""
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera Maker'
+    exif[0x8825] = {1: 'N', 2: (51.0, 30.0, 0.0)}
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'JPEG', exif=exif)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class ProfilePictureTestCase(EagerCeleryMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media = override_settings(MEDIA_ROOT=media_root.name)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def assertVariants(self, profile):
+        profile.refresh_from_db()
+        variants = profile.profile_picture_variants
+        self.assertEqual(variants['source'], profile.profile_picture.name)
+        for name, edge in (('sm', 64), ('md', 150), ('lg', 400)):
+            self.assertRegex(variants[name], rf'^profiles/variants/[0-9a-f]{{20}}-{edge}\.webp$')
+            with default_storage.open(variants[name]) as handle, Image.open(handle) as image:
+                self.assertEqual((image.format, image.size), ('WEBP', (edge, edge)))
+                self.assertEqual(dict(image.getexif()), {})
+                self.assertNotIn('icc_profile', image.info)
+        return variants
+
+    def test_upload_is_resized_by_a_worker(self):
+        response = self.client.post(reverse('register'), {
+            'username': 'pictured', 'email': 'pictured@example.com', 'full_name': 'Pictured',
+            'password1': 'Str0ng-passphrase', 'password2': 'Str0ng-passphrase',
+            'profile_picture': jpeg_upload(),
+        })
+        self.assertEqual(response.status_code, 302)
+        profile = UserProfile.objects.get(user__username='pictured')
+        # The request only stored the upload and queued the work
+        self.assertEqual(profile.profile_picture_variants, {})
+        self.assertEqual(OutboxMessage.objects.get().task, 'events.tasks.build_profile_picture_variants')
+        self.assertEqual(profile.picture_url(), profile.profile_picture.url)
+
+        relay_outbox()
+        variants = self.assertVariants(profile)
+        response = self.client.get(reverse('profile'))
+        self.assertContains(response, f'src="{default_storage.url(variants["md"])}"')
+        self.assertContains(response, f'{default_storage.url(variants["lg"])} 2x')
+
+        # Saving the profile without a new picture queues nothing
+        response = self.client.post(reverse('profile_edit'), {'full_name': 'Renamed', 'bio': '', 'location': 'Hall'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+        response = self.client.post(reverse('profile_edit'), {
+            'full_name': 'Renamed', 'bio': '', 'location': 'Hall', 'profile_picture': jpeg_upload(color=(0, 90, 200)),
+        })
+        self.assertEqual(response.status_code, 302)
+        relay_outbox()
+        self.assertNotEqual(self.assertVariants(profile)['md'], variants['md'])
+
+    def test_api_serves_the_variants_once_built(self):
+        user = User.objects.create_user(username='pictured')
+        profile = UserProfile.objects.create(user=user, full_name='Pictured', profile_picture=jpeg_upload())
+        data = UserProfileSerializer(profile).data
+        # Like the profile page, the original until a worker has run
+        self.assertEqual(data['profile_picture'], profile.profile_picture.url)
+        self.assertIsNone(data['profile_pictures'])
+
+        variants = process_profile_picture(profile.id)
+        profile.refresh_from_db()
+        data = UserProfileSerializer(profile).data
+        self.assertEqual(data['profile_picture'], default_storage.url(variants['md']))
+        self.assertEqual(data['profile_pictures'], {
+            size: default_storage.url(variants[size]) for size in ('sm', 'md', 'lg')
+        })
+        no_picture = UserProfile.objects.create(user=User.objects.create_user(username='plain'), full_name='Plain')
+        self.assertIsNone(UserProfileSerializer(no_picture).data['profile_picture'])
+
+    def test_unreadable_upload_is_logged(self):
+        user = User.objects.create_user(username='broken')
+        upload = SimpleUploadedFile('broken.jpg', b'not an image', content_type='image/jpeg')
+        profile = UserProfile.objects.create(user=user, full_name='Broken', profile_picture=upload)
+        with self.assertLogs('events.images', 'WARNING') as logs:
+            self.assertIsNone(process_profile_picture(profile.id))
+        self.assertIn('Could not process profile picture', logs.output[0])
+
+    def test_backfill_command(self):
+        users = [User.objects.create_user(username=f'legacy{i}', password='testpass123') for i in range(2)]
+        profiles = [
+            UserProfile.objects.create(user=user, full_name=user.username, profile_picture=jpeg_upload())
+            for user in users
+        ]
+        UserProfile.objects.create(user=User.objects.create_user(username='plain'), full_name='Plain')
+        self.assertEqual(stale_profiles().count(), 2)
+
+        out = StringIO()
+        call_command('build_picture_variants', stdout=out)
+        self.assertIn('Built variants for 2 of 2', out.getvalue())
+        # Identical pictures share content-hashed files
+        self.assertEqual(self.assertVariants(profiles[0]), {
+            **self.assertVariants(profiles[1]), 'source': profiles[0].profile_picture.name,
+        })
+        self.assertEqual(stale_profiles().count(), 0)
+
+        out = StringIO()
+        call_command('build_picture_variants', stdout=out)
+        self.assertIn('Processing 0 profile pictures', out.getvalue())
+
+
+@override_settings(EVENTS_UPDATE_COALESCE_WINDOW=300, EVENTS_UPDATE_COALESCE_MAX_DELAY=1800)
+class EventUpdateCoalescingTestCase(EagerCeleryMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.organizer = User.objects.create_user(username='host', email='host@example.com')
+        guest = User.objects.create_user(username='guest', email='guest@example.com')
+        self.event = make_event(self.organizer, 'Draft', start=timezone.now() + timedelta(days=2))
+        RSVP.objects.create(event=self.event, user=guest, status='Going')
+        self.client.force_authenticate(user=self.organizer)
+        self.url = reverse('event-detail', args=[self.event.id])
+
+    def test_burst_of_edits_sends_one_email_with_diff(self):
+        for i in range(10):
+            response = self.client.patch(self.url, {'title': f'Final {i}'})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client.patch(self.url, {'location': 'Annex'})
+        pending = PendingEventUpdate.objects.get()
+        self.assertEqual(pending.snapshot['title'], 'Draft')
+
+        self.assertEqual(flush_due_updates(), 0)
+        self.assertEqual(flush_due_updates(now=pending.due_at), 1)
+        relay_outbox()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('Event: Draft -> Final 9', mail.outbox[0].body)
+        self.assertIn('Location: Hall -> Annex', mail.outbox[0].body)
+        self.assertNotIn('Description:  ->', mail.outbox[0].body)
+        self.assertFalse(PendingEventUpdate.objects.exists())
+
+    def test_invisible_and_reverted_edits_are_skipped(self):
+        self.client.patch(self.url, {'is_public': False})
+        self.assertFalse(PendingEventUpdate.objects.exists())
+
+        self.client.patch(self.url, {'title': 'Oops'})
+        self.client.patch(self.url, {'title': 'Draft'})
+        self.assertEqual(flush_due_updates(now=timezone.now() + timedelta(hours=1)), 0)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_window_never_extends_past_max_delay(self):
+        start = timezone.now()
+        before = event_snapshot(self.event)
+        self.event.title = 'Moved'
+        self.event.save()
+        with transaction.atomic():
+            record_event_update(self.event, before, now=start)
+        for minutes in range(5, 60, 5):
+            before = event_snapshot(self.event)
+            self.event.title = f'Moved {minutes}'
+            self.event.save()
+            with transaction.atomic():
+                record_event_update(self.event, before, now=start + timedelta(minutes=minutes))
+        self.assertEqual(PendingEventUpdate.objects.get().due_at, start + timedelta(seconds=1800))
+
+    def test_invisible_edit_does_not_extend_the_window(self):
+        start = timezone.now()
+        before = event_snapshot(self.event)
+        self.event.title = 'Moved'
+        self.event.save()
+        with transaction.atomic():
+            record_event_update(self.event, before, now=start)
+            self.assertIsNone(
+                record_event_update(self.event, event_snapshot(self.event), now=start + timedelta(minutes=4))
+            )
+        self.assertEqual(PendingEventUpdate.objects.get().due_at, start + timedelta(seconds=300))
+
+
+class DigestTestCase(EagerCeleryMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.organizer = User.objects.create_user(username='host', email='host@example.com')
+        self.digest_user = User.objects.create_user(username='digest', email='digest@example.com')
+        UserProfile.objects.create(user=self.digest_user, full_name='Digest', notification_digest=True)
+        self.instant_user = User.objects.create_user(username='instant', email='instant@example.com')
+        start = timezone.now() + timedelta(days=3)
+        self.events = []
+        for title in ['Alpha', 'Beta']:
+            event = make_event(self.organizer, title, start=start)
+            for user in [self.digest_user, self.instant_user]:
+                RSVP.objects.create(event=event, user=user, status='Going')
+            self.events.append(event)
+
+    def test_digest_users_get_one_grouped_email(self):
+        for event in self.events:
+            send_event_notification(event.id, 'event_updated')
+        send_event_notification(self.events[0].id, 'event_updated')
+        send_event_notification(self.events[1].id, 'event_created')
+        self.assertEqual({m.to[0] for m in mail.outbox}, {'instant@example.com'})
+        self.assertEqual(DigestItem.objects.filter(user=self.digest_user).count(), 4)
+        mail.outbox.clear()
+
+        self.assertEqual(send_digests(), 1)
+        relay_outbox()
+        self.assertEqual(len(mail.outbox), 1)
+        digest = mail.outbox[0]
+        self.assertEqual((digest.to, digest.subject), (['digest@example.com'], 'Your daily event digest'))
+        self.assertIn('New events:\n- Beta', digest.body)
+        # Repeated updates to one event are listed once
+        self.assertEqual(digest.body.count('- Alpha'), 1)
+        self.assertFalse(DigestItem.objects.exists())
+        self.assertEqual(send_digests(), 0)
+
+    def test_batches_are_grouped_queries(self):
+        users = [User.objects.create_user(username=f'reader{i}', email=f'reader{i}@example.com') for i in range(6)]
+        for user in users:
+            DigestItem.objects.create(user=user, event=self.events[0], kind='event_updated')
+            DigestItem.objects.create(user=user, event=self.events[1], kind='event_created')
+        # Cutoff, then per batch of two users: pick users, load items, and
+        # delete + enqueue inside a savepoint; then one final empty pick
+        with self.assertNumQueries(1 + 3 * 6 + 1):
+            self.assertEqual(send_digests(batch_size=2), 6)
+        self.assertEqual(OutboxMessage.objects.count(), 3)
+
+    def test_profile_form_opt_in(self):
+        self.client.force_login(self.instant_user)
+        self.client.post(reverse('profile_edit'), {
+            'full_name': 'Instant', 'bio': '', 'location': 'Town', 'notification_digest': 'on',
+        })
+        self.assertTrue(UserProfile.objects.get(user=self.instant_user).notification_digest)
+
+
+class OrganizerFollowerTestCase(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user(username='host', email='host@example.com')
+        self.other = User.objects.create_user(username='other', email='other@example.com')
+        self.guest = User.objects.create_user(username='guest', email='guest@example.com')
+        start = timezone.now() + timedelta(days=3)
+        self.events = [
+            make_event(organizer, title, start=start)
+            for title, organizer in [('One', self.organizer), ('Two', self.organizer), ('Three', self.other)]
+        ]
+
+    def followers(self):
+        return set(OrganizerFollower.objects.values_list('organizer_id', 'follower_id', 'going_count'))
+
+    def test_going_rsvps_maintain_followers(self):
+        first = RSVP.objects.create(event=self.events[0], user=self.guest, status='Going')
+        second = RSVP.objects.create(event=self.events[1], user=self.guest, status='Going')
+        RSVP.objects.create(event=self.events[2], user=self.guest, status='Maybe')
+        self.assertEqual(self.followers(), {(self.organizer.id, self.guest.id, 2)})
+
+        first.status = 'Not Going'
+        first.save()
+        self.assertEqual(self.followers(), {(self.organizer.id, self.guest.id, 1)})
+        second.delete()
+        self.assertEqual(self.followers(), set())
+
+        bulk_upsert_rsvps(self.guest, [
+            {'event': self.events[0].id, 'status': 'Going'},
+            {'event': self.events[2].id, 'status': 'Going'},
+        ])
+        self.assertEqual(self.followers(), {(self.organizer.id, self.guest.id, 1), (self.other.id, self.guest.id, 1)})
+
+    def test_event_deletion_settles_followers_in_fixed_queries(self):
+        def delete_with_attendees(count):
+            event = make_event(self.organizer, 'Popular', start=timezone.now() + timedelta(days=3))
+            for number in range(count):
+                user = User.objects.create_user(username=f'fan{count}_{number}', email=f'fan{count}_{number}@example.com')
+                RSVP.objects.create(event=event, user=user, status='Going')
+                Review.objects.create(event=event, user=user, rating=5, comment='Great')
+            with CaptureQueriesContext(connection) as queries:
+                event.delete()
+            return len(queries)
+
+        RSVP.objects.create(event=self.events[0], user=self.guest, status='Going')
+        self.assertEqual(delete_with_attendees(2), delete_with_attendees(120))
+        self.assertEqual(self.followers(), {(self.organizer.id, self.guest.id, 1)})
+
+    def test_bulk_deleted_children_have_no_dependents(self):
+        # Event.delete drops RSVPs and reviews with _raw_delete, skipping their
+        # cascades and delete signals. Pin both so a new one is noticed here.
+        expected = {
+            (RSVP, pre_delete): set(), (RSVP, post_delete): {'rsvp_post_delete', 'event_child_changed'},
+            (Review, pre_delete): set(), (Review, post_delete): {'review_post_delete', 'event_child_changed'},
+        }
+        for (model, signal), names in expected.items():
+            self.assertEqual(model._meta.related_objects, ())
+            receivers = signal._live_receivers(model)
+            self.assertEqual({receiver.__module__ for receiver in receivers}, {'events.signals'} if names else set())
+            self.assertEqual({receiver.__name__ for receiver in receivers}, names)
+
+    def test_event_deletion_falls_back_to_the_collector_when_children_are_referenced(self):
+        RSVP.objects.create(event=self.events[0], user=self.guest, status='Going')
+        Review.objects.create(event=self.events[0], user=self.guest, rating=4, comment='Good')
+        with mock.patch.object(RSVP._meta, 'related_objects', (RSVP._meta.get_field('event'),)):
+            self.events[0].delete()
+        self.assertFalse(RSVP.objects.filter(event_id=self.events[0].pk).exists())
+        self.assertFalse(Review.objects.filter(event_id=self.events[0].pk).exists())
+        self.assertEqual(self.followers(), set())
+
+    def test_cascading_deletes_keep_followers_and_counters(self):
+        RSVP.objects.create(event=self.events[0], user=self.guest, status='Going')
+        RSVP.objects.create(event=self.events[1], user=self.guest, status='Going')
+        RSVP.objects.create(event=self.events[2], user=self.guest, status='Going')
+        RSVP.objects.create(event=self.events[2], user=self.organizer, status='Going')
+        Event.objects.filter(pk=self.events[0].pk).delete()
+        self.assertEqual(self.followers(), {
+            (self.organizer.id, self.guest.id, 1), (self.other.id, self.guest.id, 1),
+            (self.other.id, self.organizer.id, 1),
+        })
+
+        # The organizer's events go with them; their RSVP elsewhere is still counted off
+        self.organizer.delete()
+        self.assertEqual(self.followers(), {(self.other.id, self.guest.id, 1)})
+        self.events[2].refresh_from_db()
+        self.assertEqual(self.events[2].going_count, 1)
+
+    def test_rebuild_command(self):
+        RSVP.objects.create(event=self.events[0], user=self.guest, status='Going')
+        RSVP.objects.create(event=self.events[1], user=self.guest, status='Going')
+        expected = self.followers()
+        OrganizerFollower.objects.update(going_count=7)
+        OrganizerFollower.objects.create(organizer=self.other, follower=self.guest, going_count=1)
+
+        out = StringIO()
+        call_command('rebuild_followers', stdout=out)
+        self.assertIn('Rebuilt 1 organizer follower rows.', out.getvalue())
+        self.assertEqual(self.followers(), expected)
+
+    def test_event_created_reads_followers(self):
+        RSVP.objects.create(event=self.events[0], user=self.guest, status='Going')
+        RSVP.objects.create(event=self.events[1], user=self.guest, status='Going')
+        RSVP.objects.create(event=self.events[1], user=self.other, status='Maybe')
+        self.assertEqual(list(event_created_recipients(self.events[0])), ['guest@example.com'])
+        self.assertEqual(list(event_created_digest_users(self.events[0])), [])
+        self.assertEqual(list(event_created_recipients(self.events[2])), [])
+
+
+@override_settings(EVENTS_EMAIL_CHUNK_SIZE=2, EVENTS_METRICS={'ALIAS': 'metrics', 'TOKEN': 'scrape-me'})
+class TaskMetricsTestCase(EagerCeleryMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        caches['metrics'].clear()
+        self.organizer = User.objects.create_user(username='host', email='host@example.com')
+        self.event = make_event(self.organizer, 'Launch')
+        for i in range(3):
+            user = User.objects.create_user(username=f'guest{i}', email=f'guest{i}@example.com')
+            RSVP.objects.create(event=self.event, user=user, status='Going')
+
+    def summary(self):
+        return {row['task']: row for row in task_summary()}
+
+    def test_tasks_are_timed_and_counted(self):
+        send_event_notification.delay(self.event.id, 'event_updated')
+        summary = self.summary()
+
+        notification = summary['events.tasks.send_event_notification']
+        self.assertEqual((notification['runs'], notification['success'], notification['recipients']), (1, 1, 3))
+        self.assertIsNotNone(notification['mean_seconds'])
+        chunks = summary['events.tasks.send_notification_chunk']
+        self.assertEqual((chunks['runs'], chunks['recipients'], chunks['emails_sent']), (2, 3, 3))
+        self.assertEqual(chunks['mean_recipients'], 1.5)
+
+    @override_settings(EMAIL_BACKEND='events.tests.FlakyEmailBackend')
+    def test_smtp_errors_and_handled_failures(self):
+        FlakyEmailBackend.dropped = False
+        send_notification_chunk.apply(args=('Subject', 'Body', ['bad@example.com', 'flaky@example.com']))
+        with self.assertLogs('events.tasks', 'ERROR'):
+            send_event_notification.delay(self.event.id, 'event_updated', changes='not a list of changes')
+        values = snapshot()
+        task = 'events.tasks.send_notification_chunk'
+        self.assertEqual(values[('events_smtp_errors_total', (('task', task), ('kind', 'refused')))], 1)
+        self.assertEqual(values[('events_smtp_errors_total', (('task', task), ('kind', 'connection')))], 1)
+        self.assertEqual(values[('events_task_total', (('task', task), ('outcome', 'retry')))], 1)
+        self.assertEqual(self.summary()['events.tasks.send_event_notification']['errors'], 1)
+
+    def test_metrics_endpoint(self):
+        send_event_notification.delay(self.event.id, 'event_updated')
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-me')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('# TYPE events_task_duration_seconds histogram', body)
+        self.assertIn(
+            'events_task_total{task="events.tasks.send_event_notification",outcome="success"} 1', body,
+        )
+        self.assertIn('events_task_recipients_bucket{task="events.tasks.send_notification_chunk",le="+Inf"} 2', body)
+
+    def test_summary_command(self):
+        send_event_notification.delay(self.event.id, 'event_updated')
+        out = StringIO()
+        call_command('task_metrics', '--reset', stdout=out)
+        self.assertIn('events.tasks.send_notification_chunk', out.getvalue())
+        self.assertIn('Task metrics reset.', out.getvalue())
+        self.assertEqual(task_summary(), [])
+
+
+class NotificationRoutingTestCase(TestCase):
+    def route(self, name, args=(), kwargs=None):
+        return celery_app.amqp.router.route({}, name, args, kwargs or {})['queue'].name
+
+    def test_queues_by_task_and_notification_type(self):
+        task = 'events.tasks.send_event_notification'
+        self.assertEqual(self.route(task, (1, 'rsvp_confirmation', 'guest@example.com')), 'transactional')
+        self.assertEqual(self.route(task, (1, 'event_created')), 'bulk')
+        self.assertEqual(self.route(task, (1,), {'notification_type': 'event_updated'}), 'bulk')
+        self.assertEqual(self.route('events.tasks.send_event_reminder', (1, '24h')), 'reminders')
+        self.assertEqual(self.route('events.tasks.send_digest_batch', ([],)), 'bulk')
+        self.assertEqual(self.route('events.tasks.relay_outbox_task'), 'celery')
+        # Chunks are published to the queue of the notification they belong to
+        options = celery_app.amqp.router.route({'queue': 'transactional'}, 'events.tasks.send_notification_chunk', (), {})
+        self.assertEqual(options['queue'].name, 'transactional')
+
+    @override_settings(EVENTS_QUEUE_RATE_LIMITS={'ALIAS': 'default', 'RATES': {'bulk': 2}})
+    def test_rate_limit_waits_for_next_window(self):
+        caches['default'].clear()
+        now = [1000.25]
+        pauses = []
+
+        def sleep(seconds):
+            pauses.append(seconds)
+            now[0] += seconds
+
+        waits = [throttle('bulk', clock=lambda: now[0], sleep=sleep) for _ in range(3)]
+        self.assertEqual(waits, [0, 0, 0.75])
+        self.assertEqual(pauses, [0.75])
+        self.assertEqual(throttle('transactional', clock=lambda: now[0], sleep=sleep), 0)
+
+
+# The events URLs as EVENTS_ASYNC_VIEWS sets them up
+class AsyncURLConf:
+    urlpatterns = events_urls.with_async_views(events_urls.urlpatterns)
+
+
+def call_async(method, *args, **kwargs):
+    """Run an AsyncClient request from a sync test"""
+    async def call():
+        return await method(*args, **kwargs)
+    return async_to_sync(call)()
+
+
+@override_settings(ROOT_URLCONF=AsyncURLConf)
+class AsyncViewsTestCase(TestCase):
+    """The async views must return exactly what the sync views do"""
+
+    def setUp(self):
+        caches['default'].clear()
+        caches['events'].clear()
+        self.organizer = User.objects.create_user(username='host', password='testpass123')
+        self.guest = User.objects.create_user(username='guest', password='testpass123')
+        start = timezone.now() + timedelta(days=1)
+        self.events = [
+            make_event(self.organizer, f'Event {i}', start=start + timedelta(hours=i), description='About it',
+                       is_public=i != 2)
+            for i in range(4)
+        ]
+        RSVP.objects.create(event=self.events[0], user=self.guest, status='Going')
+        RSVP.objects.create(event=self.events[2], user=self.guest, status='Maybe')
+        Review.objects.create(event=self.events[0], user=self.guest, rating=4, comment='Good')
+        self.member = AsyncClient()
+        self.member.force_login(self.guest)
+
+    def get_sync(self, url, user=None, headers=None):
+        caches['events'].clear()
+        with override_settings(ROOT_URLCONF='event_management.urls'):
+            if user:
+                self.client.force_login(user)
+            return self.client.get(url, headers=headers)
+
+    def get_async(self, url, client=None, headers=None):
+        caches['events'].clear()
+        return call_async((client or self.async_client).get, url, headers=headers)
+
+    def assertSamePage(self, sync_response, async_response):
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        csrf = re.compile(rb'name="csrfmiddlewaretoken" value="[^"]+"')
+        self.assertEqual(csrf.sub(b'', async_response.content), csrf.sub(b'', sync_response.content))
+
+    def test_pages(self):
+        detail = reverse('event_detail', args=[self.events[0].id])
+        private = reverse('event_detail', args=[self.events[2].id])
+        for url in ['/', '/?location=Hall&count=true', detail]:
+            self.assertSamePage(self.get_sync(url), self.get_async(url))
+        self.assertEqual(self.get_async(private).status_code, 404)
+        for url in ['/', detail, private]:
+            self.assertSamePage(self.get_sync(url, self.guest), self.get_async(url, self.member))
+
+    def test_async_views_replace_the_sync_routes(self):
+        names = [pattern.name for pattern in AsyncURLConf.urlpatterns if getattr(pattern, 'name', None)]
+        self.assertEqual(len(names), len(set(names)))
+        self.assertIs(resolve(reverse('event_list')).func, async_views.event_list)
+        self.assertIs(resolve(reverse('event_detail', args=[1])).func, async_views.event_detail)
+        self.assertIs(resolve('/api/events/1/').func, async_views.api_event_detail)
+
+    def test_page_cache_and_conditional_get(self):
+        detail = reverse('event_detail', args=[self.events[0].id])
+        first = self.get_async(detail)
+        self.assertEqual(first['X-Events-Cache'], 'miss')
+        self.assertEqual(call_async(self.async_client.get, detail)['X-Events-Cache'], 'hit')
+        not_modified = call_async(self.async_client.get, detail, headers={'If-None-Match': first['ETag']})
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_api_reads(self):
+        token = f'Bearer {AccessToken.for_user(self.guest)}'
+        urls = [
+            '/api/events/', '/api/events/?page_size=2&count=true', '/api/events/?location=Hall',
+            f'/api/events/{self.events[0].id}/', f'/api/events/{self.events[2].id}/', '/api/events/?cursor=bogus',
+        ]
+        for url in urls:
+            for auth in [{}, {'Authorization': token}]:
+                headers = {'Accept': 'application/json', **auth}
+                sync_response = self.get_sync(url, headers=headers)
+                async_response = self.get_async(url, headers=headers)
+                self.assertEqual(async_response.status_code, sync_response.status_code, url)
+                self.assertEqual(async_response.json(), sync_response.json(), url)
+                self.assertEqual(async_response.get('ETag'), sync_response.get('ETag'), url)
+                self.assertEqual(async_response['Allow'], sync_response['Allow'], url)
+
+        page = self.get_async('/api/events/?page_size=2')
+        self.assertEqual(self.get_async(page.json()['next']).status_code, 200)
+        self.assertEqual(self.get_async('/api/events/?page_size=2', headers={'If-None-Match': page['ETag']}).status_code, 304)
+        self.assertEqual(self.get_async('/api/events/', headers={'Authorization': 'Bearer nope'}).status_code, 401)
+
+    def test_api_writes_fall_through(self):
+        token = f'Bearer {AccessToken.for_user(self.organizer)}'
+        start = timezone.now() + timedelta(days=2)
+        response = call_async(self.async_client.post, '/api/events/', {
+            'title': 'Async', 'description': 'Posted', 'location': 'Hall',
+            'start_time': start.isoformat(), 'end_time': (start + timedelta(hours=1)).isoformat(),
+        }, content_type='application/json', headers={'Authorization': token})
+        self.assertEqual(response.status_code, 201)
+        event_id = response.json()['id']
+        response = call_async(
+            self.async_client.patch, f'/api/events/{event_id}/', {'title': 'Async edit'}, content_type='application/json',
+            headers={'Authorization': token},
+        )
+        self.assertEqual(response.json()['title'], 'Async edit')
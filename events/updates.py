@@ -0,0 +1,96 @@
+"""
+Coalescing of event_updated notifications.
+
+Edits do not notify attendees directly. The first user-visible edit opens
+a window for the event (EVENTS_UPDATE_COALESCE_WINDOW seconds, pushed
+back by every further visible edit, but never past
+EVENTS_UPDATE_COALESCE_MAX_DELAY after the first one). When it closes,
+``flush_due_updates`` queues a single notification, through the outbox,
+listing what changed overall.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import PendingEventUpdate
+from .outbox import enqueue
+
+# Fields attendees see in the notification, with the labels used there
+NOTIFIED_FIELDS = {
+    'title': 'Event',
+    'description': 'Description',
+    'location': 'Location',
+    'start_time': 'Start Time',
+    'end_time': 'End Time',
+}
+
+
+def coalesce_window():
+    return timedelta(seconds=getattr(settings, 'EVENTS_UPDATE_COALESCE_WINDOW', 300))
+
+
+def coalesce_max_delay():
+    return timedelta(seconds=getattr(settings, 'EVENTS_UPDATE_COALESCE_MAX_DELAY', 1800))
+
+
+def event_snapshot(event):
+    """The notified fields of an event, as the strings used in emails"""
+    return {field: str(getattr(event, field)) for field in NOTIFIED_FIELDS}
+
+
+def diff_snapshots(before, after):
+    """[label, old, new] for every notified field that differs"""
+    return [
+        [label, before.get(field), after[field]]
+        for field, label in NOTIFIED_FIELDS.items()
+        if before.get(field) != after[field]
+    ]
+
+
+def record_event_update(event, before, now=None):
+    """
+    Note that ``event`` was saved; ``before`` is its event_snapshot() from
+    before the edit. Call inside the transaction that saved the event.
+    Returns the pending update, or None when nothing attendees can see
+    has changed (such an edit leaves an open window as it is).
+    """
+    if event_snapshot(event) == before:
+        return None
+    now = now or timezone.now()
+    pending = PendingEventUpdate.objects.select_for_update().filter(event=event).first()
+    if pending is None:
+        try:
+            with transaction.atomic():
+                return PendingEventUpdate.objects.create(
+                    event=event, snapshot=before, first_changed_at=now, due_at=now + coalesce_window(),
+                )
+        except IntegrityError:
+            # A concurrent first edit opened the window; extend that one
+            pending = PendingEventUpdate.objects.select_for_update().get(event=event)
+    pending.due_at = min(now + coalesce_window(), pending.first_changed_at + coalesce_max_delay())
+    pending.save(update_fields=['due_at'])
+    return pending
+
+
+def flush_due_updates(now=None, batch_size=500):
+    """Queue one notification per event whose window has closed; returns how many were queued"""
+    now = now or timezone.now()
+    queued = 0
+    while True:
+        due = list(
+            PendingEventUpdate.objects.filter(due_at__lte=now).select_related('event').order_by('due_at', 'id')[:batch_size]
+        )
+        for pending in due:
+            with transaction.atomic():
+                # Skip rows another flush took, or that a new edit pushed back
+                deleted, _ = PendingEventUpdate.objects.filter(pk=pending.pk, due_at__lte=now).delete()
+                if not deleted:
+                    continue
+                changes = diff_snapshots(pending.snapshot, event_snapshot(pending.event))
+                if changes:
+                    enqueue('events.tasks.send_event_notification', pending.event_id, 'event_updated', changes=changes)
+                    queued += 1
+        if len(due) < batch_size:
+            return queued
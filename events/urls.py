@@ -1,10 +1,12 @@
-from django.urls import path, include
+from django.conf import settings
+from django.urls import URLPattern, path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import (
     EventViewSet, RSVPViewSet, ReviewViewSet,
     event_list, event_detail, event_create, event_edit, event_delete,
     rsvp_event, register_view, login_view, logout_view, profile_view, profile_edit,
-    submit_review, delete_review
+    submit_review, delete_review, metrics_view, event_attendees_page, event_reviews_page
 )
 
 router = DefaultRouter()
@@ -25,6 +27,8 @@ urlpatterns = [
     path('events/<int:event_id>/rsvp/', rsvp_event, name='rsvp_event'),
     path('events/<int:event_id>/review/', submit_review, name='submit_review'),
     path('events/<int:event_id>/review/delete/', delete_review, name='delete_review'),
+    path('events/<int:event_id>/attendees/', event_attendees_page, name='event_attendees'),
+    path('events/<int:event_id>/reviews/', event_reviews_page, name='event_reviews'),
     
     # Auth URLs
     path('register/', register_view, name='register'),
@@ -32,4 +36,29 @@ urlpatterns = [
     path('logout/', logout_view, name='logout'),
     path('profile/', profile_view, name='profile'),
     path('profile/edit/', profile_edit, name='profile_edit'),
+
+    # Monitoring
+    path('metrics', metrics_view, name='metrics'),
 ]
+
+
+def with_async_views(patterns):
+    """
+    ``patterns`` with the native async read views: the event pages keep
+    their names with the async views swapped in, and the API reads are
+    routed ahead of the router (writes go back to the sync viewset).
+    """
+    swapped = {'event_list': async_views.event_list, 'event_detail': async_views.event_detail}
+    api_reads = [
+        path('api/events/', async_views.api_event_list),
+        path('api/events/<int:pk>/', async_views.api_event_detail),
+    ]
+    return api_reads + [
+        URLPattern(pattern.pattern, swapped[pattern.name], pattern.default_args, pattern.name)
+        if getattr(pattern, 'name', None) in swapped else pattern
+        for pattern in patterns
+    ]
+
+
+if settings.EVENTS_ASYNC_VIEWS:
+    urlpatterns = with_async_views(urlpatterns)
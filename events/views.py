@@ -1,52 +1,124 @@
+import io
+
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter
-from django.db import models
-from django.contrib.auth.models import User
 from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.paginator import Paginator
-from django.db.models import Q, Count
+from django.db import transaction
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_protect
 from .models import Event, RSVP, Review, UserProfile
-from .serializers import EventSerializer, RSVPSerializer, ReviewSerializer
-from .permissions import IsOrganizerOrReadOnly, IsPublicEventOrInvited
-from .tasks import send_event_notification
+from .serializers import AttendeeSerializer, EventSerializer, RSVPSerializer, ReviewSerializer, BulkRSVPItemSerializer
+from . import metrics
+from .cache import LIST_VERSION_KEY, cached_response, event_version_key
+from .conditional import event_conditional, respond_conditionally, validator_values
+from .detail import (
+    ATTENDEE_ORDERING, REVIEW_ORDERING, attendee_paginator, event_attendees, event_reviews, load_event_detail,
+    review_paginator,
+)
+from .facets import date_bucket_range, event_facets
+from .images import variants_enabled
+from .outbox import enqueue
+from .updates import event_snapshot, record_event_update
+from .bulk import (
+    IMPORT_FORMATS, bulk_rsvp_max_items, bulk_upsert_rsvps, detect_import_format, import_events,
+    iter_import_rows,
+)
+from .pagination import InvalidCursor, KeysetPaginator, keyset_querystring
+from .search import FullTextSearchFilter, SEARCH_ORDERING, search_events
+from .permissions import IsOrganizerOrAttendee, IsOrganizerOrReadOnly, IsPublicEventOrInvited
+from .tasks import build_profile_picture_variants, send_event_notification
+from .visibility import visible_events, get_visible_event_or_404
 from .forms import EventForm, RSVPForm, ReviewForm, CustomUserCreationForm, CustomAuthenticationForm, UserProfileForm
 
 
+def queue_picture_variants(profile):
+    """Have a worker resize a new profile picture; call inside the transaction that saved it"""
+    if profile.profile_picture and variants_enabled():
+        enqueue(build_profile_picture_variants, profile.id)
+
+
+def notify_rsvp(rsvp):
+    """Queue an RSVP confirmation; call inside the transaction that saved the RSVP"""
+    if rsvp.user.email:
+        enqueue(send_event_notification, rsvp.event_id, 'rsvp_confirmation', rsvp.user.email)
+
+
+def save_rsvp(serializer):
+    """Save an RSVP serializer, confirming only when the RSVP is new or its event or status changed"""
+    before = serializer.instance and (serializer.instance.event_id, serializer.instance.status)
+    rsvp = serializer.save()
+    if (rsvp.event_id, rsvp.status) != before:
+        notify_rsvp(rsvp)
+    return rsvp
+
+
 class EventViewSet(viewsets.ModelViewSet):
     serializer_class = EventSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     filterset_fields = ['location', 'organizer']
     search_fields = ['title', 'description', 'location']
     
+    def get_keyset_ordering(self, request):
+        if self.action == 'attendees':
+            return ATTENDEE_ORDERING
+        if self.action == 'reviews':
+            return REVIEW_ORDERING
+        # Rank search results by relevance, otherwise page by start time
+        if request.query_params.get(FullTextSearchFilter.search_param, '').strip():
+            return SEARCH_ORDERING
+        return ('start_time', 'id')
+
     def get_queryset(self):
-        if self.request.user.is_authenticated:
-            # Show public events and private events where user is organizer or has RSVP
-            return Event.objects.filter(
-                models.Q(is_public=True) |
-                models.Q(organizer=self.request.user) |
-                models.Q(rsvps__user=self.request.user)
-            ).distinct()
-        else:
-            # Show only public events for anonymous users
-            return Event.objects.filter(is_public=True)
+        # Public events, plus private events the user organizes or has RSVP'd to;
+        # the serializer nests the organizer and their profile
+        return visible_events(self.request.user).select_related('organizer__userprofile')
     
     def get_permissions(self):
         if self.action in ['update', 'partial_update', 'destroy']:
             permission_classes = [permissions.IsAuthenticated, IsOrganizerOrReadOnly]
-        elif self.action == 'create':
+        elif self.action in ['create', 'import_events']:
             permission_classes = [permissions.IsAuthenticated]
+        elif self.action == 'attendees':
+            permission_classes = [permissions.IsAuthenticated, IsOrganizerOrAttendee]
         else:
             permission_classes = [permissions.AllowAny]
         return [permission() for permission in permission_classes]
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        event = serializer.save()
+        enqueue(send_event_notification, event.id, 'event_created')
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        before = event_snapshot(serializer.instance)
+        event = serializer.save()
+        # Attendees get one coalesced event_updated email per editing session
+        record_event_update(event, before)
     
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return super().list(request, *args, **kwargs)
+
+        # Validate against the page itself: a 304 costs only the page query
+        keyset_page = self.paginator.page
+        return respond_conditionally(
+            request,
+            [validator_values(event) for event in page],
+            lambda: self.get_paginated_response(self.get_serializer(page, many=True).data),
+            request.get_full_path(), keyset_page.next_cursor, keyset_page.previous_cursor, keyset_page.count,
+        )
+
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
         # Check if user can access this event
@@ -54,9 +126,32 @@ class EventViewSet(viewsets.ModelViewSet):
             if not request.user.is_authenticated or not instance.rsvps.filter(user=request.user).exists():
                 return Response({'detail': 'Event not found.'}, status=status.HTTP_404_NOT_FOUND)
         
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        return respond_conditionally(
+            request,
+            [validator_values(instance)],
+            lambda: Response(self.get_serializer(instance).data),
+        )
     
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_events(self, request):
+        """Stream a CSV or NDJSON upload into events organized by the caller"""
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'file': ['No file was submitted.']}, status=status.HTTP_400_BAD_REQUEST)
+        fmt = request.data.get('format') or detect_import_format(upload.name)
+        if fmt not in IMPORT_FORMATS:
+            return Response({'format': [f'Expected one of: {", ".join(IMPORT_FORMATS)}.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            report = import_events(request.user, iter_import_rows(stream, fmt))
+        except UnicodeDecodeError:
+            return Response({'file': ['The file must be UTF-8 encoded.']}, status=status.HTTP_400_BAD_REQUEST)
+        finally:
+            stream.detach()
+        return Response(report.as_dict(), status=status.HTTP_200_OK)
+
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def rsvp(self, request, pk=None):
         event = self.get_object()
@@ -76,7 +171,8 @@ class EventViewSet(viewsets.ModelViewSet):
             serializer = RSVPSerializer(data=rsvp_data, context={'request': request})
         
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                save_rsvp(serializer)
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -90,9 +186,8 @@ class EventViewSet(viewsets.ModelViewSet):
                 return Response({'detail': 'Event not found.'}, status=status.HTTP_404_NOT_FOUND)
         
         if request.method == 'GET':
-            reviews = event.reviews.all()
-            serializer = ReviewSerializer(reviews, many=True)
-            return Response(serializer.data)
+            page = self.paginate_queryset(event_reviews(event).select_related('user__userprofile'))
+            return self.get_paginated_response(ReviewSerializer(page, many=True).data)
         
         elif request.method == 'POST':
             review_data = request.data.copy()
@@ -104,6 +199,18 @@ class EventViewSet(viewsets.ModelViewSet):
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=True, methods=['get'])
+    def attendees(self, request, pk=None):
+        """The event's RSVPs, oldest first, optionally filtered by ``?status=``; for its organizer and attendees"""
+        # get_queryset() only returns events the user may see
+        event = self.get_object()
+        status_filter = request.query_params.get('status')
+        if status_filter and status_filter not in RSVP.STATUS_COUNT_FIELDS:
+            return Response({'status': [f'Expected one of: {", ".join(RSVP.STATUS_COUNT_FIELDS)}.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+        page = self.paginate_queryset(event_attendees(event, status_filter).select_related('user__userprofile'))
+        return self.get_paginated_response(AttendeeSerializer(page, many=True).data)
+
     @action(detail=True, methods=['patch'], url_path='rsvp/(?P<user_id>[^/.]+)', permission_classes=[permissions.IsAuthenticated])
     def update_rsvp(self, request, pk=None, user_id=None):
         event = self.get_object()
@@ -116,7 +223,8 @@ class EventViewSet(viewsets.ModelViewSet):
         serializer = RSVPSerializer(rsvp, data=request.data, partial=True, context={'request': request})
         
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                save_rsvp(serializer)
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -124,45 +232,77 @@ class EventViewSet(viewsets.ModelViewSet):
 class RSVPViewSet(viewsets.ModelViewSet):
     serializer_class = RSVPSerializer
     permission_classes = [permissions.IsAuthenticated]
+    keyset_ordering = ('created_at', 'id')
     
     def get_queryset(self):
-        return RSVP.objects.filter(user=self.request.user)
+        return RSVP.objects.filter(user=self.request.user).select_related('user__userprofile')
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        save_rsvp(serializer)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        save_rsvp(serializer)
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Create or update many RSVPs at once and report a result per item"""
+        items = request.data.get('rsvps') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response({'rsvps': ['Expected a non-empty list of RSVPs.']}, status=status.HTTP_400_BAD_REQUEST)
+        max_items = bulk_rsvp_max_items()
+        if len(items) > max_items:
+            return Response({'rsvps': [f'At most {max_items} RSVPs may be sent at once.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        results = [None] * len(items)
+        parsed = []
+        for index, item in enumerate(items):
+            serializer = BulkRSVPItemSerializer(data=item)
+            if serializer.is_valid():
+                parsed.append((index, serializer.validated_data))
+            else:
+                results[index] = {'index': index, 'result': 'error', 'errors': serializer.errors}
+
+        applied = bulk_upsert_rsvps(request.user, [data for _, data in parsed])
+        for (index, _), result in zip(parsed, applied):
+            result['index'] = index
+            results[index] = result
+
+        summary = {'created': 0, 'updated': 0, 'unchanged': 0, 'error': 0}
+        for result in results:
+            summary[result['result']] += 1
+        return Response({**summary, 'results': results}, status=status.HTTP_200_OK)
 
 
 class ReviewViewSet(viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticated]
+    keyset_ordering = ('created_at', 'id')
 
     def get_queryset(self):
-        return Review.objects.filter(user=self.request.user)
+        return Review.objects.filter(user=self.request.user).select_related('user__userprofile')
 
 
 # Template-based views
 
-def event_list(request):
-    """Display list of events with filtering and pagination"""
+def event_list_query(params, user):
+    """The filtered events for the list page, the paginator for them and whether a total was asked for"""
     # Get filter parameters
-    search_query = request.GET.get('search', '')
-    location_filter = request.GET.get('location', '')
-    organizer_filter = request.GET.get('organizer', '')
+    search_query = params.get('search', '')
+    location_filter = params.get('location', '')
+    organizer_filter = params.get('organizer', '')
+    date_range = date_bucket_range(params.get('when', ''))
 
-    # Base queryset
-    if request.user.is_authenticated:
-        events = Event.objects.filter(
-            Q(is_public=True) |
-            Q(organizer=request.user) |
-            Q(rsvps__user=request.user)
-        ).distinct()
-    else:
-        events = Event.objects.filter(is_public=True)
+    # Base queryset; both list views show each event's organizer
+    events = visible_events(user).select_related('organizer')
 
     # Apply filters
-    if search_query:
-        events = events.filter(
-            Q(title__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(location__icontains=search_query)
-        )
+    ordering = ('start_time', 'id')
+    if search_query.strip():
+        events = search_events(events, search_query)
+        ordering = SEARCH_ORDERING
 
     if location_filter:
         events = events.filter(location__icontains=location_filter)
@@ -170,81 +310,76 @@ def event_list(request):
     if organizer_filter:
         events = events.filter(organizer_id=organizer_filter)
 
-    # Annotate with RSVP count
-    events = events.annotate(rsvp_count=Count('rsvps'))
+    if date_range:
+        start, end = date_range
+        if start is not None:
+            events = events.filter(start_time__gte=start)
+        if end is not None:
+            events = events.filter(start_time__lt=end)
 
-    # Pagination
-    paginator = Paginator(events, 12)  # 12 events per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination; totals only on request
+    paginator = KeysetPaginator(ordering=ordering, page_size=12)
+    with_count = params.get('count', '').lower() in ('1', 'true', 'yes')
+    return events, paginator, with_count
 
-    # Get all organizers for filter dropdown
-    organizers = User.objects.filter(
-        Q(organized_events__is_public=True) |
-        Q(organized_events__rsvps__user=request.user)
-    ).distinct() if request.user.is_authenticated else User.objects.filter(organized_events__is_public=True).distinct()
 
-    context = {
+def event_list_context(request, page_obj, facets):
+    return {
         'events': page_obj,
         'page_obj': page_obj,
-        'is_paginated': page_obj.has_other_pages(),
-        'organizers': organizers,
+        'is_paginated': page_obj.has_other_pages,
+        'next_query': keyset_querystring(request.GET, page_obj.next_cursor) if page_obj.has_next else None,
+        'previous_query': keyset_querystring(request.GET, page_obj.previous_cursor) if page_obj.has_previous else None,
+        'facets': facets,
         'request': request,
     }
 
+
+@cached_response('event_list', lambda request: [LIST_VERSION_KEY])
+def event_list(request):
+    """Display list of events with filtering and pagination"""
+    events, paginator, with_count = event_list_query(request.GET, request.user)
+    try:
+        page_obj = paginator.paginate(events, request.GET.get('cursor'), with_count=with_count)
+    except InvalidCursor:
+        page_obj = paginator.paginate(events, with_count=with_count)
+
+    context = event_list_context(request, page_obj, event_facets(request.user))
     return render(request, 'events/event_list.html', context)
 
 
+@event_conditional
+@cached_response('event_detail', lambda request, event_id: [event_version_key(event_id)])
 def event_detail(request, event_id):
     """Display event details"""
-    if request.user.is_authenticated:
-        events = Event.objects.filter(
-            Q(id=event_id) & (
-                Q(is_public=True) |
-                Q(organizer=request.user) |
-                Q(rsvps__user=request.user)
-            )
-        ).distinct()
-        if not events.exists():
-            from django.http import Http404
-            raise Http404("Event not found")
-        event = events.first()
-    else:
-        event = get_object_or_404(Event, id=event_id, is_public=True)
-
-    # Get RSVPs
-    rsvps = event.rsvps.all().order_by('created_at')
-    rsvp_count = rsvps.count()
+    context = load_event_detail(request.user, event_id)
+    return render(request, 'events/event_detail.html', context)
 
-    # Get user's RSVP if authenticated
-    user_rsvp = None
-    user_review = None
-    if request.user.is_authenticated:
-        try:
-            user_rsvp = RSVP.objects.get(event=event, user=request.user)
-        except RSVP.DoesNotExist:
-            pass
-        
-        try:
-            user_review = Review.objects.get(event=event, user=request.user)
-        except Review.DoesNotExist:
-            pass
 
-    # Get reviews
-    reviews = event.reviews.all().order_by('-created_at')
-    average_rating = reviews.aggregate(models.Avg('rating'))['rating__avg'] or 0
+@cached_response('event_attendees', lambda request, event_id: [event_version_key(event_id)])
+def event_attendees_page(request, event_id):
+    """A further page of attendees for the detail page's "load more" button"""
+    event = get_visible_event_or_404(request.user, event_id)
+    status_filter = request.GET.get('status')
+    if status_filter not in RSVP.STATUS_COUNT_FIELDS:
+        status_filter = None
+    try:
+        page = attendee_paginator().paginate(event_attendees(event, status_filter), request.GET.get('cursor'))
+    except InvalidCursor:
+        raise Http404('Invalid cursor')
+    context = {'event': event, 'rsvps': page, 'status': status_filter}
+    return render(request, 'events/attendee_list.html', context)
 
-    context = {
-        'event': event,
-        'rsvps': rsvps,
-        'rsvp_count': rsvp_count,
-        'user_rsvp': user_rsvp,
-        'user_review': user_review,
-        'reviews': reviews,
-        'average_rating': average_rating,
-    }
 
-    return render(request, 'events/event_detail.html', context)
+@cached_response('event_reviews', lambda request, event_id: [event_version_key(event_id)])
+def event_reviews_page(request, event_id):
+    """A further page of reviews for the detail page's "load more" button"""
+    event = get_visible_event_or_404(request.user, event_id)
+    try:
+        page = review_paginator().paginate(event_reviews(event, request.user), request.GET.get('cursor'))
+    except InvalidCursor:
+        raise Http404('Invalid cursor')
+    return render(request, 'events/review_list.html', {'event': event, 'reviews': page})
 
 
 @login_required
@@ -253,9 +388,11 @@ def event_create(request):
     if request.method == 'POST':
         form = EventForm(request.POST)
         if form.is_valid():
-            event = form.save(commit=False)
-            event.organizer = request.user
-            event.save()
+            with transaction.atomic():
+                event = form.save(commit=False)
+                event.organizer = request.user
+                event.save()
+                enqueue(send_event_notification, event.id, 'event_created')
             messages.success(request, 'Event created successfully!')
             return redirect('event_detail', event_id=event.id)
     else:
@@ -268,11 +405,15 @@ def event_create(request):
 def event_edit(request, event_id):
     """Edit an existing event"""
     event = get_object_or_404(Event, id=event_id, organizer=request.user)
+    # Taken before the form copies the submitted values onto the instance
+    before = event_snapshot(event)
 
     if request.method == 'POST':
         form = EventForm(request.POST, instance=event)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                form.save()
+                record_event_update(event, before)
             messages.success(request, 'Event updated successfully!')
             return redirect('event_detail', event_id=event.id)
     else:
@@ -296,31 +437,22 @@ def event_delete(request, event_id):
 @login_required
 def rsvp_event(request, event_id):
     """Handle RSVP for an event"""
-    if request.user.is_authenticated:
-        events = Event.objects.filter(
-            Q(id=event_id) & (
-                Q(is_public=True) |
-                Q(organizer=request.user) |
-                Q(rsvps__user=request.user)
-            )
-        ).distinct()
-        if not events.exists():
-            from django.http import Http404
-            raise Http404("Event not found")
-        event = events.first()
-    else:
-        event = get_object_or_404(Event, id=event_id, is_public=True)
+    event = get_visible_event_or_404(request.user, event_id)
 
     status_value = request.POST.get('status')
     if status_value in dict(RSVP.STATUS_CHOICES):
-        rsvp, created = RSVP.objects.get_or_create(
-            event=event,
-            user=request.user,
-            defaults={'status': status_value}
-        )
-        if not created:
-            rsvp.status = status_value
-            rsvp.save()
+        with transaction.atomic():
+            rsvp, created = RSVP.objects.get_or_create(
+                event=event,
+                user=request.user,
+                defaults={'status': status_value}
+            )
+            changed = created or rsvp.status != status_value
+            if not created and changed:
+                rsvp.status = status_value
+                rsvp.save()
+            if changed:
+                notify_rsvp(rsvp)
 
         messages.success(request, f'RSVP updated to "{status_value}"')
 
@@ -335,7 +467,9 @@ def register_view(request):
     if request.method == 'POST':
         form = CustomUserCreationForm(request.POST, request.FILES)
         if form.is_valid():
-            user = form.save()
+            with transaction.atomic():
+                user = form.save()
+                queue_picture_variants(user.userprofile)
             login(request, user)
             messages.success(request, 'Registration successful!')
             return redirect('event_list')
@@ -404,7 +538,10 @@ def profile_edit(request):
     if request.method == 'POST':
         form = UserProfileForm(request.POST, request.FILES, instance=profile)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                profile = form.save()
+                if 'profile_picture' in form.changed_data:
+                    queue_picture_variants(profile)
             messages.success(request, 'Profile updated successfully!')
             return redirect('profile')
     else:
@@ -416,17 +553,7 @@ def profile_edit(request):
 @login_required
 def submit_review(request, event_id):
     """Submit or update a review for an event"""
-    events = Event.objects.filter(
-        Q(id=event_id) & (
-            Q(is_public=True) |
-            Q(organizer=request.user) |
-            Q(rsvps__user=request.user)
-        )
-    ).distinct()
-    if not events.exists():
-        from django.http import Http404
-        raise Http404("Event not found")
-    event = events.first()
+    event = get_visible_event_or_404(request.user, event_id)
     
     try:
         review = Review.objects.get(event=event, user=request.user)
@@ -466,3 +593,13 @@ def delete_review(request, event_id):
     review.delete()
     messages.success(request, 'Review deleted successfully!')
     return redirect('event_detail', event_id=event.id)
+
+
+def metrics_view(request):
+    """Task metrics in the Prometheus text format, for staff or a scraper holding EVENTS_METRICS['TOKEN']"""
+    token = metrics.metrics_settings()['TOKEN']
+    authorization = request.headers.get('Authorization', '')
+    scraper = bool(token) and constant_time_compare(authorization, f'Bearer {token}')
+    if not (scraper or request.user.is_staff):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
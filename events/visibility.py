@@ -0,0 +1,43 @@
+from django.db.models import Exists, OuterRef, Q
+from django.http import Http404
+
+from .models import Event, RSVP
+
+
+def visible_events(user, queryset=None):
+    """
+    Return the events the given user is allowed to see.
+
+    Anonymous users see public events only. Authenticated users also see
+    the events they organize and the events they have RSVP'd to. The RSVP
+    check is an EXISTS subquery against the (event, user) unique index, so
+    no RSVP rows are joined and no DISTINCT is needed.
+    """
+    if queryset is None:
+        queryset = Event.objects.all()
+
+    if user is None or not user.is_authenticated:
+        return queryset.filter(is_public=True)
+
+    has_rsvp = RSVP.objects.filter(event=OuterRef('pk'), user=user)
+    return queryset.filter(
+        Q(is_public=True) |
+        Q(organizer=user) |
+        Exists(has_rsvp)
+    )
+
+
+def get_visible_event_or_404(user, event_id, queryset=None):
+    """Fetch a single event the user may see, raising Http404 otherwise"""
+    event = visible_events(user, queryset).filter(id=event_id).first()
+    if event is None:
+        raise Http404("Event not found")
+    return event
+
+
+async def aget_visible_event_or_404(user, event_id, queryset=None):
+    """get_visible_event_or_404() for async views"""
+    event = await visible_events(user, queryset).filter(id=event_id).afirst()
+    if event is None:
+        raise Http404("Event not found")
+    return event